@@ -5,14 +5,17 @@ Admin Panel Modülü - Gelişmiş Yönetim Sistemi
 Güncellenmiş Versiyon - Yeni Broadcast Sistemi
 """
 
-import asyncio
 import logging
+from typing import List
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.constants import MessageLimit
 from telegram.ext import ContextTypes
 from psycopg2.extras import RealDictCursor
 
 # Import from bot_main
-from bot_main import db, Config
+from bot_main import db, Config, notifier
+from bot_metrics import pause, api_usage_summary
+from bot_guard import set_waiting
 
 # ============================================================================
 # ADMİN PANELİ
@@ -30,6 +33,7 @@ async def show_admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
         [InlineKeyboardButton("🗑 Promo kod poz", callback_data="admin_promo_delete")],
         [InlineKeyboardButton("📢 Sponsor Dolandyryş", callback_data="admin_sponsor_menu")],
         [InlineKeyboardButton("📊 Statistika", callback_data="admin_stats")],
+        [InlineKeyboardButton("📊 API", callback_data="admin_api_stats")],
         [InlineKeyboardButton("📣 Hemmä habar", callback_data="admin_broadcast")],
         [InlineKeyboardButton("📮 Toplu Post", callback_data="admin_mass_post")],
         [InlineKeyboardButton("🔙 Yza gaýt", callback_data="back_main")]
@@ -272,13 +276,84 @@ async def admin_top_withdrawn(update: Update, context: ContextTypes.DEFAULT_TYPE
 # PARA ÇEKME YÖNETİMİ
 # ============================================================================
 
-async def admin_withdrawals_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Para çekme talepleri menüsü"""
+def split_message(header: str, lines: List[str], footer: str = "") -> List[str]:
+    """Uzun listeyi Telegram mesaj sınırına sığan parçalara böl - Başlık ilk, kapanış son parçada"""
+    limit = MessageLimit.MAX_TEXT_LENGTH
+    chunks = []
+    text = header
+    for line in lines:
+        if len(text) + len(line) > limit:
+            chunks.append(text)
+            text = ""
+        text += line
+    if len(text) + len(footer) > limit:
+        chunks.append(text)
+        text = ""
+    chunks.append(text + footer)
+    return chunks
+
+def queue_withdrawal_notifications(requests: list, approved: bool):
+    """İşlenen talepler için kullanıcı DM'lerini ve kanal özetini arka plan kuyruğuna ekle"""
+    for request in requests:
+        if approved:
+            text = (
+                f"✅ <b>TALAP TASSYKLANDY!</b>\n\n"
+                f"📋 Talap №: {request['request_id']}\n"
+                f"💎 Mukdar: {request['diamond_amount']:.1f} diamond\n"
+                f"💵 Manat: {request['manat_amount']:.2f} TMT\n\n"
+                f"💰 Diamond hasabyňyzdan düşürildi.\n"
+                f"📞 Admin siz bilen ýakynda habarlaşar."
+            )
+        else:
+            text = (
+                f"❌ <b>TALAP RET EDILDI</b>\n\n"
+                f"📋 Talap №: {request['request_id']}\n"
+                f"💎 Mukdar: {request['diamond_amount']:.1f} diamond\n\n"
+                f"🔄 Diamond hasabyňyza gaýtaryldy.\n"
+                f"📞 Soraglar üçin admin bilen habarlaşyň: @alpen_silver"
+            )
+        notifier.put(request['user_id'], text)
+
+    # Onaylar kanala tek bir özet post olarak duyurulur
+    if approved and requests:
+        if len(requests) == 1:
+            request = requests[0]
+            announcement_text = (
+                f"✅ <b>Talap Tassyklandy!</b>\n\n"
+                f"📋 Talap №: {request['request_id']}\n"
+                f"👤 Ullanyjy: @{request['username']}\n"
+                f"💎 Mukdar: {request['diamond_amount']:.1f} diamond\n"
+                f"💵 Manat: {request['manat_amount']:.2f} TMT\n\n"
+                f"🎉 Gutlaýarys!"
+            )
+            notifier.put(Config.WITHDRAW_ANNOUNCE_CHANNEL, announcement_text)
+        else:
+            # Çok talepte özet birden çok posta bölünür
+            lines = [
+                f"📋 №{request['request_id']} • @{request['username']} • "
+                f"{request['diamond_amount']:.1f} 💎 ({request['manat_amount']:.2f} TMT)\n"
+                for request in requests
+            ]
+            for announcement_text in split_message(
+                f"✅ <b>{len(requests)} Talap Tassyklandy!</b>\n\n", lines, "\n🎉 Gutlaýarys!"
+            ):
+                notifier.put(Config.WITHDRAW_ANNOUNCE_CHANNEL, announcement_text)
+
+async def admin_withdrawals_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, page: int = 0):
+    """Para çekme talepleri kuyruğu - Sayfalı ve çoklu seçimli"""
     query = update.callback_query
 
-    pending_requests = db.get_pending_withdrawals()
+    page_size = Config.WITHDRAW_PAGE_SIZE
+    pending_requests, total = db.get_pending_withdrawals_page(page * page_size, page_size)
+
+    # Sayfa boşaldıysa (ör. son sayfadaki talepler işlendi) bir önceki sayfaya dön
+    if not pending_requests and page > 0:
+        page = max(0, (total - 1) // page_size)
+        pending_requests, total = db.get_pending_withdrawals_page(page * page_size, page_size)
 
     if not pending_requests:
+        context.user_data['wd_visible'] = []
+        context.user_data['wd_selected'] = set()
         await query.edit_message_text(
             "💰 <b>Pul Çekme Talaplary</b>\n\n"
             "✅ Häzir hiç hili talap ýok.",
@@ -289,27 +364,59 @@ async def admin_withdrawals_menu(update: Update, context: ContextTypes.DEFAULT_T
         )
         return
 
-    text = "💰 <b>Garaşýan Talaplar:</b>\n\n"
+    page_count = (total + page_size - 1) // page_size
+    visible_ids = [req['request_id'] for req in pending_requests]
+    selected = context.user_data.setdefault('wd_selected', set())
+    selected.intersection_update(visible_ids)
+
+    # Toplu işlemler ekranda gösterilen taleplere uygulanır
+    context.user_data['wd_visible'] = visible_ids
+
+    text = f"💰 <b>Garaşýan Talaplar:</b> {total}\n📄 Sahypa {page + 1}/{page_count}\n\n"
 
     keyboard = []
     for req in pending_requests:
+        mark = "☑️" if req['request_id'] in selected else "⬜"
         text += (
-            f"📋 №{req['request_id']}\n"
+            f"{mark} 📋 №{req['request_id']}\n"
             f"👤 @{req['username']} (ID: {req['user_id']})\n"
             f"💎 {req['diamond_amount']:.1f} diamond ({req['manat_amount']:.2f} TMT)\n\n"
         )
 
         keyboard.append([
             InlineKeyboardButton(
-                f"✅ №{req['request_id']} Tassykla",
+                f"{mark} №{req['request_id']}",
+                callback_data=f"admin_wdsel_{req['request_id']}_{page}"
+            ),
+            InlineKeyboardButton(
+                "✅ Tassykla",
                 callback_data=f"admin_approve_{req['request_id']}"
             ),
             InlineKeyboardButton(
-                f"❌ №{req['request_id']} Ret et",
+                "❌ Ret et",
                 callback_data=f"admin_reject_{req['request_id']}"
             )
         ])
 
+    if selected:
+        keyboard.append([
+            InlineKeyboardButton(f"✅ Saýlanan ({len(selected)})", callback_data=f"admin_wdbulk_approve_sel_{page}"),
+            InlineKeyboardButton(f"❌ Saýlanan ({len(selected)})", callback_data=f"admin_wdbulk_reject_sel_{page}")
+        ])
+
+    keyboard.append([
+        InlineKeyboardButton("✅ Ählisini tassykla", callback_data=f"admin_wdbulk_approve_all_{page}"),
+        InlineKeyboardButton("❌ Ählisini ret et", callback_data=f"admin_wdbulk_reject_all_{page}")
+    ])
+
+    nav_row = []
+    if page > 0:
+        nav_row.append(InlineKeyboardButton("⬅️", callback_data=f"admin_wdpage_{page - 1}"))
+    if page + 1 < page_count:
+        nav_row.append(InlineKeyboardButton("➡️", callback_data=f"admin_wdpage_{page + 1}"))
+    if nav_row:
+        keyboard.append(nav_row)
+
     keyboard.append([InlineKeyboardButton("🔙 Yza gaýt", callback_data="admin_panel")])
 
     await query.edit_message_text(
@@ -318,91 +425,96 @@ async def admin_withdrawals_menu(update: Update, context: ContextTypes.DEFAULT_T
         reply_markup=InlineKeyboardMarkup(keyboard)
     )
 
+async def admin_withdrawals_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Onay kuyruğunda sayfa değiştir"""
+    query = update.callback_query
+    page = int(query.data.split("_")[2])
+
+    await admin_withdrawals_menu(update, context, page)
+
+async def admin_toggle_withdrawal(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Talebi seçime ekle/çıkar"""
+    query = update.callback_query
+    parts = query.data.split("_")
+    request_id = int(parts[2])
+    page = int(parts[3])
+
+    selected = context.user_data.setdefault('wd_selected', set())
+    if request_id in selected:
+        selected.discard(request_id)
+    else:
+        selected.add(request_id)
+
+    await admin_withdrawals_menu(update, context, page)
+
+async def admin_bulk_withdrawals(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Seçilen veya ekrandaki tüm talepleri tek transaction'da onayla/reddet"""
+    query = update.callback_query
+    # admin_wdbulk_{approve|reject}_{sel|all}_{page}
+    parts = query.data.split("_")
+    action = parts[2]
+    scope = parts[3]
+    page = int(parts[4])
+
+    visible_ids = context.user_data.get('wd_visible', [])
+    selected = context.user_data.setdefault('wd_selected', set())
+
+    if scope == "sel":
+        request_ids = [request_id for request_id in visible_ids if request_id in selected]
+    else:
+        request_ids = list(visible_ids)
+
+    if not request_ids:
+        await query.answer("❌ Hiç hili talap saýlanmady!", show_alert=True)
+        return
+
+    if action == "approve":
+        processed = db.approve_withdrawals(request_ids)
+        result_text = f"✅ {len(processed)} talap tassyklandy!"
+    else:
+        processed = db.reject_withdrawals(request_ids)
+        result_text = f"❌ {len(processed)} talap ret edildi!"
+
+    queue_withdrawal_notifications(processed, approved=(action == "approve"))
+    selected.difference_update(request_ids)
+
+    await admin_withdrawals_menu(update, context, page)
+    await query.answer(result_text, show_alert=True)
+
 async def admin_approve_withdrawal(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Para çekme talebini onayla"""
     query = update.callback_query
     request_id = int(query.data.split("_")[2])
 
-    request = db.get_withdrawal_request(request_id)
+    # Onayla - sadece bekleyen talepler işlenir
+    request = db.approve_withdrawal(request_id)
 
-    if not request or request['status'] != 'pending':
+    if not request:
         await query.answer("❌ Talap tapylmady ýa-da eýýäm işlenildi!", show_alert=True)
         return
 
-    # Onayla ve diamond'ı düş
-    db.approve_withdrawal(request_id)
+    # Kullanıcı bildirimi ve kanal duyurusu arka planda gönderilir
+    queue_withdrawal_notifications([request], approved=True)
 
-    # Kullanıcıya bildirim
-    try:
-        await context.bot.send_message(
-            chat_id=request['user_id'],
-            text=(
-                f"✅ <b>TALAP TASSYKLANDY!</b>\n\n"
-                f"📋 Talap №: {request_id}\n"
-                f"💎 Mukdar: {request['diamond_amount']:.1f} diamond\n"
-                f"💵 Manat: {request['manat_amount']:.2f} TMT\n\n"
-                f"💰 Diamond hasabyňyzdan düşürildi.\n"
-                f"📞 Admin siz bilen ýakynda habarlaşar."
-            ),
-            parse_mode="HTML"
-        )
-    except Exception as e:
-        logging.error(f"Kullanıcıya bildirim gönderilemedi: {e}")
-
-    # KANALA BİLDİRİM GÖNDER
-    try:
-        announcement_text = (
-            f"✅ <b>Talap Tassyklandy!</b>\n\n"
-            f"📋 Talap №: {request_id}\n"
-            f"👤 Ullanyjy: @{request['username']}\n"
-            f"💎 Mukdar: {request['diamond_amount']:.1f} diamond\n"
-            f"💵 Manat: {request['manat_amount']:.2f} TMT\n\n"
-            f"🎉 Gutlaýarys!"
-        )
-
-        await context.bot.send_message(
-            chat_id="@diamond_labs",
-            text=announcement_text,
-            parse_mode="HTML"
-        )
-    except Exception as e:
-        logging.error(f"Kanala bildirim gönderilemedi: {e}")
-
-    await query.answer("✅ Talap tassyklandy!", show_alert=True)
     await admin_withdrawals_menu(update, context)
+    await query.answer("✅ Talap tassyklandy!", show_alert=True)
 
 async def admin_reject_withdrawal(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Para çekme talebini reddet"""
     query = update.callback_query
     request_id = int(query.data.split("_")[2])
 
-    request = db.get_withdrawal_request(request_id)
+    # Reddet - bloke edilen diamond iade edilir
+    request = db.reject_withdrawal(request_id)
 
-    if not request or request['status'] != 'pending':
+    if not request:
         await query.answer("❌ Talap tapylmady ýa-da eýýäm işlenildi!", show_alert=True)
         return
 
-    # Reddet
-    db.reject_withdrawal(request_id)
-
-    # Kullanıcıya bildirim
-    try:
-        await context.bot.send_message(
-            chat_id=request['user_id'],
-            text=(
-                f"❌ <b>TALAP RET EDILDI</b>\n\n"
-                f"📋 Talap №: {request_id}\n"
-                f"💎 Mukdar: {request['diamond_amount']:.1f} diamond\n\n"
-                f"🔄 Diamond hasabyňyzda galýar.\n"
-                f"📞 Soraglar üçin admin bilen habarlaşyň: @alpen_silver"
-            ),
-            parse_mode="HTML"
-        )
-    except Exception as e:
-        logging.error(f"Kullanıcıya bildirim gönderilemedi: {e}")
+    queue_withdrawal_notifications([request], approved=False)
 
-    await query.answer("❌ Talap ret edildi!", show_alert=True)
     await admin_withdrawals_menu(update, context)
+    await query.answer("❌ Talap ret edildi!", show_alert=True)
 
 # ============================================================================
 # PROMO KOD YÖNETİMİ
@@ -709,6 +821,40 @@ async def admin_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
         ]])
     )
 
+async def admin_api_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Bot API kullanımı - Hangi özellik rate limit'i tüketiyor"""
+    query = update.callback_query
+
+    summary = api_usage_summary()
+
+    text = "📊 <b>Bot API ulanylyşy</b>\n<i>(bu prosesiň başlanan wagtyndan bäri)</i>\n\n"
+
+    text += "📡 <b>Metodlar:</b>\n"
+    for method, count in summary['methods']:
+        text += f"• <code>{method}</code>: {int(count)}\n"
+
+    text += "\n🧩 <b>Handlerler:</b>\n"
+    for handler, count in summary['handlers']:
+        text += f"• <code>{handler}</code>: {int(count)}\n"
+
+    text += "\n🚦 <b>429 (RetryAfter):</b>\n"
+    if summary['rate_limited']:
+        for key, count in summary['rate_limited']:
+            text += f"• <code>{key}</code>: {int(count)}\n"
+        for method, seconds in summary['retry_delays']:
+            text += f"⏳ <code>{method}</code>: jemi {seconds:.0f} sek garaşmaly boldy\n"
+    else:
+        text += "✅ Ýok\n"
+
+    await query.edit_message_text(
+        text,
+        parse_mode="HTML",
+        reply_markup=InlineKeyboardMarkup([
+            [InlineKeyboardButton("🔄 Täzele", callback_data="admin_api_stats")],
+            [InlineKeyboardButton("🔙 Yza gaýt", callback_data="admin_panel")]
+        ])
+    )
+
 # ============================================================================
 # BROADCAST - YENİ SİSTEM (BUTON BAZLI)
 # ============================================================================
@@ -736,7 +882,7 @@ async def admin_broadcast_menu(update: Update, context: ContextTypes.DEFAULT_TYP
     )
 
     # Kullanıcıyı bekleme moduna al
-    context.user_data['waiting_for_broadcast'] = True
+    set_waiting(update, context, 'waiting_for_broadcast', True)
 
     await query.edit_message_text(
         text,
@@ -762,7 +908,7 @@ async def handle_broadcast_message(update: Update, context: ContextTypes.DEFAULT
         return
 
     # Bekleme modunu kapat
-    context.user_data['waiting_for_broadcast'] = False
+    set_waiting(update, context, 'waiting_for_broadcast', False)
 
     # Tüm kullanıcıları al
     users = db.get_all_user_ids()
@@ -818,7 +964,7 @@ async def handle_broadcast_message(update: Update, context: ContextTypes.DEFAULT
                 )
 
             success_count += 1
-            await asyncio.sleep(0.05)  # Rate limit için bekleme
+            await pause(0.05)  # Rate limit için bekleme
 
         except Exception as e:
             failed_count += 1
@@ -855,7 +1001,7 @@ async def admin_mass_post_menu(update: Update, context: ContextTypes.DEFAULT_TYP
     )
 
     # Kullanıcıyı bekleme moduna al
-    context.user_data['waiting_for_mass_post'] = True
+    set_waiting(update, context, 'waiting_for_mass_post', True)
 
     await query.edit_message_text(
         text,
@@ -881,7 +1027,7 @@ async def handle_mass_post(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # Bekleme modunu kapat
-    context.user_data['waiting_for_mass_post'] = False
+    set_waiting(update, context, 'waiting_for_mass_post', False)
 
     # Tüm aktif sponsorları al (bot admin olduğu)
     all_sponsors = db.get_active_sponsors()
@@ -955,7 +1101,7 @@ async def handle_mass_post(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 )
 
             success_count += 1
-            await asyncio.sleep(0.5)  # Rate limit için bekleme
+            await pause(0.5)  # Rate limit için bekleme
 
         except Exception as e:
             failed_count += 1
@@ -1042,6 +1188,25 @@ async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         except:
             await update.message.reply_text("❌ Nädogry format! /userinfo 123456789")
 
+    # Ban / ban kaldırma - Ön filtre banlı kullanıcıyı hemen düşürür
+    elif command in ("ban", "unban"):
+        try:
+            target_user = int(context.args[0])
+        except:
+            await update.message.reply_text(f"❌ Nädogry format! /{command} 123456789")
+            return
+
+        if target_user in Config.ADMIN_IDS:
+            await update.message.reply_text("❌ Admini bloklap bolmaýar!")
+            return
+
+        if not db.set_user_banned(target_user, command == "ban"):
+            await update.message.reply_text("❌ Ullanyjy tapylmady!")
+        elif command == "ban":
+            await update.message.reply_text(f"🚫 {target_user} ID-li ullanyjy bloklandy!")
+        else:
+            await update.message.reply_text(f"✅ {target_user} ID-li ullanyjynyň blogy aýryldy!")
+
     # Promo kod oluşturma
     elif command == "createpromo":
         try:
@@ -1105,102 +1270,49 @@ async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 parse_mode="HTML"
             )
 
-    # Para çekme onaylama
+    # Para çekme onaylama - /approve 12 13 14
     elif command == "approve":
         try:
-            request_id = int(context.args[0])
-            request = db.get_withdrawal_request(request_id)
+            request_ids = [int(arg) for arg in context.args]
+            if not request_ids:
+                raise ValueError
 
-            if not request:
-                await update.message.reply_text("❌ Talap tapylmady!")
-                return
+            approved = db.approve_withdrawals(request_ids)
 
-            if request['status'] != 'pending':
-                await update.message.reply_text("❌ Bu talap eýýäm işlenildi!")
+            if not approved:
+                await update.message.reply_text("❌ Talap tapylmady ýa-da eýýäm işlenildi!")
                 return
 
-            db.approve_withdrawal(request_id)
-
-            # Kullanıcıya bildirim
-            try:
-                await context.bot.send_message(
-                    chat_id=request['user_id'],
-                    text=(
-                        f"✅ <b>TALAP TASSYKLANDY!</b>\n\n"
-                        f"📋 Talap №: {request_id}\n"
-                        f"💎 Mukdar: {request['diamond_amount']:.1f} diamond\n"
-                        f"💵 Manat: {request['manat_amount']:.2f} TMT\n\n"
-                        f"💰 Diamond hasabyňyzdan düşürildi.\n"
-                        f"📞 Admin siz bilen ýakynda habarlaşar."
-                    ),
-                    parse_mode="HTML"
-                )
-            except:
-                pass
-
-            # KANALA BİLDİRİM GÖNDER
-            try:
-                announcement_text = (
-                    f"✅ <b>Talap Tassyklandy!</b>\n\n"
-                    f"📋 Talap №: {request_id}\n"
-                    f"👤 Ullanyjy: @{request['username']}\n"
-                    f"💎 Mukdar: {request['diamond_amount']:.1f} diamond\n"
-                    f"💵 Manat: {request['manat_amount']:.2f} TMT\n\n"
-                    f"🎉 Gutlaýarys!"
-                )
-
-                await context.bot.send_message(
-                    chat_id="@diamond_labs",
-                    text=announcement_text,
-                    parse_mode="HTML"
-                )
-            except Exception as e:
-                logging.error(f"Kanala bildirim gönderilemedi: {e}")
+            queue_withdrawal_notifications(approved, approved=True)
 
-            await update.message.reply_text(
-                f"✅ Talap №{request_id} tassyklandy!\n"
-                f"Ullanyjy: @{request['username']}\n"
-                f"Mukdar: {request['diamond_amount']:.1f} 💎 ({request['manat_amount']:.2f} TMT)"
-            )
+            lines = [
+                f"№{request['request_id']} @{request['username']} - "
+                f"{request['diamond_amount']:.1f} 💎 ({request['manat_amount']:.2f} TMT)\n"
+                for request in approved
+            ]
+            for text in split_message(f"✅ {len(approved)} talap tassyklandy!\n", lines):
+                await update.message.reply_text(text)
         except:
             await update.message.reply_text("❌ Nädogry format! /approve 123")
 
-    # Para çekme reddetme
+    # Para çekme reddetme - /reject 12 13 14
     elif command == "reject":
         try:
-            request_id = int(context.args[0])
-            request = db.get_withdrawal_request(request_id)
+            request_ids = [int(arg) for arg in context.args]
+            if not request_ids:
+                raise ValueError
 
-            if not request:
-                await update.message.reply_text("❌ Talap tapylmady!")
-                return
+            rejected = db.reject_withdrawals(request_ids)
 
-            if request['status'] != 'pending':
-                await update.message.reply_text("❌ Bu talap eýýäm işlenildi!")
+            if not rejected:
+                await update.message.reply_text("❌ Talap tapylmady ýa-da eýýäm işlenildi!")
                 return
 
-            db.reject_withdrawal(request_id)
+            queue_withdrawal_notifications(rejected, approved=False)
 
-            # Kullanıcıya bildirim
-            try:
-                await context.bot.send_message(
-                    chat_id=request['user_id'],
-                    text=(
-                        f"❌ <b>TALAP RET EDILDI</b>\n\n"
-                        f"📋 Talap №: {request_id}\n"
-                        f"💎 Mukdar: {request['diamond_amount']:.1f} diamond\n\n"
-                        f"🔄 Diamond hasabyňyzda galýar.\n"
-                        f"📞 Soraglar üçin admin bilen habarlaşyň: @alpen_silver"
-                    ),
-                    parse_mode="HTML"
-                )
-            except:
-                pass
-
-            await update.message.reply_text(
-                f"❌ Talap №{request_id} ret edildi!\n"
-                f"Ullanyjy: @{request['username']}"
-            )
+            lines = [f"№{request['request_id']} @{request['username']}\n" for request in rejected]
+            for text in split_message(f"❌ {len(rejected)} talap ret edildi!\n", lines):
+                await update.message.reply_text(text)
         except:
             await update.message.reply_text("❌ Nädogry format! /reject 123")
 
@@ -1208,63 +1320,54 @@ async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # CALLBACK ROUTER
 # ============================================================================
 
-async def handle_admin_callbacks(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Admin callback'lerini yönlendir"""
-    query = update.callback_query
-    data = query.data
-
-    # Admin panel callbacks
-    if data == "admin_panel":
-        await show_admin_panel(update, context)
-    elif data == "admin_users":
-        await admin_users_menu(update, context)
-    elif data == "admin_withdrawals":
-        await admin_withdrawals_menu(update, context)
-
-    # Top Users callbacks
-    elif data == "admin_top_users":
-        await admin_top_users_menu(update, context)
-    elif data == "admin_top_diamonds":
-        await admin_top_diamonds(update, context)
-    elif data == "admin_top_referrals":
-        await admin_top_referrals(update, context)
-    elif data == "admin_top_withdrawn":
-        await admin_top_withdrawn(update, context)
-
-    # Promo callbacks
-    elif data == "admin_promo_create":
-        await admin_promo_create_menu(update, context)
-    elif data == "admin_promo_delete":
-        await admin_promo_delete_menu(update, context)
-
-    # Sponsor callbacks - YENİ
-    elif data == "admin_sponsor_menu":
-        await admin_sponsor_menu(update, context)
-    elif data == "admin_sponsor_add_required":
-        await admin_sponsor_add_required_menu(update, context)
-    elif data == "admin_sponsor_add_task":
-        await admin_sponsor_add_task_menu(update, context)
-    elif data == "admin_sponsor_list_required":
-        await admin_sponsor_list_required(update, context)
-    elif data == "admin_sponsor_list_task":
-        await admin_sponsor_list_task(update, context)
-    elif data == "admin_sponsor_delete":
-        await admin_sponsor_delete_menu(update, context)
-
-    # Other callbacks
-    elif data == "admin_stats":
-        await admin_stats(update, context)
-    elif data == "admin_broadcast":
-        await admin_broadcast_menu(update, context)
-    elif data == "admin_mass_post":
-        await admin_mass_post_menu(update, context)
-
-    # Action callbacks
-    elif data.startswith("admin_approve_"):
-        await admin_approve_withdrawal(update, context)
-    elif data.startswith("admin_reject_"):
-        await admin_reject_withdrawal(update, context)
-    elif data.startswith("admin_delpromo_"):
-        await admin_delete_promo(update, context)
-    elif data.startswith("admin_delsponsor_"):
-        await admin_delete_sponsor(update, context)
+async def open_admin_withdrawals(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Talepler kuyruğunu seçimsiz aç"""
+    context.user_data['wd_selected'] = set()
+    await admin_withdrawals_menu(update, context)
+
+def register_admin_routes(router):
+    """Admin callback route'ları - Hepsi admin kontrolünden geçer"""
+    exact = {
+        "admin_panel": show_admin_panel,
+        "admin_users": admin_users_menu,
+        "admin_withdrawals": open_admin_withdrawals,
+
+        # Top Users callbacks
+        "admin_top_users": admin_top_users_menu,
+        "admin_top_diamonds": admin_top_diamonds,
+        "admin_top_referrals": admin_top_referrals,
+        "admin_top_withdrawn": admin_top_withdrawn,
+
+        # Promo callbacks
+        "admin_promo_create": admin_promo_create_menu,
+        "admin_promo_delete": admin_promo_delete_menu,
+
+        # Sponsor callbacks
+        "admin_sponsor_menu": admin_sponsor_menu,
+        "admin_sponsor_add_required": admin_sponsor_add_required_menu,
+        "admin_sponsor_add_task": admin_sponsor_add_task_menu,
+        "admin_sponsor_list_required": admin_sponsor_list_required,
+        "admin_sponsor_list_task": admin_sponsor_list_task,
+        "admin_sponsor_delete": admin_sponsor_delete_menu,
+
+        # Other callbacks
+        "admin_stats": admin_stats,
+        "admin_api_stats": admin_api_stats,
+        "admin_broadcast": admin_broadcast_menu,
+        "admin_mass_post": admin_mass_post_menu,
+    }
+    for pattern, handler in exact.items():
+        router.add(pattern, handler, requires_admin=True)
+
+    # Action callbacks - Parametreli
+    prefixes = {
+        "admin_approve_": admin_approve_withdrawal,
+        "admin_reject_": admin_reject_withdrawal,
+        "admin_wdpage_": admin_withdrawals_page,
+        "admin_wdsel_": admin_toggle_withdrawal,
+        "admin_wdbulk_": admin_bulk_withdrawals,
+        "admin_delpromo_": admin_delete_promo,
+        "admin_delsponsor_": admin_delete_sponsor,
+    }
+    for pattern, handler in prefixes.items():
+        router.add(pattern, handler, prefix=True, requires_admin=True)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Database Benchmark - bot_main.Database metotlarını büyük veri setlerinde ölçer
+Her boyut için (varsayılan 10k/100k/1M kullanıcı) veri üretilir, her metot
+tekrar tekrar çağrılır; ops/sn ve gecikme dağılımı JSON olarak kaydedilir.
+Sürümler arası gerilemeleri görmek için --compare ile eski sonuçla karşılaştır.
+
+⚠️ DATABASE_URL yerel/test veritabanını göstermeli - Benchmark satır ekler/siler.
+Çalıştırma: python bot_bench.py --sizes 10000 100000 --out bench.json
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from bot_main import db
+from bot_loadsim import percentile
+
+BENCH_USER_BASE = -2_000_000_000  # Negatif ve aşağı doğru - Telegram kullanıcı ID'leri pozitif, gerçek kullanıcıyla çakışmaz
+BENCH_PROMO_CODE = f"BENCH-{uuid.uuid4().hex[:8].upper()}"  # Çalıştırma başına benzersiz - Gerçek promo koduna dokunulmaz
+
+# ============================================================================
+# VERİ ÜRETİMİ
+# ============================================================================
+
+def cleanup_bench_data(size: int):
+    """seed(size) ile eklenen kullanıcıları ve kayıtlarını sil - Sadece üretilen ID'ler"""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    for table in ("used_promo_codes", "user_sponsors", "daily_stats", "users"):
+        cursor.execute(f"""
+            DELETE FROM {table}
+            WHERE user_id IN (SELECT %s - g FROM generate_series(1, %s) AS g)
+        """, (BENCH_USER_BASE, size))
+    cursor.execute("DELETE FROM promo_codes WHERE code = %s", (BENCH_PROMO_CODE,))
+    conn.commit()
+    cursor.close()
+    db.return_connection(conn)
+    db.refresh_promo_index()
+
+def seed(size: int, promo_uses: int):
+    """size kullanıcı, %20'si için bugünkü istatistik - Tek sorguyla generate_series"""
+    now = int(time.time())
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    # Son 30 günde katılmış, son 48 saatte dağınık aktif kullanıcılar (yarısı inaktif)
+    cursor.execute("""
+        INSERT INTO users (user_id, username, diamond, referral_count, joined_date, last_activity)
+        SELECT %s - g, 'bench' || g,
+               round((random() * 100)::numeric, 2),
+               (random() * 10)::int,
+               %s - (random() * 2592000)::bigint,
+               %s - (random() * 172800)::bigint
+        FROM generate_series(1, %s) AS g
+    """, (BENCH_USER_BASE, now, now, size))
+    cursor.execute("""
+        INSERT INTO daily_stats (user_id, stat_date, daily_diamonds_earned, daily_referrals_count, daily_withdrawn)
+        SELECT %s - g, %s,
+               round((random() * 20)::numeric, 2),
+               (random() * 5)::int,
+               round((random() * 30)::numeric, 2)
+        FROM generate_series(1, %s) AS g
+        WHERE g %% 5 = 0
+    """, (BENCH_USER_BASE, datetime.now().date(), size))
+    conn.commit()
+    cursor.execute("ANALYZE users")
+    cursor.execute("ANALYZE daily_stats")
+    conn.commit()
+    cursor.close()
+    db.return_connection(conn)
+    db.create_promo_code(BENCH_PROMO_CODE, 0.1, promo_uses)
+
+# ============================================================================
+# ÖLÇÜM
+# ============================================================================
+
+def measure(fn: Callable[[], object], iterations: int) -> Dict:
+    """fn'i iterations kez çalıştır - ops/sn ve gecikme dağılımı"""
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    return {
+        "iterations": iterations,
+        "ops_per_sec": round(iterations / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+    }
+
+def run_size(size: int, iterations: int, heavy_iterations: int) -> Dict:
+    """Tek veri seti boyutu için tüm metotları ölç"""
+    cleanup_bench_data(size)
+    seed(size, iterations)
+
+    def random_user() -> int:
+        return BENCH_USER_BASE - random.randint(1, size)
+
+    # Promo kodu her seferinde farklı kullanıcı kullanır (başarılı yol)
+    promo_users = iter(range(BENCH_USER_BASE - 1, BENCH_USER_BASE - size - 1, -1))
+
+    cases = {
+        "get_user": (lambda: db.get_user(random_user()), iterations),
+        "update_diamond": (lambda: db.update_diamond(random_user(), 0.1), iterations),
+        "use_promo_code": (lambda: db.use_promo_code(BENCH_PROMO_CODE, next(promo_users)), min(iterations, size)),
+        # Haklar bitti - bellek içi indeksten cevaplanan yol
+        "use_promo_code_exhausted": (lambda: db.use_promo_code(BENCH_PROMO_CODE, random_user()), iterations),
+        "get_user_next_sponsor": (lambda: db.get_user_next_sponsor(random_user()), iterations),
+        "get_daily_top_diamonds": (lambda: db.get_daily_top_diamonds(), heavy_iterations),
+        "get_daily_top_referrals": (lambda: db.get_daily_top_referrals(), heavy_iterations),
+        "get_daily_top_withdrawn": (lambda: db.get_daily_top_withdrawn(), heavy_iterations),
+        "get_inactive_users": (lambda: db.get_inactive_users(), max(1, heavy_iterations // 10)),
+        "get_stats": (lambda: db.get_stats(), heavy_iterations),
+    }
+
+    results = {}
+    for name, (fn, count) in cases.items():
+        results[name] = measure(fn, count)
+        print(f"  {name:<26}{results[name]['ops_per_sec']:>12} ops/s"
+              f"{results[name]['p50_ms']:>10} p50{results[name]['p99_ms']:>10} p99 (ms)")
+    return results
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+def compare(current: Dict, baseline_path: str):
+    """Eski sonuçla karşılaştır - p50 ve ops/sn değişimi"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\n📈 Karşılaştırma: {baseline.get('revision')} → {current['revision']}")
+    for size, methods in current["results"].items():
+        old_methods = baseline.get("results", {}).get(size, {})
+        for name, stats in methods.items():
+            old = old_methods.get(name)
+            if not old or not old["ops_per_sec"]:
+                continue
+            change = (stats["ops_per_sec"] / old["ops_per_sec"] - 1) * 100
+            marker = "⚠️" if change < -10 else "  "
+            print(f"{marker} {size:>8} {name:<26}{change:>+8.1f}% ops/s"
+                  f"  p50 {old['p50_ms']} → {stats['p50_ms']} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Database metot benchmark'ı")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--iterations", type=int, default=2000, help="Hafif metotlar için tekrar")
+    parser.add_argument("--heavy-iterations", type=int, default=50, help="Tablo tarayan metotlar için tekrar")
+    parser.add_argument("--out", default=f"bench-{git_revision()}.json", help="Sonuç JSON dosyası")
+    parser.add_argument("--compare", help="Karşılaştırılacak eski sonuç dosyası")
+    parser.add_argument("--keep", action="store_true", help="Benchmark verisini silme")
+    args = parser.parse_args()
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": int(time.time()),
+        "iterations": args.iterations,
+        "heavy_iterations": args.heavy_iterations,
+        "results": {},
+    }
+
+    try:
+        for size in args.sizes:
+            print(f"🗄 {size} kullanıcı")
+            report["results"][str(size)] = run_size(size, args.iterations, args.heavy_iterations)
+    finally:
+        if not args.keep:
+            cleanup_bench_data(max(args.sizes))
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 Sonuçlar: {args.out}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
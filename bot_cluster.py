@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Çoklu İşçi Modülü - Webhook Ingress + user_id'ye Göre Dağıtım
+Her kullanıcının güncellemeleri hep aynı işçiye gider: sıra korunur,
+context.user_data ve bellek içi önbellekler işçi başına yerel kalır.
+Periyodik job'lar ve slot kurulumu sadece 0. işçide (koordinatör) çalışır.
+
+Çalıştırma: WEBHOOK_URL=https://... WORKER_COUNT=4 python bot_cluster.py
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Optional
+
+from telegram import Bot, Update
+
+# Ayarlar yan etkisiz modülden - Ingress DB'ye bağlanmaz, migration çalıştırmaz
+from bot_config import Config
+
+COORDINATOR_WORKER = 0  # Job'ları çalıştıran işçi
+
+# ============================================================================
+# YÖNLENDİRME
+# ============================================================================
+
+def extract_user_id(data: dict) -> Optional[int]:
+    """Ham güncellemeden yönlendirme anahtarı olan kullanıcı ID'sini çıkar"""
+    # Üyelik değişikliklerinde karar verilen kullanıcı üyenin kendisidir
+    for key in ("chat_member", "my_chat_member"):
+        if key in data:
+            return data[key].get("new_chat_member", {}).get("user", {}).get("id")
+
+    for key in (
+        "message", "edited_message", "callback_query", "inline_query",
+        "chosen_inline_result", "shipping_query", "pre_checkout_query",
+        "poll_answer", "chat_join_request"
+    ):
+        payload = data.get(key)
+        if not payload:
+            continue
+        sender = payload.get("from") or payload.get("user")
+        if sender:
+            return sender.get("id")
+        chat = payload.get("chat")
+        if chat:
+            return chat.get("id")
+    return None
+
+def route_update(data: dict, worker_count: int) -> int:
+    """Güncellemenin gideceği işçi - Kullanıcısı olmayanlar koordinatöre"""
+    user_id = extract_user_id(data)
+    if user_id is None:
+        return COORDINATOR_WORKER
+    return user_id % worker_count
+
+# ============================================================================
+# İŞÇİ SÜRECİ
+# ============================================================================
+
+async def run_worker(index: int, inbox):
+    """Updater'sız Application - Güncellemeler ingress kuyruğundan gelir"""
+    from bot_main import build_application
+    from bot_metrics import start_metrics_server
+
+    application = build_application(
+        run_jobs=(index == COORDINATOR_WORKER),
+        with_updater=False
+    )
+    if Config.METRICS_PORT:
+        start_metrics_server(Config.METRICS_PORT + index)
+    loop = asyncio.get_running_loop()
+
+    async with application:
+        # run_polling/run_webhook kullanılmadığı için post_init elle çağrılır
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        logging.info(f"👷 İşçi {index} hazır")
+
+        while True:
+            data = await loop.run_in_executor(None, inbox.get)
+            if data is None:
+                break
+            try:
+                update = Update.de_json(data, application.bot)
+            except Exception as e:
+                logging.error(f"Güncelleme çözümlenemedi (işçi {index}): {e}")
+                continue
+            await application.update_queue.put(update)
+
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+
+def worker_main(index: int, inbox):
+    """spawn ile başlatılan işçi giriş noktası"""
+    logging.basicConfig(
+        format=f'%(asctime)s - worker-{index} - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    try:
+        asyncio.run(run_worker(index, inbox))
+    except KeyboardInterrupt:
+        pass
+
+def migrate_main():
+    """Tek seferlik migration süreci - bot_main import edilince Database() tabloları kurar"""
+    logging.basicConfig(
+        format='%(asctime)s - migrate - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    import bot_main  # noqa: F401
+
+def run_migrations(ctx):
+    """Migration'lar işçilerden önce bir kez - İşçiler RUN_MIGRATIONS=0 ile başlar"""
+    process = ctx.Process(target=migrate_main, name="migrate")
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise SystemExit(f"❌ Migration süreci başarısız (çıkış kodu {process.exitcode})")
+    # spawn edilen işçiler ortamı devralır
+    os.environ["RUN_MIGRATIONS"] = "0"
+
+# ============================================================================
+# WEBHOOK INGRESS
+# ============================================================================
+
+def make_ingress_handler(inboxes: list):
+    """Webhook isteklerini ilgili işçinin kuyruğuna koyan HTTP handler"""
+
+    class IngressHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if Config.WEBHOOK_SECRET and \
+                    self.headers.get("X-Telegram-Bot-Api-Secret-Token") != Config.WEBHOOK_SECRET:
+                self.send_response(403)
+                self.end_headers()
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                data = json.loads(self.rfile.read(length))
+            except Exception as e:
+                logging.error(f"Geçersiz webhook gövdesi: {e}")
+                self.send_response(400)
+                self.end_headers()
+                return
+
+            inboxes[route_update(data, len(inboxes))].put(data)
+
+            # Telegram'a hemen cevap ver - İşleme işçide devam eder
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            # Her güncelleme için erişim logu yazma
+            pass
+
+    return IngressHandler
+
+async def register_webhook():
+    """Webhook'u Telegram'a kaydet"""
+    bot = Bot(Config.BOT_TOKEN)
+    async with bot:
+        await bot.set_webhook(
+            url=Config.WEBHOOK_URL,
+            secret_token=Config.WEBHOOK_SECRET or None,
+            allowed_updates=Update.ALL_TYPES
+        )
+
+def main():
+    """Ingress'i ve işçi süreçlerini başlat"""
+    logging.basicConfig(
+        format='%(asctime)s - ingress - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+
+    if not Config.WEBHOOK_URL:
+        raise SystemExit("❌ WEBHOOK_URL ayarlanmadı - Tek süreç için bot_main.py kullanın")
+
+    worker_count = max(1, Config.WORKER_COUNT)
+    ctx = multiprocessing.get_context("spawn")
+    run_migrations(ctx)
+
+    inboxes = [ctx.Queue() for _ in range(worker_count)]
+    workers = [
+        ctx.Process(target=worker_main, args=(i, inboxes[i]), name=f"worker-{i}")
+        for i in range(worker_count)
+    ]
+    for worker in workers:
+        worker.start()
+
+    asyncio.run(register_webhook())
+
+    # Tek thread: istekler geliş sırasıyla kuyruğa girer, aynı kullanıcının sırası bozulmaz
+    server = HTTPServer(("0.0.0.0", Config.WEBHOOK_PORT), make_ingress_handler(inboxes))
+    print(f"🤖 Ingress başladı - port {Config.WEBHOOK_PORT}, {worker_count} işçi")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for inbox in inboxes:
+            inbox.put(None)
+        for worker in workers:
+            worker.join(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Yapılandırma Modülü - Tüm ayarlar ortam değişkenlerinden veya sabitlerden
+Yan etkisi yoktur (DB bağlantısı, migration yok): Ingress gibi sadece ayar
+okuyan süreçler bot_main yerine bu modülü import eder.
+"""
+
+import os
+
+class Config:
+    """Bot yapılandırması - Tüm ayarlar buradan yönetilir"""
+
+    # ========== BOT AYARLARI ==========
+    BOT_TOKEN = os.getenv("BOT_TOKEN", "8133082070:AAE1rRGxQ9_Qqx-LZW54WFuFuGEo9FZhhWc")
+    ADMIN_IDS = [7172270461]  # Admin kullanıcı ID'leri
+    BOT_API_POOL_SIZE = 256  # Bot API HTTP bağlantı havuzu (handler, bildirim ve job'lar paylaşır)
+
+    # ========== VERİTABANI ==========
+    DATABASE_URL = os.getenv("DATABASE_URL")
+    RUN_MIGRATIONS = os.getenv("RUN_MIGRATIONS", "1") != "0"  # Cluster işçileri 0 ile başlar - Migration ingress'te bir kez
+
+    # ========== DİAMOND SİSTEMİ ==========
+    DIAMOND_TO_MANAT = 3.0  # 5 diamond = 1 manat
+    MIN_WITHDRAW_DIAMOND = 30.0  # Minimum çekilebilir diamond
+    MIN_REFERRAL_COUNT = 5  # Para çekmek için minimum referal sayısı
+
+    # Para çekme seçenekleri
+    WITHDRAW_OPTIONS = [30.0]
+    WITHDRAW_PAGE_SIZE = 5  # Admin onay kuyruğunda sayfa başına talep
+    WITHDRAW_ANNOUNCE_CHANNEL = "@diamond_labs"  # Onaylanan talepler bu kanala duyurulur
+
+    # ========== REFERAL SİSTEMİ ==========
+    REFERAL_REWARD = 0.5  # Referal çağıran kişiye verilecek diamond
+    NEW_USER_BONUS = 2.5  # Yeni kullanıcıya verilecek başlangıç diamond
+
+    # ========== İNAKTİVİTE CEZA SİSTEMİ - YENİ ==========
+    INACTIVITY_TIME = 86400  # 24 saat (saniye cinsinden) - kullanıcı bu süre boyunca aktif değilse ceza alır
+    INACTIVITY_PENALTY = -1.0  # İnaktivite cezası (diamond olarak)
+
+    # ========== OYUN AYARLARI ==========
+    # Not: cost = 0 ise oyun bedava, kazanırsa +win_reward, kaybederse -lose_penalty
+
+    # Almayı Tap Oyunu
+    APPLE_BOX_COST = 0.0  # Giriş ücreti (0 = bedava)
+    APPLE_BOX_WIN_REWARD = 1.0  # Kazanınca alınan diamond
+    APPLE_BOX_LOSE_PENALTY = -0.5  # Kaybedince düşen diamond
+    APPLE_BOX_WIN_CHANCE = 40  # Kazanma şansı (%)
+
+    # Lotereýa (Çeňil) - Kolay Scratch
+    SCRATCH_EASY_COST = 0.0
+    SCRATCH_EASY_WIN_REWARD = 1.0
+    SCRATCH_EASY_LOSE_PENALTY = -0.5
+    SCRATCH_EASY_WIN_CHANCE = 60  # %60 kazanma şansı
+
+    # Lotereýa (Kyn) - Zor Scratch
+    SCRATCH_HARD_COST = 0.0
+    SCRATCH_HARD_WIN_REWARD = 2.0
+    SCRATCH_HARD_LOSE_PENALTY = -0.5
+    SCRATCH_HARD_WIN_CHANCE = 25  # %25 kazanma şansı
+
+    # Şansly Aýlaw - Çarkıfelek
+    WHEEL_COST = 0.0  # Her zaman bedava
+    # Çarkıfelek ödülleri ve olasılıkları
+    WHEEL_REWARDS = [-2, -1, 0, 1, 2, 3, 4, 5, 10]  # Olası sonuçlar
+    WHEEL_WEIGHTS = [28, 32, 15, 12, 6, 3, 2, 1.5, 0.5]  # Her sonucun çıkma olasılığı (ağırlık)
+
+    # Oyun durumu callback_data içinde imzalı token olarak taşınır
+    CALLBACK_SECRET = os.getenv("CALLBACK_SECRET", "")  # Boşsa BOT_TOKEN'dan türetilir
+    GAME_TOKEN_TTL = 3600  # Başlatılan oyun bu süre içinde bitirilmeli (saniye)
+
+    # ========== SLOT OYUNU AYARLARI - YENİ ==========
+    SLOT_CHAT_ID = "-1002550606779"  # Slot oyununun oynandığı grup/kanal ID'si (örn: @diamond_slots veya -1001234567890)
+    SLOT_WIN_REWARD = 5.0  # Kazanınca alınan diamond (777)
+    SLOT_LOSE_PENALTY = -2.0  # Kaybedince düşen diamond
+    SLOT_WIN_CHANCE = 12  # Kazanma şansı (%)
+    # "animation": mesaj düzenleyerek sahte çark (~10 API çağrısı)
+    # "dice": Telegram'ın yerel 🎰 zarı - animasyonu istemci çizer, sonuç sunucudan gelir (2 API çağrısı)
+    SLOT_MODE = "animation"
+    SLOT_DICE_DELAY = 2.0  # 🎰 animasyonu bitene kadar sonucu bekletme süresi (saniye)
+
+    # ========== BONUS AYARLARI ==========
+    DAILY_BONUS_AMOUNT = 1.0  # Günlük bonus miktarı
+    DAILY_BONUS_COOLDOWN = 86400  # 24 saat (saniye cinsinden)
+
+    # ========== MİNİMUM BAKİYE KONTROLÜ ==========
+    MIN_BALANCE_TO_PLAY = 1.0  # Oyun oynamak için minimum bakiye
+    # Not: Oyunlar bedava olsa bile kullanıcının bakiyesi ekside olamaz
+
+    # ========== SPONSOR TÜRÜ ==========
+    SPONSOR_TYPE_REQUIRED = "required"  # /start için zorunlu kanallar
+    SPONSOR_TYPE_TASK = "task"  # Günlük görev kanalları
+
+    # ========== ÇOKLU İŞÇİ (WEBHOOK CLUSTER) ==========
+    # bot_cluster.py ile çalıştırılır - Güncellemeler user_id'ye göre işçilere dağıtılır
+    WORKER_COUNT = int(os.getenv("WORKER_COUNT", "4"))  # İşçi süreç sayısı
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # Telegram'ın güncelleme göndereceği public URL
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))  # Ingress'in dinlediği port
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")  # X-Telegram-Bot-Api-Secret-Token doğrulaması
+
+    # ========== EŞZAMANLI İŞLEME VE İDEMPOTENS ==========
+    CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "1"))  # Aynı anda işlenen güncelleme (1 = sıralı) - Kullanıcı başına sıra her değerde korunur
+    IDEMPOTENCY_CACHE_SIZE = 100000  # Bellekte tutulan işlenmiş işlem anahtarı
+    IDEMPOTENCY_RETENTION = 172800  # processed_actions kayıtları bu süre saklanır (saniye) - GAME_TOKEN_TTL'den uzun
+    TAP_WINDOW = 3  # Aynı butona bu süre içindeki ikinci basış yok sayılır (saniye)
+
+    # ========== FLOOD KONTROLÜ ==========
+    # Token bucket bütçeleri: (en fazla istek, saniye) - Aşan istekler DB/API'ye ulaşmaz
+    FLOOD_LIMITS = {
+        "slot_user": (5, 60),  # Kullanıcı başına slot çevirme
+        "slot_chat": (60, 60),  # Slot grubunun toplam çevirme hızı
+        "game_user": (10, 60),  # Kullanıcı başına oyun başlatma (game_play_)
+        "callback_user": (20, 10),  # Kullanıcı başına buton basışı
+        "command_user": (10, 60),  # Kullanıcı başına komut
+    }
+    FLOOD_BUCKET_SIZE = 200000  # Bellekte tutulan en fazla bucket
+
+    # ========== ÇOKLU İNSTANCE - JOB LİDERLİĞİ ==========
+    # Periyodik job'ları sadece advisory lock'u tutan instance çalıştırır
+    LEADER_LOCK_NAMESPACE = "oyun-bot"  # Lock anahtarı bu önekle üretilir
+    LEADER_RENEW_INTERVAL = 15  # Liderlik kontrolü/devralma aralığı (saniye)
+
+    # ========== METRİKLER ==========
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # /metrics portu - Varsayılan kapalı (cluster'da port + işçi no)
+    SLOW_QUERY_MS = 200  # Bu süreyi aşan SQL ifadeleri loglanır (milisaniye)
+    QUERY_PROFILE_SIZE = 500  # Profilde tutulan en fazla farklı SQL ifadesi
+
+    # ========== ÖNBELLEK AYARLARI ==========
+    PROMO_INDEX_TTL = 60  # Promo kod indeksi bu süreden sonra DB'den yenilenir (saniye)
+    PROMO_INDEX_RETRY_BACKOFF = 1  # Yenileme başarısızsa ilk bekleme, her hatada ikiye katlanır (en fazla TTL)
+    SPONSOR_CATALOG_TTL = 60  # Görev sponsor listesi bu süreden sonra DB'den yenilenir (saniye)
+    SPONSOR_PROGRESS_CACHE_SIZE = 50000  # Bellekte görev ilerlemesi tutulan en fazla kullanıcı
+    MEMBERSHIP_CACHE_TTL = 300  # "Agza" sonucu bu süre boyunca tekrar sorulmaz (saniye)
+    MEMBERSHIP_NEGATIVE_TTL = 3  # "Agza däl" sonucu kısa tutulur - kullanıcı hemen katılabilir
+    MEMBERSHIP_CACHE_SIZE = 100000  # Önbellekte tutulan en fazla (kullanıcı, kanal) sonucu
+    MEMBERSHIP_INDEX_SIZE = 200000  # chat_member olaylarından beslenen bellek içi üyelik kaydı sayısı
+    MEMBERSHIP_INDEX_TTL = 86400  # Üyelik indeksi kaydı bu süreden sonra eskir, API'ye tekrar sorulur (saniye)
+    BANNED_USERS_TTL = 60  # Ban listesi bu süreden sonra DB'den yenilenir (diğer işçi/instance banları)
+
+    # ========== SPONSOR DOĞRULAMA ==========
+    SPONSOR_VERIFY_INTERVAL = 300  # Doğrulama job'ı aralığı (saniye)
+    SPONSOR_VERIFY_DELAY = 3600  # Tamamlamadan bu süre sonra tekrar kontrol edilir (saniye)
+    SPONSOR_VERIFY_BATCH = 200  # Bir turda kontrol edilen en fazla tamamlama
+    SPONSOR_VERIFY_CONCURRENCY = 4  # Aynı anda en fazla getChatMember çağrısı
+    SPONSOR_VERIFY_PAUSE = 0.1  # Kontroller arasında bekleme (saniye) - ~10 kontrol/sn
+    SPONSOR_VERIFY_MAX_BACKLOG = 20  # İşlenen + kuyrukta bekleyen güncelleme bu sayıya ulaşınca doğrulama durur
+
+    # ========== ARKA PLAN BİLDİRİMLERİ ==========
+    NOTIFY_INTERVAL = 0.05  # Arka plan mesajları arasındaki bekleme (saniye)
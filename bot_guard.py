@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ön Filtre Modülü - İşlenmeyecek güncellemeleri handler'lara ulaşmadan düşürür
+Gruplardaki sohbet mesajları ve giriş beklenmeyen özel mesajlar -1 grubunda
+durdurulur; düşürülenler nedenine göre bot_updates_dropped_total'da sayılır.
+Giriş bekleyen kullanıcılar (promo kod, broadcast, toplu post) bellekte tutulur.
+Flood kontrolü: kullanıcı ve sohbet başına token bucket (Config.FLOOD_LIMITS).
+Banlı kullanıcıların güncellemeleri her şeyden önce, bellek içi kümeden düşürülür.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from telegram import Update
+from telegram.constants import ChatType
+from telegram.ext import ApplicationHandlerStop, ContextTypes
+
+from bot_main import db, Config
+from bot_metrics import metrics
+
+SLOT_TRIGGER_TEXT = "🎰 SLOT OÝNA"
+
+metrics.describe("bot_updates_dropped_total", "Ön filtrede düşürülen güncellemeler (neden)")
+metrics.describe("bot_updates_rate_limited_total", "Flood kontrolüne takılan güncellemeler (bütçe)")
+
+# ============================================================================
+# GİRİŞ BEKLEYEN KULLANICILAR
+# ============================================================================
+
+class AwaitingInput:
+    """Serbest metin/medya beklenen kullanıcılar - user_data bayraklarının aynası"""
+
+    def __init__(self):
+        self.users: Dict[int, Set[str]] = {}
+
+    def set(self, user_id: int, flag: str, value: bool):
+        if value:
+            self.users.setdefault(user_id, set()).add(flag)
+            return
+        flags = self.users.get(user_id)
+        if flags is not None:
+            flags.discard(flag)
+            if not flags:
+                del self.users[user_id]
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.users
+
+# Global küme - Aynı kullanıcı hep aynı işçiye yönlendirildiği için süreç başına yeterli
+awaiting_input = AwaitingInput()
+
+def set_waiting(update: Update, context: ContextTypes.DEFAULT_TYPE, flag: str, value: bool):
+    """user_data bayrağını ve ön filtre kümesini birlikte güncelle"""
+    context.user_data[flag] = value
+    awaiting_input.set(update.effective_user.id, flag, value)
+
+# ============================================================================
+# FLOOD KONTROLÜ
+# ============================================================================
+
+class TokenBucketLimiter:
+    """Anahtar başına token bucket - Boşta kalan bucket'lar LRU ile atılır"""
+
+    def __init__(self, max_buckets: int):
+        self.max_buckets = max_buckets
+        self.buckets: "OrderedDict[tuple, List[float]]" = OrderedDict()  # anahtar -> [token, son güncelleme]
+
+    def allow(self, key: tuple, capacity: int, period: float) -> bool:
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [float(capacity), now]
+            while len(self.buckets) > self.max_buckets:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * capacity / period)
+            bucket[1] = now
+
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+# Global limiter - Aynı kullanıcı hep aynı işçiye gittiği için süreç başına yeterli
+flood_limiter = TokenBucketLimiter(Config.FLOOD_BUCKET_SIZE)
+
+def flood_budgets(update: Update) -> List[tuple]:
+    """Güncellemenin harcadığı bütçeler - [(bütçe adı, anahtar)]"""
+    query = update.callback_query
+    if query is not None:
+        budgets = [("callback_user", query.from_user.id)]
+        if query.data and query.data.startswith("game_play_"):
+            budgets.append(("game_user", query.from_user.id))
+        return budgets
+
+    message = update.message
+    if message is None or message.from_user is None:
+        return []
+    if (message.text or "").startswith("/"):
+        return [("command_user", message.from_user.id)]
+    if message.text == SLOT_TRIGGER_TEXT:
+        return [("slot_user", message.from_user.id), ("slot_chat", message.chat_id)]
+    return []
+
+def over_budget(update: Update) -> Optional[str]:
+    """İlk aşılan bütçenin adı, yoksa None - Tüm bütçeler sırayla harcanır"""
+    for name, key in flood_budgets(update):
+        capacity, period = Config.FLOOD_LIMITS[name]
+        if not flood_limiter.allow((name, key), capacity, period):
+            return name
+    return None
+
+# ============================================================================
+# ÖN FİLTRE
+# ============================================================================
+
+def drop_reason(update: Update) -> Optional[str]:
+    """Güncelleme hiçbir handler'ı ilgilendirmiyorsa nedeni, yoksa None"""
+    user = update.effective_user
+    if user is not None and user.id not in Config.ADMIN_IDS and db.is_user_banned(user.id):
+        return "banned"
+
+    if update.edited_message or update.edited_channel_post:
+        return "edited"
+    if update.channel_post:
+        return "channel_post"
+
+    message = update.message
+    if message is None:
+        # Callback, chat_member vb. - Kendi handler'ları var
+        return None
+
+    text = message.text or ""
+    if text.startswith("/"):
+        return None
+
+    if message.chat.type == ChatType.PRIVATE:
+        # Özel sohbette serbest metin/medya sadece giriş beklenirken işlenir
+        if message.from_user and message.from_user.id in awaiting_input:
+            return None
+        return "private_idle"
+
+    # Gruplarda sadece slot grubundaki slot butonu işlenir
+    if text == SLOT_TRIGGER_TEXT and str(message.chat_id) == str(Config.SLOT_CHAT_ID):
+        return None
+    return "group_chatter"
+
+async def prefilter_update(update: object, context: ContextTypes.DEFAULT_TYPE):
+    """TypeHandler callback'i (-1 grubu) - İşlenmeyecek veya bütçeyi aşan güncellemede dispatch durur"""
+    if not isinstance(update, Update):
+        return
+    reason = drop_reason(update)
+    if reason is not None:
+        metrics.inc("bot_updates_dropped_total", (("reason", reason),))
+        raise ApplicationHandlerStop
+
+    budget = over_budget(update)
+    if budget is not None:
+        metrics.inc("bot_updates_rate_limited_total", (("budget", budget),))
+        # Butonun yükleniyor durumu kapanmalı - Tek hafif çağrı; mesajlar sessizce düşer
+        if update.callback_query is not None:
+            await update.callback_query.answer("⏳ Gaty çalt! Biraz garaşyň.")
+        raise ApplicationHandlerStop
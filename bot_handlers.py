@@ -5,12 +5,12 @@ Callback Handler Modülü - Tüm buton işlemleri
 Güncellenmiş Versiyon - Yeni Oyun Sistemi ve Sponsor Kontrolü
 """
 
-import asyncio
 import logging
 import random
 import time
 from collections import Counter
 from datetime import datetime
+from typing import Dict, List
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
 from telegram.ext import ContextTypes
@@ -29,151 +29,123 @@ from bot_main import (
 )
 
 # Import from bot_admin
-from bot_admin import (
-    show_admin_panel,
-    handle_admin_callbacks
+from bot_admin import register_admin_routes
+
+from bot_router import CallbackRouter
+
+# Animasyon beklemeleri metriklerde 'sleep' olarak sayılır
+from bot_metrics import pause
+
+from bot_guard import set_waiting
+
+from bot_tokens import (
+    CallbackCodec, TokenError, GAME_APPLE, GAME_SCRATCH, new_nonce
 )
 
+# Oyun durumu sunucuda değil, imzalı callback token'larında
+# Bitmiş oyunun nonce'u processed_actions'a yazılır - Aynı oyun iki kez sonuçlanmaz
+game_codec = CallbackCodec(Config.CALLBACK_SECRET or Config.BOT_TOKEN)
+
 # ============================================================================
 # CALLBACK HANDLERS
 # ============================================================================
 
 async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Tüm buton callback'lerini yönet"""
-    query = update.callback_query
-    await query.answer()
+    """Tüm buton callback'lerini yönet - Route tablosu modül sonunda kurulur"""
+    await callback_router.dispatch(update, context)
 
-    user_id = query.from_user.id
-    data = query.data
+async def cancel_promo_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Promo kod girişinden vazgeç"""
+    set_waiting(update, context, 'waiting_for_promo', False)
+    await show_earn_menu(update, context)
 
-    # HER İŞLEMDE AKTİVİTE GÜNCELLE - YENİ
-    db.update_last_activity(user_id)
+async def confirm_reset_diamonds(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Tüm diamond bakiyelerini sıfırla - Admin onayı"""
+    query = update.callback_query
+    await query.edit_message_text("⏳ İşlem yapılıyor...")
 
-    # Ana menü
-    if data == "back_main":
-        await show_main_menu(update, context)
+    affected = db.reset_all_diamonds()
 
-    # Kanal takibi kontrolü
-    elif data.startswith("check_membership_"):
-        await handle_membership_check(update, context)
+    if affected >= 0:
+        await query.edit_message_text(
+            f"✅ <b>TAMAMLANDI!</b>\n\n"
+            f"🔴 {affected} ullanyjynyň diamond bakiýesi 0 edildi!\n\n"
+            f"📊 Ähli diamond'lar aýryldy.",
+            parse_mode="HTML",
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("🔙 Admin Panel", callback_data="admin_panel")
+            ]])
+        )
+    else:
+        await query.edit_message_text(
+            "❌ Bir hata ýüze çykdy! Log'lara seredip görüň.",
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("🔙 Admin Panel", callback_data="admin_panel")
+            ]])
+        )
 
-    # Profil
-    elif data == "menu_profile":
-        await show_profile(update, context)
+async def cancel_reset_diamonds(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Diamond sıfırlamadan vazgeç"""
+    query = update.callback_query
+    await query.edit_message_text(
+        "✅ İşlem iptal edildi.",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("🔙 Admin Panel", callback_data="admin_panel")
+        ]])
+    )
 
-    # Diamond kazan menüsü
-    elif data == "menu_earn":
-        await show_earn_menu(update, context)
+def build_callback_router() -> CallbackRouter:
+    """
+    Tüm buton route'ları - Her callback her işlemde aktiviteyi günceller
+    dedupe_taps: bakiye değiştiren butonlarda çift basış tek işlenir
+    """
+    router = CallbackRouter()
 
-    # Oyunlar
-    elif data == "earn_games":
-        await show_games_menu(update, context)
+    # Ana menü
+    router.add("back_main", show_main_menu)
 
-    # Para çekme
-    elif data == "menu_withdraw":
-        await show_withdraw_menu(update, context)
+    # Kanal takibi kontrolü
+    router.add("check_membership_", handle_membership_check, prefix=True)
 
-    # Para çekme miktarı seçimi
-    elif data.startswith("withdraw_request_"):
-        await handle_withdraw_request(update, context)
+    # Menüler
+    router.add("menu_profile", show_profile, needs_user=True)
+    router.add("menu_earn", show_earn_menu)
+    router.add("earn_games", show_games_menu)
+    router.add("menu_faq", show_faq)
 
-    # SSS
-    elif data == "menu_faq":
-        await show_faq(update, context)
+    # Para çekme
+    router.add("menu_withdraw", show_withdraw_menu, needs_user=True)
+    router.add("withdraw_request_", handle_withdraw_request, prefix=True, needs_user=True, dedupe_taps=True)
 
     # Günlük bonus
-    elif data == "earn_daily_bonus":
-        await claim_daily_bonus(update, context)
+    router.add("earn_daily_bonus", claim_daily_bonus, needs_user=True, dedupe_taps=True)
 
     # Günlük görevler (Sponsor sistemi)
-    elif data == "earn_tasks":
-        await show_daily_tasks(update, context)
-
-    # Sponsor takip
-    elif data.startswith("sponsor_check_"):
-        await handle_sponsor_check(update, context)
+    router.add("earn_tasks", show_daily_tasks)
+    router.add("sponsor_check_", handle_sponsor_check, prefix=True, dedupe_taps=True)
 
-    elif data == "menu_daily_top":
-        await show_daily_top_menu(update, context)
-
-    elif data == "daily_top_diamonds":
-        await show_daily_top_diamonds(update, context)
-
-    elif data == "daily_top_referrals":
-        await show_daily_top_referrals(update, context)
-
-    elif data == "daily_top_withdrawn":
-        await show_daily_top_withdrawn(update, context)
+    # Günlük top
+    router.add("menu_daily_top", show_daily_top_menu)
+    router.add("daily_top_diamonds", show_daily_top_diamonds)
+    router.add("daily_top_referrals", show_daily_top_referrals)
+    router.add("daily_top_withdrawn", show_daily_top_withdrawn)
 
     # Promo kod
-    elif data == "earn_promo":
-        await show_promo_input(update, context)
-
-    elif data == "earn_promo_cancel":
-        context.user_data['waiting_for_promo'] = False
-        await show_earn_menu(update, context)
+    router.add("earn_promo", show_promo_input)
+    router.add("earn_promo_cancel", cancel_promo_input)
 
-    # Oyunlar - Bilgi ekranı
-    elif data.startswith("game_") and not data.startswith("game_play_"):
-        await handle_game_info(update, context)
+    # Oyunlar - game_play_ daha uzun önek olduğu için bilgi ekranından önce eşleşir
+    router.add("game_", handle_game_info, prefix=True, needs_user=True)
+    router.add("game_play_", handle_game_start, prefix=True, needs_user=True, dedupe_taps=True)
+    router.add("apple_choice_", handle_apple_choice, prefix=True, dedupe_taps=True)
+    router.add("scratch_reveal_", handle_scratch_reveal, prefix=True, dedupe_taps=True)
 
-    # Oyun başlatma
-    elif data.startswith("game_play_"):
-        await handle_game_start(update, context)
+    # Admin
+    register_admin_routes(router)
+    router.add("confirm_reset_diamonds", confirm_reset_diamonds, requires_admin=True)
+    router.add("cancel_reset_diamonds", cancel_reset_diamonds, requires_admin=True)
 
-    # Elma kutusu seçimi
-    elif data.startswith("apple_choice_"):
-        await handle_apple_choice(update, context)
-
-    # Kazı kazan açma
-    elif data.startswith("scratch_reveal_"):
-        await handle_scratch_reveal(update, context)
-
-    # Admin paneli
-    elif data == "admin_panel":
-        if user_id in Config.ADMIN_IDS:
-            await show_admin_panel(update, context)
-        else:
-            await query.answer("❌ Siziň admin wezipaňiz ýok!", show_alert=True)
-
-    # Admin işlemleri
-    elif data.startswith("admin_"):
-        await handle_admin_callbacks(update, context)
-
-    # Admin diamond reset callbacks
-    elif data == "confirm_reset_diamonds":
-        if user_id in Config.ADMIN_IDS:
-            await query.edit_message_text("⏳ İşlem yapılıyor...")
-
-            affected = db.reset_all_diamonds()
-
-            if affected >= 0:
-                await query.edit_message_text(
-                    f"✅ <b>TAMAMLANDI!</b>\n\n"
-                    f"🔴 {affected} ullanyjynyň diamond bakiýesi 0 edildi!\n\n"
-                    f"📊 Ähli diamond'lar aýryldy.",
-                    parse_mode="HTML",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Admin Panel", callback_data="admin_panel")
-                    ]])
-                )
-            else:
-                await query.edit_message_text(
-                    "❌ Bir hata ýüze çykdy! Log'lara seredip görüň.",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Admin Panel", callback_data="admin_panel")
-                    ]])
-                )
-        else:
-            await query.answer("⛔ Siziň admin wezipaňiz ýok!", show_alert=True)
-
-    elif data == "cancel_reset_diamonds":
-        await query.edit_message_text(
-            "✅ İşlem iptal edildi.",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Admin Panel", callback_data="admin_panel")
-            ]])
-        )
+    return router
 
 # ============================================================================
 # KANAL TAKİBİ KONTROLÜ - GELİŞTİRİLMİŞ
@@ -240,38 +212,38 @@ async def handle_membership_check(update: Update, context: ContextTypes.DEFAULT_
         )
         return
 
-    # Kullanıcıyı kaydet
-    existing_user = db.get_user(user.id)
+    # Kullanıcıyı kaydet - zaten varsa hiçbir şey değişmez
+    signup = db.create_user(user.id, user.username or "noname", referred_by)
 
-    if not existing_user:
-        db.create_user(user.id, user.username or "noname", referred_by)
+    if signup is None:
+        await query.edit_message_text("❌ Bir hata ýüze çykdy! Biraz soňra täzeden synanyşyň.")
+        return
 
+    if signup['created']:
         welcome_msg = (
             f"🎊 <b>Gutlaýarys {user.first_name}!</b>\n\n"
             f"💎 Başlangyç bonusy: <b>{Config.NEW_USER_BONUS} diamond</b>\n"
         )
 
-        if referred_by:
+        if signup['referral_count'] is not None:
             welcome_msg += f"🎁 Sizi çagyran adama hem <b>{Config.REFERAL_REWARD} diamond</b> berildi!\n"
 
             try:
-                referrer_data = db.get_user(referred_by)
-                if referrer_data:
-                    await context.bot.send_message(
-                        chat_id=referred_by,
-                        text=(
-                            f"🎉 <b>Täze Referal!</b>\n\n"
-                            f"👤 @{user.username or user.first_name} siziň referalyňyz bilen bota goşuldy!\n"
-                            f"💎 Bonus: <b>+{Config.REFERAL_REWARD} diamond</b>\n\n"
-                            f"👥 Jemi referalyňyz: <b>{referrer_data['referral_count'] + 1}</b>"
-                        ),
-                        parse_mode="HTML"
-                    )
+                await context.bot.send_message(
+                    chat_id=referred_by,
+                    text=(
+                        f"🎉 <b>Täze Referal!</b>\n\n"
+                        f"👤 @{user.username or user.first_name} siziň referalyňyz bilen bota goşuldy!\n"
+                        f"💎 Bonus: <b>+{Config.REFERAL_REWARD} diamond</b>\n\n"
+                        f"👥 Jemi referalyňyz: <b>{signup['referral_count']}</b>"
+                    ),
+                    parse_mode="HTML"
+                )
             except Exception as e:
                 logging.error(f"Duýdyryş ugradylmady: {e}")
 
         await query.edit_message_text(welcome_msg, parse_mode="HTML")
-        await asyncio.sleep(2)
+        await pause(2)
 
     await show_main_menu(update, context)
 
@@ -284,11 +256,8 @@ async def show_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     user_id = query.from_user.id
 
-    user_data = db.get_user(user_id)
-
-    if not user_data:
-        await query.answer("❌ Hata! /start ile başlayın", show_alert=True)
-        return
+    # Kayıt kontrolü router'da yapıldı (needs_user)
+    user_data = context.user_record
 
     bot_username = (await context.bot.get_me()).username
     referral_link = f"https://t.me/{bot_username}?start={user_id}"
@@ -380,14 +349,10 @@ async def show_games_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def handle_game_info(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Oyun bilgilerini göster - Güncellenmiş"""
     query = update.callback_query
-    user_id = query.from_user.id
     data = query.data
 
-    user_data = db.get_user(user_id)
-
-    if not user_data:
-        await query.answer("❌ Hata! /start ile başlayın", show_alert=True)
-        return
+    # Kayıt kontrolü router'da yapıldı (needs_user)
+    user_data = context.user_record
 
     balance = user_data['diamond']
 
@@ -485,16 +450,12 @@ async def handle_game_info(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def handle_game_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Oyunu gerçekten başlat - Güncellenmiş"""
     query = update.callback_query
-    user_id = query.from_user.id
 
     # game_play_game_apple -> game_apple
     game_data = query.data.replace("game_play_", "")
 
-    user_data = db.get_user(user_id)
-
-    if not user_data:
-        await query.answer("❌ Hata! /start ile başlayın", show_alert=True)
-        return
+    # Kayıt kontrolü router'da yapıldı (needs_user)
+    user_data = context.user_record
 
     balance = user_data['diamond']
 
@@ -520,6 +481,15 @@ async def handle_game_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ELMA KUTUSU OYUNU - GÜNCELLENMİŞ
 # ============================================================================
 
+async def show_game_expired(query):
+    """Token geçersiz veya süresi dolmuş - Oyun menüsüne dön"""
+    await query.edit_message_text(
+        "⌛ Bu oýunyň möhleti geçdi. Täzeden başlaň!",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("🔙 Oýunlar", callback_data="earn_games")
+        ]])
+    )
+
 async def play_apple_box_game(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Kutudaki Elmayı Bul oyunu - Bedava ama kayıplarda ceza"""
     query = update.callback_query
@@ -527,21 +497,26 @@ async def play_apple_box_game(update: Update, context: ContextTypes.DEFAULT_TYPE
 
     # Animasyon
     await query.edit_message_text("🎁 Oýun başlaýar...")
-    await asyncio.sleep(1)
+    await pause(1)
 
     await query.edit_message_text("📦 Gutular taýýarlanýar...")
-    await asyncio.sleep(1)
+    await pause(1)
 
     await query.edit_message_text("🔄 Gutular garyşdyrylýar...")
-    await asyncio.sleep(1.5)
+    await pause(1.5)
 
-    # Elma konumu rastgele
+    # Elma konumu rastgele - Token'da şifreli taşınır
     apple_pos = random.randint(0, 2)
+    nonce, started_at = new_nonce(), int(time.time())
 
     keyboard = [[
-        InlineKeyboardButton("📦 1", callback_data=f"apple_choice_0_{apple_pos}"),
-        InlineKeyboardButton("📦 2", callback_data=f"apple_choice_1_{apple_pos}"),
-        InlineKeyboardButton("📦 3", callback_data=f"apple_choice_2_{apple_pos}")
+        InlineKeyboardButton(
+            f"📦 {choice + 1}",
+            callback_data="apple_choice_" + game_codec.encode(
+                GAME_APPLE, user_id, nonce, started_at, bytes([choice]), bytes([apple_pos])
+            )
+        )
+        for choice in range(3)
     ]]
 
     await query.edit_message_text(
@@ -554,16 +529,27 @@ async def play_apple_box_game(update: Update, context: ContextTypes.DEFAULT_TYPE
 async def handle_apple_choice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Kutu seçimi - Güncellenmış ödül sistemi"""
     query = update.callback_query
-    await query.answer()
-
     user_id = query.from_user.id
-    data = query.data.split("_")
-    choice = int(data[2])
-    apple_pos = int(data[3])
+
+    try:
+        nonce, _, public, secret = game_codec.decode(
+            query.data[len("apple_choice_"):], GAME_APPLE, user_id, 1, Config.GAME_TOKEN_TTL
+        )
+    except TokenError as e:
+        logging.warning(f"Elma token'ı reddedildi {user_id}: {e}")
+        await show_game_expired(query)
+        return
+
+    choice = public[0]
+    apple_pos = secret[0]
+
+    # Bu oyunun sonucu zaten verildi (eski buton tekrar gönderildi)
+    if not db.claim_action(f"game:{user_id}:{nonce}", user_id):
+        return
 
     # Animasyon
     await query.edit_message_text("📦 Gutu açylýar...")
-    await asyncio.sleep(1.5)
+    await pause(1.5)
 
     if choice == apple_pos:
         # Kazandı - Diamond ekle
@@ -606,20 +592,64 @@ async def handle_apple_choice(update: Update, context: ContextTypes.DEFAULT_TYPE
 # KAZI KAZAN OYUNU - GÜNCELLENMİŞ
 # ============================================================================
 
+# Zorluk ayarları: (meyveler, her meyveden kart sayısı) - Sıra token'daki kart kodlarıdır
+SCRATCH_LEVELS = {
+    "easy": (["🍎", "🍊", "🍇"], [4, 3, 2]),
+    "hard": (["🍎", "🍊", "🍇", "🍋", "🍓", "🍉"], [3, 1, 1, 1, 1, 2]),
+}
+SCRATCH_DIFFICULTIES = ["easy", "hard"]
+
+def encode_scratch_click(user_id: int, game: Dict, idx: int) -> str:
+    """Kart butonu callback'i - Açık: kart no, açılanlar, hak, zorluk; şifreli: dizilim"""
+    fruits = SCRATCH_LEVELS[game['difficulty']][0]
+    layout = 0
+    for i, card in enumerate(game['cards']):
+        layout |= fruits.index(card) << (3 * i)
+    revealed = sum(1 << i for i, r in enumerate(game['revealed']) if r)
+    public = bytes([idx]) + revealed.to_bytes(2, "big") + bytes([
+        SCRATCH_DIFFICULTIES.index(game['difficulty']) << 4 | game['attempts']
+    ])
+    token = game_codec.encode(
+        GAME_SCRATCH, user_id, game['nonce'], game['started_at'], public, layout.to_bytes(4, "big")
+    )
+    return f"scratch_reveal_{token}"
+
+def decode_scratch_click(user_id: int, data: str) -> tuple:
+    """Returns: (oyun durumu, tıklanan kart no) - Geçersizse TokenError"""
+    nonce, started_at, public, secret = game_codec.decode(
+        data[len("scratch_reveal_"):], GAME_SCRATCH, user_id, 4, Config.GAME_TOKEN_TTL
+    )
+    idx = public[0]
+    revealed = int.from_bytes(public[1:3], "big")
+    level, attempts = public[3] >> 4, public[3] & 0x0F
+    if idx > 8 or level >= len(SCRATCH_DIFFICULTIES):
+        raise TokenError("Geçersiz oyun durumu")
+
+    difficulty = SCRATCH_DIFFICULTIES[level]
+    fruits = SCRATCH_LEVELS[difficulty][0]
+    layout = int.from_bytes(secret, "big")
+    codes = [layout >> (3 * i) & 0x07 for i in range(9)]
+    if max(codes) >= len(fruits):
+        raise TokenError("Geçersiz oyun durumu")
+
+    game = {
+        'nonce': nonce,
+        'started_at': started_at,
+        'difficulty': difficulty,
+        'cards': [fruits[code] for code in codes],
+        'revealed': [bool(revealed >> i & 1) for i in range(9)],
+        'attempts': attempts,
+    }
+    return game, idx
+
 async def play_scratch_game(update: Update, context: ContextTypes.DEFAULT_TYPE, difficulty: str):
     """Kazı Kazan oyunu - Bedava ama kayıplarda ceza"""
     query = update.callback_query
 
     await query.edit_message_text("🎰 Lotereýa taýýarlanýar...")
-    await asyncio.sleep(1)
+    await pause(1)
 
-    # Zorluk ayarları
-    if difficulty == "easy":
-        fruits = ["🍎", "🍊", "🍇"]
-        distribution = [4, 3, 2]
-    else:  # hard
-        fruits = ["🍎", "🍊", "🍇", "🍋", "🍓", "🍉"]
-        distribution = [3, 1, 1, 1, 1, 2]
+    fruits, distribution = SCRATCH_LEVELS[difficulty]
 
     # Kartları oluştur
     cards = []
@@ -627,21 +657,26 @@ async def play_scratch_game(update: Update, context: ContextTypes.DEFAULT_TYPE,
         cards.extend([fruit] * count)
     random.shuffle(cards)
 
-    # Oyun durumunu sakla
-    context.user_data['scratch_cards'] = cards
-    context.user_data['scratch_revealed'] = [False] * 9
-    context.user_data['scratch_attempts'] = 4
-    context.user_data['scratch_difficulty'] = difficulty
+    # Oyun durumu butonlardaki token'larda taşınır
+    game = {
+        'nonce': new_nonce(),
+        'started_at': int(time.time()),
+        'difficulty': difficulty,
+        'cards': cards,
+        'revealed': [False] * 9,
+        'attempts': 4,
+    }
 
-    await show_scratch_board(update, context)
+    await show_scratch_board(update, game)
 
-async def show_scratch_board(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def show_scratch_board(update: Update, game: Dict):
     """Kazı Kazan tahtasını göster"""
     query = update.callback_query
+    user_id = query.from_user.id
 
-    revealed = context.user_data.get('scratch_revealed', [])
-    cards = context.user_data.get('scratch_cards', [])
-    attempts = context.user_data.get('scratch_attempts', 4)
+    revealed = game['revealed']
+    cards = game['cards']
+    attempts = game['attempts']
 
     keyboard = []
     for i in range(3):
@@ -651,7 +686,7 @@ async def show_scratch_board(update: Update, context: ContextTypes.DEFAULT_TYPE)
             if revealed[idx]:
                 row.append(InlineKeyboardButton(cards[idx], callback_data=f"scratch_x_{idx}"))
             else:
-                row.append(InlineKeyboardButton("❓", callback_data=f"scratch_reveal_{idx}"))
+                row.append(InlineKeyboardButton("❓", callback_data=encode_scratch_click(user_id, game, idx)))
         keyboard.append(row)
 
     text = (
@@ -669,25 +704,32 @@ async def show_scratch_board(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def handle_scratch_reveal(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Kazı Kazan kartını aç - Güncellenmiş ödül sistemi"""
     query = update.callback_query
-    await query.answer()
-
     user_id = query.from_user.id
-    idx = int(query.data.split("_")[2])
 
-    revealed = context.user_data.get('scratch_revealed', [])
+    try:
+        game, idx = decode_scratch_click(user_id, query.data)
+    except TokenError as e:
+        logging.warning(f"Lotereýa token'ı reddedildi {user_id}: {e}")
+        await show_game_expired(query)
+        return
+
+    revealed = game['revealed']
 
-    if revealed[idx]:
+    # Kart zaten açık veya oyun bitmiş (eski buton tekrar gönderildi)
+    game_key = f"game:{user_id}:{game['nonce']}"
+    if revealed[idx] or game['attempts'] == 0 or db.is_action_claimed(game_key):
         return
 
-    revealed[idx] = True
-    context.user_data['scratch_revealed'] = revealed
-    context.user_data['scratch_attempts'] -= 1
+    # Her tahta durumunda tek kart açılır - Aynı tahtanın diğer token'ları tekrar
+    # gönderilip dizilim kart kart öğrenilemez
+    if not db.claim_action(f"{game_key}:{game['attempts']}", user_id):
+        return
 
-    attempts = context.user_data['scratch_attempts']
-    cards = context.user_data['scratch_cards']
+    revealed[idx] = True
+    game['attempts'] -= 1
 
-    # Önce tahtayı güncelle
-    await show_scratch_board(update, context)
+    attempts = game['attempts']
+    cards = game['cards']
 
     # Kazanma kontrolü
     revealed_cards = [cards[i] for i, r in enumerate(revealed) if r]
@@ -702,12 +744,20 @@ async def handle_scratch_reveal(update: Update, context: ContextTypes.DEFAULT_TY
             winning_fruit = fruit
             break
 
+    # Oyun bittiyse sonuç tek sefer verilir - Beklemeden önce işaretle
+    finished = won or attempts == 0
+    if finished and not db.claim_action(game_key, user_id):
+        return
+
+    # Önce tahtayı güncelle
+    await show_scratch_board(update, game)
+
     # Eğer oyun bittiyse (kazandı veya denemeler bitti)
-    if won or attempts == 0:
+    if finished:
         # Kısa bir bekleme
-        await asyncio.sleep(1)
+        await pause(1)
 
-        difficulty = context.user_data['scratch_difficulty']
+        difficulty = game['difficulty']
 
         if won:
             # Kazandı - Diamond ekle
@@ -715,10 +765,10 @@ async def handle_scratch_reveal(update: Update, context: ContextTypes.DEFAULT_TY
             db.update_diamond(user_id, reward)
 
             # Tüm kartları göster
-            context.user_data['scratch_revealed'] = [True] * 9
-            await show_scratch_board(update, context)
+            game['revealed'] = [True] * 9
+            await show_scratch_board(update, game)
 
-            await asyncio.sleep(0.5)
+            await pause(0.5)
 
             await query.message.reply_text(
                 f"🎉 <b>GUTLAÝARYS!</b>\n\n"
@@ -735,10 +785,10 @@ async def handle_scratch_reveal(update: Update, context: ContextTypes.DEFAULT_TY
             db.update_diamond(user_id, penalty)
 
             # Tüm kartları göster
-            context.user_data['scratch_revealed'] = [True] * 9
-            await show_scratch_board(update, context)
+            game['revealed'] = [True] * 9
+            await show_scratch_board(update, game)
 
-            await asyncio.sleep(0.5)
+            await pause(0.5)
 
             await query.message.reply_text(
                 f"😢 <b>Gynandyryjy...</b>\n\n"
@@ -765,7 +815,7 @@ async def play_wheel_game(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # Animasyon - ödülleri göster
     await query.edit_message_text("🎡 <b>Şansly Aýlaw taýýarlanýar...</b>", parse_mode="HTML")
-    await asyncio.sleep(1)
+    await pause(1)
 
     # Çarkta ne var göster
     rewards_text = "🎡 <b>Aýlawdaky baýraklar:</b>\n\n"
@@ -778,7 +828,7 @@ async def play_wheel_game(update: Update, context: ContextTypes.DEFAULT_TYPE):
             rewards_text += f"⚠️ {reward} diamond (jeza)\n"
 
     await query.edit_message_text(rewards_text, parse_mode="HTML")
-    await asyncio.sleep(2)
+    await pause(2)
 
     # Çark dönüyor
     spin_frames = [
@@ -795,13 +845,13 @@ async def play_wheel_game(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     for frame in spin_frames:
         await query.edit_message_text(frame, parse_mode="HTML")
-        await asyncio.sleep(0.4)
+        await pause(0.4)
 
     await query.edit_message_text("🎡 <b>Aýlaw haýallaýar...</b>", parse_mode="HTML")
-    await asyncio.sleep(1)
+    await pause(1)
 
     await query.edit_message_text("🎡 <b>Aýlaw durdy...</b>", parse_mode="HTML")
-    await asyncio.sleep(1)
+    await pause(1)
 
     # Sonuç seç - AĞIRLIKLI RASTGELE
     result = random.choices(rewards, weights=weights)[0]
@@ -834,6 +884,59 @@ async def play_wheel_game(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # SLOT OYUNU - DÜZELTİLMİŞ VERSİYON
 # ============================================================================
 
+# 🎰 zarının değeri (1-64) üç makarayı 4 tabanında kodlar: BAR, üzüm, limon, yedi
+SLOT_DICE_SYMBOLS = ["BAR", "🍇", "🍋", "7️⃣"]
+
+def decode_slot_dice(value: int) -> List[str]:
+    """Zar değerini soldan sağa makara sembollerine çevir"""
+    return [SLOT_DICE_SYMBOLS[((value - 1) >> (2 * reel)) & 3] for reel in range(3)]
+
+def slot_dice_winners(win_chance: float) -> set:
+    """
+    Kazandıran zar değerleri - 64 değerin SLOT_WIN_CHANCE kadarı
+    Önce üçlüler (777 başta), sonra en çok 7 içerenler kazanır
+    """
+    def rank(value: int):
+        reels = decode_slot_dice(value)
+        return (len(set(reels)) == 1, reels.count("7️⃣"), value)
+
+    count = round(64 * win_chance / 100)
+    return set(sorted(range(1, 65), key=rank, reverse=True)[:count])
+
+SLOT_DICE_WINNERS = slot_dice_winners(Config.SLOT_WIN_CHANCE)
+
+async def play_slot_dice(update: Update, context: ContextTypes.DEFAULT_TYPE, balance: float):
+    """Yerel 🎰 zarı ile slot - Bir gönderim + bir sonuç cevabı"""
+    message = update.message
+    user_id = message.from_user.id
+
+    dice_msg = await message.reply_dice(emoji="🎰", reply_to_message_id=message.message_id)
+    value = dice_msg.dice.value
+    reels = " ".join(decode_slot_dice(value))
+
+    if value in SLOT_DICE_WINNERS:
+        reward = Config.SLOT_WIN_REWARD
+        result_text = (
+            f"🎰 [ {reels} ]\n\n"
+            f"🎉 <b>GUTLAÝARYS</b> @{message.from_user.username or message.from_user.first_name}!\n"
+            f"💎 Gazanç: <b>+{reward:.1f} diamond</b>\n"
+            f"💰 Täze balans: <b>{balance + reward:.1f} diamond</b>"
+        )
+    else:
+        reward = Config.SLOT_LOSE_PENALTY
+        result_text = (
+            f"🎰 [ {reels} ]\n\n"
+            f"😢 <b>Gynandyryjy...</b>\n"
+            f"💎 Ýitirilen: <b>{reward} diamond</b>\n"
+            f"💰 Täze balans: <b>{balance + reward:.1f} diamond</b>\n"
+            f"💪 Täzeden synanyşyň!"
+        )
+    db.update_diamond(user_id, reward)
+
+    # Sonucu animasyon bitince göster - Bekleme API çağrısı değildir
+    await pause(Config.SLOT_DICE_DELAY)
+    await dice_msg.reply_text(result_text, parse_mode="HTML")
+
 async def play_slot_game(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Slot oyunu - Sadece belirli grupta çalışır"""
     message = update.message
@@ -870,6 +973,10 @@ async def play_slot_game(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
+    if Config.SLOT_MODE == "dice":
+        await play_slot_dice(update, context, balance)
+        return
+
     # Animasyon başlat
     animation_msg = await message.reply_text(
         "🎰 <b>SLOT çark aýlanýar...</b>",
@@ -892,7 +999,7 @@ async def play_slot_game(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
         except:
             pass  # Rate limit hatalarını yoksay
-        await asyncio.sleep(0.3)
+        await pause(0.3)
 
     # Sonucu belirle - Şans kontrolü
     is_winner = random.randint(1, 100) <= Config.SLOT_WIN_CHANCE
@@ -963,13 +1070,9 @@ async def play_slot_game(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def show_withdraw_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Para çekme menüsü"""
     query = update.callback_query
-    user_id = query.from_user.id
 
-    user_data = db.get_user(user_id)
-
-    if not user_data:
-        await query.answer("❌ Hata! /start ile başlayın", show_alert=True)
-        return
+    # Kayıt kontrolü router'da yapıldı (needs_user)
+    user_data = context.user_record
 
     can_withdraw = (
         user_data['diamond'] >= Config.MIN_WITHDRAW_DIAMOND and
@@ -1032,11 +1135,8 @@ async def handle_withdraw_request(update: Update, context: ContextTypes.DEFAULT_
     amount_str = query.data.split("_")[2]
     amount = float(amount_str)
 
-    user_data = db.get_user(user_id)
-
-    if not user_data:
-        await query.answer("❌ Hata! /start ile başlayın", show_alert=True)
-        return
+    # Kayıt kontrolü router'da yapıldı (needs_user)
+    user_data = context.user_record
 
     # Son kontroller
     if user_data['diamond'] < amount:
@@ -1047,7 +1147,7 @@ async def handle_withdraw_request(update: Update, context: ContextTypes.DEFAULT_
         await query.answer(f"❌ Azyndan {Config.MIN_REFERRAL_COUNT} referal çagyrmalysynyz!", show_alert=True)
         return
 
-    # Para çekme talebini oluştur
+    # Para çekme talebini oluştur - diamond bu anda bloke edilir
     manat_amount = amount / Config.DIAMOND_TO_MANAT
     request_id = db.create_withdrawal_request(
         user_id,
@@ -1056,6 +1156,14 @@ async def handle_withdraw_request(update: Update, context: ContextTypes.DEFAULT_
         manat_amount
     )
 
+    if request_id == -1:
+        await query.answer("❌ Ýeterlik diamond ýok!", show_alert=True)
+        return
+
+    if request_id == -2:
+        await query.answer("⏳ Siziň garaşylýan talabyňyz eýýäm bar!", show_alert=True)
+        return
+
     # Kullanıcıya bildirim
     await query.edit_message_text(
         f"✅ <b>Talap döredildi!</b>\n\n"
@@ -1063,7 +1171,7 @@ async def handle_withdraw_request(update: Update, context: ContextTypes.DEFAULT_
         f"💎 Mukdar: <b>{amount:.1f} diamond</b>\n"
         f"💵 Manat: <b>{manat_amount:.2f} TMT</b>\n\n"
         f"⏳ Admin siziň talabyňyzy gözden geçirer we siz bilen habarlaşar.\n\n"
-        f"⚠️ Talap kabul edilende diamond hasabyňyzdan düşüriler.",
+        f"🔒 Diamond hasabyňyzdan saklanyldy. Talap ret edilse yzyna gaýtarylar.",
         parse_mode="HTML",
         reply_markup=InlineKeyboardMarkup([[
             InlineKeyboardButton("🔙 Yza gaýt", callback_data="back_main")
@@ -1099,11 +1207,7 @@ async def show_daily_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     user_id = query.from_user.id
 
-    # Günlük reset kontrolü
-    if db.check_daily_task_reset(user_id):
-        db.reset_user_daily_tasks(user_id)
-
-    # Bir sonraki sponsoru getir
+    # Bir sonraki sponsoru getir - tamamlamalar güne göre gruplandığı için ayrı reset gerekmez
     sponsor = db.get_user_next_sponsor(user_id)
 
     if not sponsor:
@@ -1160,6 +1264,11 @@ async def handle_sponsor_check(update: Update, context: ContextTypes.DEFAULT_TYP
 
     sponsor_id = int(query.data.split("_")[2])
 
+    # Tamamlanmış görev için API'ye gitme - yerel bitmap'ten cevapla
+    if db.check_sponsor_completed(user_id, sponsor_id):
+        await query.answer("❌ Bu zadanýany tamamladyňyz!", show_alert=True)
+        return
+
     # Sponsor bilgilerini getir
     sponsor = db.get_sponsor_by_id(sponsor_id)
 
@@ -1199,7 +1308,7 @@ async def show_promo_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Promo kod girişi"""
     query = update.callback_query
 
-    context.user_data['waiting_for_promo'] = True
+    set_waiting(update, context, 'waiting_for_promo', True)
 
     await query.edit_message_text(
         "🎟 <b>Promo Kod</b>\n\n"
@@ -1248,7 +1357,7 @@ async def handle_promo_code_input(update: Update, context: ContextTypes.DEFAULT_
             parse_mode="HTML"
         )
     else:
-        db.update_diamond(user_id, result)
+        # Diamond use_promo_code içinde aynı transaction'da eklendi
         await update.message.reply_text(
             f"🎉 <b>GUTLAÝARYS!</b>\n\n"
             f"💎 Siz <b>{result:.1f} diamond</b> aldyňyz!\n"
@@ -1256,7 +1365,7 @@ async def handle_promo_code_input(update: Update, context: ContextTypes.DEFAULT_
             parse_mode="HTML"
         )
 
-    context.user_data['waiting_for_promo'] = False
+    set_waiting(update, context, 'waiting_for_promo', False)
 
 
 # ============================================================================
@@ -1301,11 +1410,8 @@ async def claim_daily_bonus(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     user_id = query.from_user.id
 
-    user_data = db.get_user(user_id)
-
-    if not user_data:
-        await query.answer("❌ Hata! /start ile başlayın", show_alert=True)
-        return
+    # Kayıt kontrolü router'da yapıldı (needs_user)
+    user_data = context.user_record
 
     current_time = int(time.time())
     time_since_last = current_time - user_data['last_bonus_time']
@@ -1332,9 +1438,10 @@ async def claim_daily_bonus(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    # Bonus ver
+    # Bonus ver - Zaman atomik alınır, eşzamanlı ikinci istek burada durur
+    if not db.claim_daily_bonus(user_id, Config.DAILY_BONUS_COOLDOWN):
+        return
     db.update_diamond(user_id, Config.DAILY_BONUS_AMOUNT)
-    db.set_last_bonus_time(user_id)
 
     await query.edit_message_text(
         f"🎁 <b>Gutlaýarys!</b>\n\n"
@@ -1494,3 +1601,9 @@ async def show_daily_top_withdrawn(update: Update, context: ContextTypes.DEFAULT
             InlineKeyboardButton("🔙 Yza gaýt", callback_data="menu_daily_top")
         ]])
     )
+
+# ============================================================================
+# CALLBACK ROUTE TABLOSU
+# ============================================================================
+
+callback_router = build_callback_router()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Yük Simülasyonu - Gerçek handler'ları sahte Bot ve yerel PostgreSQL ile çalıştırır
+Sahte Bot, Bot API çağrılarını kaydeder; gecikme ve 429 (RetryAfter) simüle eder.
+Sonuç: saniyedeki güncelleme sayısı ve adım başına p50/p95/p99 gecikme.
+
+⚠️ DATABASE_URL yerel/test veritabanını göstermeli - Simülasyon kullanıcı oluşturur.
+Çalıştırma: python bot_loadsim.py --users 200 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import random
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from telegram import InlineKeyboardMarkup, Update
+from telegram.error import RetryAfter
+from telegram.ext import ContextTypes
+
+from bot_main import db, Config, build_application
+from bot_metrics import MetricsBot
+
+SIM_USER_BASE = -1_000_000  # Negatif ve aşağı doğru - Telegram kullanıcı ID'leri pozitif, gerçek kullanıcıyla çakışmaz
+SIM_PROMO_PREFIX = "LOADSIM-"  # Çalıştırma başına benzersiz kod - Gerçek promo koduyla çakışmaz
+SIM_BOT_ID = 1
+
+# ============================================================================
+# SAHTE BOT
+# ============================================================================
+
+class FakeBot(MetricsBot):
+    """Ağa çıkmayan Bot - Her çağrı kaydedilir, cevaplar sentetik üretilir"""
+
+    def __init__(self, latency: float = 0.03, rate_limit: float = 0.0, **kwargs):
+        super().__init__(Config.BOT_TOKEN, **kwargs)
+        # Bot nesneleri init sonrası dondurulur
+        with self._unfrozen():
+            self._sim_latency = latency
+            self._sim_rate_limit = rate_limit
+            self._sim_message_ids = itertools.count(1)
+            self.calls: Dict[str, int] = defaultdict(int)
+            self.rate_limited: Dict[str, int] = defaultdict(int)
+            self.buttons: Dict[int, List[str]] = {}  # chat_id -> son klavyedeki callback'ler
+
+    async def _do_post(self, endpoint: str, data: dict, **kwargs):
+        self.calls[endpoint] += 1
+        markup = data.get("reply_markup")
+        if isinstance(markup, InlineKeyboardMarkup):
+            self.buttons[int(data.get("chat_id", 0))] = [
+                button.callback_data for row in markup.inline_keyboard
+                for button in row if button.callback_data
+            ]
+        if endpoint != "getMe" and self._sim_latency:
+            # Gerçek API'ye benzer dağılım: çoğu hızlı, bazıları yavaş
+            await asyncio.sleep(random.expovariate(1 / self._sim_latency))
+        if endpoint != "getMe" and random.random() < self._sim_rate_limit:
+            self.rate_limited[endpoint] += 1
+            raise RetryAfter(1)
+        return self._sim_response(endpoint, data)
+
+    def _sim_response(self, endpoint: str, data: dict):
+        if endpoint == "getMe":
+            return {"id": SIM_BOT_ID, "is_bot": True, "first_name": "LoadSim", "username": "loadsim_bot"}
+
+        if endpoint == "getChatMember":
+            user = {"id": data["user_id"], "is_bot": False, "first_name": "sim"}
+            if data["user_id"] == SIM_BOT_ID:
+                return {"status": "creator", "user": user, "is_anonymous": False}
+            return {"status": "member", "user": user}
+
+        if endpoint == "copyMessage":
+            return {"message_id": next(self._sim_message_ids)}
+
+        if endpoint.startswith("send") or endpoint.startswith("edit"):
+            chat_id = data.get("chat_id", 0)
+            message = {
+                "message_id": data.get("message_id") or next(self._sim_message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private" if int(chat_id) > 0 else "supergroup"},
+                "text": data.get("text", ""),
+            }
+            if endpoint == "sendDice":
+                message["dice"] = {"emoji": data.get("emoji", "🎲"), "value": random.randint(1, 64)}
+            return message
+
+        return True
+
+# ============================================================================
+# SENTETİK GÜNCELLEMELER
+# ============================================================================
+
+class SyntheticUser:
+    """Tek bir simülasyon kullanıcısı - Güncelleme sözlüklerini üretir"""
+
+    update_ids = itertools.count(1)
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.user = {"id": user_id, "is_bot": False, "first_name": f"sim{user_id}", "username": f"sim{user_id}"}
+        self.message_id = 0
+
+    def _message(self, chat: dict, text: str) -> dict:
+        self.message_id += 1
+        message = {
+            "message_id": self.message_id,
+            "date": int(time.time()),
+            "chat": chat,
+            "from": self.user,
+            "text": text,
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return {"update_id": next(self.update_ids), "message": message}
+
+    def private_text(self, text: str) -> dict:
+        return self._message({"id": self.user_id, "type": "private"}, text)
+
+    def group_text(self, chat_id: int, text: str) -> dict:
+        return self._message({"id": chat_id, "type": "supergroup", "title": "sim"}, text)
+
+    def callback(self, data: str) -> dict:
+        return {
+            "update_id": next(self.update_ids),
+            "callback_query": {
+                "id": str(next(self.update_ids)),
+                "from": self.user,
+                "chat_instance": str(self.user_id),
+                "data": data,
+                "message": {
+                    "message_id": self.message_id,
+                    "date": int(time.time()),
+                    "chat": {"id": self.user_id, "type": "private"},
+                    "text": "",
+                },
+            },
+        }
+
+def pick_button(user: SyntheticUser, bot: FakeBot, prefix: str):
+    """Oyun token'ları sunucuda üretilir - Bot'un son gönderdiği klavyeden seç"""
+    def build() -> Optional[dict]:
+        choices = [data for data in bot.buttons.get(user.user_id, []) if data.startswith(prefix)]
+        return user.callback(random.choice(choices)) if choices else None
+    return build
+
+def build_flow(user: SyntheticUser, referrer: Optional[int], bot: FakeBot, promo_code: str) -> List[tuple]:
+    """
+    Gerçekçi bir oturum - (adım adı, güncelleme) listesi
+    Güncelleme yerine fonksiyon verilirse adım sırasında üretilir (None ise atlanır)
+    """
+    start = f"/start {referrer}" if referrer else "/start"
+    game = random.choice(["game_apple", "game_scratch_easy", "game_scratch_hard", "game_wheel"])
+    flow = [
+        ("start", user.private_text(start)),
+        ("menu", user.callback("back_main")),
+        ("profile", user.callback("menu_profile")),
+        ("games_menu", user.callback("earn_games")),
+        ("game_info", user.callback(game)),
+        ("game_play", user.callback(f"game_play_{game}")),
+        ("slot", user.group_text(int(Config.SLOT_CHAT_ID), "🎰 SLOT OÝNA")),
+        ("promo_menu", user.callback("earn_promo")),
+        ("promo_input", user.private_text(promo_code)),
+        ("daily_bonus", user.callback("earn_daily_bonus")),
+        ("tasks", user.callback("earn_tasks")),
+        ("withdraw_menu", user.callback("menu_withdraw")),
+        ("withdraw", user.callback(f"withdraw_request_{Config.WITHDRAW_OPTIONS[0]}")),
+    ]
+    if game == "game_apple":
+        flow.insert(6, ("apple_choice", pick_button(user, bot, "apple_choice_")))
+    elif game.startswith("game_scratch"):
+        for _ in range(4):
+            flow.insert(6, ("scratch_reveal", pick_button(user, bot, "scratch_reveal_")))
+    return flow
+
+# ============================================================================
+# ÇALIŞTIRMA VE RAPOR
+# ============================================================================
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def sim_user_id(index: int) -> int:
+    return SIM_USER_BASE - index
+
+def sim_promo_code() -> str:
+    return f"{SIM_PROMO_PREFIX}{uuid.uuid4().hex[:8].upper()}"
+
+def cleanup_sim_users(user_ids: List[int], promo_code: Optional[str] = None):
+    """Verilen simülasyon kullanıcılarını, kayıtlarını ve bu çalıştırmanın promo kodunu sil - ID aralığıyla silinmez"""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    for table in ("used_promo_codes", "user_sponsors", "withdrawal_requests", "daily_stats",
+                  "slot_history", "channel_memberships", "users"):
+        cursor.execute(f"DELETE FROM {table} WHERE user_id = ANY(%s)", (user_ids,))
+    if promo_code:
+        cursor.execute("DELETE FROM promo_codes WHERE code = %s", (promo_code,))
+    conn.commit()
+    cursor.close()
+    db.return_connection(conn)
+
+async def run_simulation(args) -> dict:
+    bot = FakeBot(latency=args.latency_ms / 1000, rate_limit=args.rate_limit)
+    application = build_application(run_jobs=False, with_updater=False, bot=bot)
+
+    errors: Dict[str, int] = defaultdict(int)
+
+    async def count_error(update: object, context: ContextTypes.DEFAULT_TYPE):
+        errors[type(context.error).__name__] += 1
+
+    application.add_error_handler(count_error)
+
+    user_ids = [sim_user_id(i) for i in range(args.users)]
+    promo_code = sim_promo_code()
+    cleanup_sim_users(user_ids)
+    db.create_promo_code(promo_code, 0.5, args.users)
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run_user(index: int):
+        user = SyntheticUser(user_ids[index])
+        # Kullanıcıların bir kısmı daha önce gelen birinin referalıyla katılır
+        referrer = user_ids[random.randrange(index)] if index and random.random() < 0.3 else None
+        async with semaphore:
+            for step, payload in build_flow(user, referrer, bot, promo_code):
+                if callable(payload):
+                    payload = payload()
+                    if payload is None:
+                        continue
+                update = Update.de_json(payload, application.bot)
+                started = time.perf_counter()
+                await application.process_update(update)
+                latencies[step].append(time.perf_counter() - started)
+
+    async with application:
+        await application.start()
+        if application.post_init:
+            await application.post_init(application)
+        started = time.perf_counter()
+        await asyncio.gather(*(run_user(i) for i in range(args.users)))
+        elapsed = time.perf_counter() - started
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+
+    total_updates = sum(len(v) for v in latencies.values())
+    report = {
+        "users": args.users,
+        "concurrency": args.concurrency,
+        "updates": total_updates,
+        "elapsed_sec": round(elapsed, 3),
+        "updates_per_sec": round(total_updates / elapsed, 2) if elapsed else 0.0,
+        "api_calls": dict(bot.calls),
+        "rate_limited": dict(bot.rate_limited),
+        "errors": dict(errors),
+        "steps": {
+            step: {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+            }
+            for step, values in latencies.items()
+        },
+    }
+
+    if not args.keep:
+        cleanup_sim_users(user_ids, promo_code)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Handler yük simülasyonu")
+    parser.add_argument("--users", type=int, default=200, help="Simüle edilen kullanıcı sayısı")
+    parser.add_argument("--concurrency", type=int, default=50, help="Aynı anda aktif kullanıcı")
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="Ortalama sahte API gecikmesi")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="429 dönme olasılığı (0-1)")
+    parser.add_argument("--json", help="Raporu bu dosyaya yaz")
+    parser.add_argument("--keep", action="store_true", help="Simülasyon verisini silme")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    report = asyncio.run(run_simulation(args))
+
+    print(f"📊 {report['updates']} güncelleme / {report['elapsed_sec']} sn = {report['updates_per_sec']} upd/s")
+    print(f"🚦 429: {sum(report['rate_limited'].values())}  ❌ Hatalar: {report['errors']}")
+    print(f"{'adım':<16}{'adet':>8}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}")
+    for step, stats in report["steps"].items():
+        print(f"{step:<16}{stats['count']:>8}{stats['p50_ms']:>12}{stats['p95_ms']:>12}{stats['p99_ms']:>12}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,9 +9,10 @@ Güncellenmiş Versiyon - İnaktivite Ceza Sistemi Eklendi
 import asyncio
 import random
 import time
-import os
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+import zlib
+from datetime import datetime, timedelta, time as dt_time
+from typing import Optional, List, Dict, Set
+from collections import OrderedDict
 import logging
 
 import psycopg2
@@ -23,84 +24,308 @@ from telegram import (
     ReplyKeyboardMarkup, KeyboardButton
 )
 from telegram.ext import (
-    Application, CommandHandler, CallbackQueryHandler,
-    MessageHandler, filters, ContextTypes
+    Application, BaseUpdateProcessor, CommandHandler, CallbackQueryHandler,
+    MessageHandler, ChatMemberHandler, TypeHandler, filters, ContextTypes
 )
+from telegram.error import RetryAfter
+from telegram.request import HTTPXRequest
+
+from bot_metrics import (
+    MetricsBot, MetricsConnection, metrics, query_profiler,
+    instrument_application, start_metrics_server
+)
+from bot_uow import UnitConnection, active_unit, after_commit, bind_units, flush_unit, on_abort
+
+# Ayarlar yan etkisiz modülde - Diğer modüller Config'i bot_main'den de alabilir
+from bot_config import Config
+
+def get_day_start(now: Optional[float] = None) -> int:
+    """Bugünün (yerel saat) başlangıç zamanı - Günlük görevler bu güne göre gruplanır"""
+    current = datetime.fromtimestamp(now) if now is not None else datetime.now()
+    return int(current.replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
 
 # ============================================================================
-# YAPILANDIRMA - KOLAYCA DEĞİŞTİRİLEBİLİR AYARLAR
+# BELLEK İÇİ İNDEKSLER
 # ============================================================================
 
-class Config:
-    """Bot yapılandırması - Tüm ayarlar buradan yönetilir"""
-
-    # ========== BOT AYARLARI ==========
-    BOT_TOKEN = os.getenv("BOT_TOKEN", "8133082070:AAE1rRGxQ9_Qqx-LZW54WFuFuGEo9FZhhWc")
-    ADMIN_IDS = [7172270461]  # Admin kullanıcı ID'leri
-
-    # ========== VERİTABANI ==========
-    DATABASE_URL = os.getenv("DATABASE_URL")
-
-    # ========== DİAMOND SİSTEMİ ==========
-    DIAMOND_TO_MANAT = 3.0  # 5 diamond = 1 manat
-    MIN_WITHDRAW_DIAMOND = 30.0  # Minimum çekilebilir diamond
-    MIN_REFERRAL_COUNT = 5  # Para çekmek için minimum referal sayısı
-
-    # Para çekme seçenekleri
-    WITHDRAW_OPTIONS = [30.0]
-
-    # ========== REFERAL SİSTEMİ ==========
-    REFERAL_REWARD = 0.5  # Referal çağıran kişiye verilecek diamond
-    NEW_USER_BONUS = 2.5  # Yeni kullanıcıya verilecek başlangıç diamond
-
-    # ========== İNAKTİVİTE CEZA SİSTEMİ - YENİ ==========
-    INACTIVITY_TIME = 86400  # 24 saat (saniye cinsinden) - kullanıcı bu süre boyunca aktif değilse ceza alır
-    INACTIVITY_PENALTY = -1.0  # İnaktivite cezası (diamond olarak)
-
-    # ========== OYUN AYARLARI ==========
-    # Not: cost = 0 ise oyun bedava, kazanırsa +win_reward, kaybederse -lose_penalty
-
-    # Almayı Tap Oyunu
-    APPLE_BOX_COST = 0.0  # Giriş ücreti (0 = bedava)
-    APPLE_BOX_WIN_REWARD = 1.0  # Kazanınca alınan diamond
-    APPLE_BOX_LOSE_PENALTY = -0.5  # Kaybedince düşen diamond
-    APPLE_BOX_WIN_CHANCE = 40  # Kazanma şansı (%)
-
-    # Lotereýa (Çeňil) - Kolay Scratch
-    SCRATCH_EASY_COST = 0.0
-    SCRATCH_EASY_WIN_REWARD = 1.0
-    SCRATCH_EASY_LOSE_PENALTY = -0.5
-    SCRATCH_EASY_WIN_CHANCE = 60  # %60 kazanma şansı
-
-    # Lotereýa (Kyn) - Zor Scratch
-    SCRATCH_HARD_COST = 0.0
-    SCRATCH_HARD_WIN_REWARD = 2.0
-    SCRATCH_HARD_LOSE_PENALTY = -0.5
-    SCRATCH_HARD_WIN_CHANCE = 25  # %25 kazanma şansı
-
-    # Şansly Aýlaw - Çarkıfelek
-    WHEEL_COST = 0.0  # Her zaman bedava
-    # Çarkıfelek ödülleri ve olasılıkları
-    WHEEL_REWARDS = [-2, -1, 0, 1, 2, 3, 4, 5, 10]  # Olası sonuçlar
-    WHEEL_WEIGHTS = [28, 32, 15, 12, 6, 3, 2, 1.5, 0.5]  # Her sonucun çıkma olasılığı (ağırlık)
-
-    # ========== SLOT OYUNU AYARLARI - YENİ ==========
-    SLOT_CHAT_ID = "-1002550606779"  # Slot oyununun oynandığı grup/kanal ID'si (örn: @diamond_slots veya -1001234567890)
-    SLOT_WIN_REWARD = 5.0  # Kazanınca alınan diamond (777)
-    SLOT_LOSE_PENALTY = -2.0  # Kaybedince düşen diamond
-    SLOT_WIN_CHANCE = 12  # Kazanma şansı (%)
-
-    # ========== BONUS AYARLARI ==========
-    DAILY_BONUS_AMOUNT = 1.0  # Günlük bonus miktarı
-    DAILY_BONUS_COOLDOWN = 86400  # 24 saat (saniye cinsinden)
-
-    # ========== MİNİMUM BAKİYE KONTROLÜ ==========
-    MIN_BALANCE_TO_PLAY = 1.0  # Oyun oynamak için minimum bakiye
-    # Not: Oyunlar bedava olsa bile kullanıcının bakiyesi ekside olamaz
-
-    # ========== SPONSOR TÜRÜ ==========
-    SPONSOR_TYPE_REQUIRED = "required"  # /start için zorunlu kanallar
-    SPONSOR_TYPE_TASK = "task"  # Günlük görev kanalları
+class PromoIndex:
+    """Promo kodların bellek içi indeksi - Geçersiz/bitmiş kodlar DB'ye gitmeden cevaplanır"""
+
+    def __init__(self, ttl: float, retry_backoff: float):
+        self.ttl = ttl
+        self.retry_backoff = retry_backoff
+        self.codes: Dict[str, Dict] = {}  # code -> {"reward": float, "remaining": int}
+        self.loaded = False  # En az bir kez yüklendi - Yüklenmeden indeks cevap vermez
+        self.refresh_at = 0.0
+        self.failures = 0
+
+    def is_stale(self) -> bool:
+        """Başka bir instance'ın eklediği kodlar için indeksi periyodik yenile"""
+        return time.monotonic() >= self.refresh_at
+
+    def load(self, rows: List[Dict]):
+        """Indeksi DB satırlarından yeniden kur"""
+        self.codes = {
+            row['code']: {
+                "reward": float(row['diamond_reward']),
+                "remaining": row['max_uses'] - row['current_uses']
+            }
+            for row in rows
+        }
+        self.loaded = True
+        self.failures = 0
+        self.refresh_at = time.monotonic() + self.ttl
+
+    def load_failed(self):
+        """Yenileme başarısız - Eski kopya kalır, sonraki deneme üstel geri çekilmeyle"""
+        self.failures += 1
+        delay = min(self.ttl, self.retry_backoff * 2 ** (self.failures - 1))
+        self.refresh_at = time.monotonic() + delay
+
+    def get(self, code: str) -> Optional[Dict]:
+        return self.codes.get(code)
+
+    def add(self, code: str, reward: float, max_uses: int):
+        self.codes[code] = {"reward": float(reward), "remaining": max_uses}
+
+    def remove(self, code: str):
+        self.codes.pop(code, None)
+
+    def consume(self, code: str):
+        """Başarılı kullanımdan sonra kalan hakkı düş"""
+        promo = self.codes.get(code)
+        if promo:
+            promo['remaining'] -= 1
+
+    def mark_exhausted(self, code: str):
+        promo = self.codes.get(code)
+        if promo:
+            promo['remaining'] = 0
+
+class SponsorProgressCache:
+    """
+    Günlük görev ilerlemesi - Her kullanıcı için bugünün tamamlama bitmap'i
+    Bit sırası görev sponsorlarının katalogdaki sırasıdır (created_date ASC)
+    """
+
+    def __init__(self, ttl: float, max_users: int):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.catalog: List[Dict] = []
+        self.ordinals: Dict[int, int] = {}  # sponsor_id -> bit sırası
+        self.full_mask = 0
+        self.loaded_at = 0.0
+        self.users: "OrderedDict[int, tuple]" = OrderedDict()  # user_id -> (day_start, bits)
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.loaded_at >= self.ttl
+
+    def load_catalog(self, sponsors: List[Dict]):
+        """Katalog değişince bit sıraları kayar - Kullanıcı bitmap'leri sıfırlanır"""
+        ids = [s['sponsor_id'] for s in sponsors]
+        if ids != [s['sponsor_id'] for s in self.catalog]:
+            self.users.clear()
+        self.catalog = sponsors
+        self.ordinals = {sponsor_id: i for i, sponsor_id in enumerate(ids)}
+        self.full_mask = (1 << len(ids)) - 1
+        self.loaded_at = time.monotonic()
+
+    def invalidate_catalog(self):
+        self.loaded_at = 0.0
+
+    def get_bits(self, user_id: int, day_start: int) -> Optional[int]:
+        """Bugüne ait bitmap - Yoksa None (DB'den yüklenmeli)"""
+        entry = self.users.get(user_id)
+        if entry is None:
+            return None
+        self.users.move_to_end(user_id)
+        if entry[0] != day_start:
+            # Yeni gün - dünkü tamamlamalar sayılmaz
+            self.users[user_id] = (day_start, 0)
+            return 0
+        return entry[1]
+
+    def set_bits(self, user_id: int, day_start: int, bits: int):
+        self.users[user_id] = (day_start, bits)
+        self.users.move_to_end(user_id)
+        while len(self.users) > self.max_users:
+            self.users.popitem(last=False)
+
+    def bits_from_ids(self, sponsor_ids: List[int]) -> int:
+        bits = 0
+        for sponsor_id in sponsor_ids:
+            ordinal = self.ordinals.get(sponsor_id)
+            if ordinal is not None:
+                bits |= 1 << ordinal
+        return bits
+
+    def mark(self, user_id: int, day_start: int, sponsor_id: int):
+        """Write-through - DB'ye yazıldıktan sonra biti işaretle"""
+        ordinal = self.ordinals.get(sponsor_id)
+        entry = self.users.get(user_id)
+        if ordinal is None or entry is None or entry[0] != day_start:
+            return
+        self.set_bits(user_id, day_start, entry[1] | (1 << ordinal))
+
+    def forget(self, user_ids: List[int]):
+        """Kayıtları geri alınan kullanıcılar - Bitmap DB'den tekrar yüklenir (sadece bu işçide)"""
+        for user_id in user_ids:
+            self.users.pop(user_id, None)
+
+    def is_done(self, bits: int, sponsor_id: int) -> Optional[bool]:
+        ordinal = self.ordinals.get(sponsor_id)
+        if ordinal is None:
+            return None
+        return bool(bits >> ordinal & 1)
+
+    def all_done(self, bits: int) -> bool:
+        return bits & self.full_mask == self.full_mask
+
+    def next_sponsor(self, bits: int) -> Optional[Dict]:
+        """En düşük sıradaki tamamlanmamış sponsor"""
+        if self.all_done(bits):
+            return None
+        pending = ~bits & self.full_mask
+        return self.catalog[(pending & -pending).bit_length() - 1]
+
+class MembershipCache:
+    """
+    Sponsor üyelik kontrolü - (kullanıcı, kanal) başına tek get_chat_member
+    Aynı anda gelen istekler tek API çağrısını bekler, sonuç kısa süre saklanır
+    """
+
+    def __init__(self, ttl: float, negative_ttl: float, max_size: int):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.results: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (expires_at, is_member)
+        self.inflight: Dict[tuple, asyncio.Future] = {}
+
+    def get(self, key: tuple) -> Optional[bool]:
+        entry = self.results.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self.results[key]
+            return None
+        return entry[1]
+
+    def put(self, key: tuple, is_member: bool):
+        ttl = self.ttl if is_member else self.negative_ttl
+        self.results[key] = (time.monotonic() + ttl, is_member)
+        self.results.move_to_end(key)
+        while len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+
+class BannedUsers:
+    """Banlı kullanıcılar - Ön filtre her güncellemede sorgusuz kontrol eder"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.users: Set[int] = set()
+        self.loaded_at = 0.0
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.loaded_at >= self.ttl
+
+    def load(self, user_ids: List[int]):
+        self.users = set(user_ids)
+        self.loaded_at = time.monotonic()
+
+    def set(self, user_id: int, banned: bool):
+        if banned:
+            self.users.add(user_id)
+        else:
+            self.users.discard(user_id)
+
+class ProcessedActions:
+    """
+    İşlenmiş işlem anahtarları - Çift tıklama ve tekrar gönderilen callback'lere karşı
+    Kalıcı anahtarlar (oyun nonce'u) DB'de de tutulur; bellek sadece ön kontroldür
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: "OrderedDict[str, Optional[float]]" = OrderedDict()  # anahtar -> bitiş (None = kalıcı)
+
+    def seen(self, key: str) -> bool:
+        if key not in self.entries:
+            return False
+        expires_at = self.entries[key]
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.entries[key]
+            return False
+        self.entries.move_to_end(key)
+        return True
+
+    def add(self, key: str, ttl: Optional[float] = None):
+        self.entries[key] = time.monotonic() + ttl if ttl is not None else None
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+class MembershipIndex:
+    """
+    Sponsor kanal üyelikleri - chat_member olaylarıyla güncel tutulur
+    Sadece botun admin olduğu doğrulanmış kanallar güvenilir: olayları sadece oralardan alırız
+    Kayıtlar entry_ttl sonra eskir - Kaçan olay kalıcı yanlış sonuç bırakmaz
+    Anahtarlar küçük harf: "@kanal" veya "-100..." (sponsors.channel_id ile aynı)
+    """
+
+    def __init__(self, ttl: float, max_size: int, entry_ttl: float):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entry_ttl = entry_ttl
+        self.channels: Dict[str, bool] = {}  # kanal anahtarı -> bot admin doğrulanmış mı (güvenilir mi)
+        self.loaded_at = 0.0
+        self.entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # (kanal, user_id) -> (status, updated_at)
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.loaded_at >= self.ttl
+
+    def load_channels(self, sponsors: List[Dict]):
+        """Güvenilmeyen kanalların kayıtları atılır - Admin olmadığımız sürede olay kaçmış olabilir"""
+        self.channels = {
+            s['channel_id'].lower(): bool(s.get('bot_is_admin')) and s.get('bot_admin_verified_at') is not None
+            for s in sponsors if s.get('channel_id')
+        }
+        stale = [key for key in self.entries if not self.channels.get(key[0])]
+        for key in stale:
+            del self.entries[key]
+        self.loaded_at = time.monotonic()
+
+    def invalidate_channels(self):
+        self.loaded_at = 0.0
+
+    def is_trusted(self, channel_key: str) -> bool:
+        return self.channels.get(channel_key, False)
+
+    def fresh_since(self) -> int:
+        """Bu zamandan (unix) eski kayıtlar kullanılmaz"""
+        return int(time.time() - self.entry_ttl)
+
+    def get(self, channel_key: str, user_id: int) -> Optional[str]:
+        key = (channel_key, user_id)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] < self.fresh_since():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, channel_key: str, user_id: int, status: str, updated_at: int):
+        key = (channel_key, user_id)
+        self.entries[key] = (status, updated_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def drop_channels(self, channel_keys: List[str]):
+        stale = [key for key in self.entries if key[0] in channel_keys]
+        for key in stale:
+            del self.entries[key]
 
 # ============================================================================
 # VERİTABANI YÖNETİMİ - PostgreSQL
@@ -110,12 +335,26 @@ class Database:
     """PostgreSQL veritabanı yöneticisi - Geliştirilmiş Versiyon"""
 
     def __init__(self):
+        # MetricsConnection: her SQL çalıştırması süre metriklerine ve SQL profiline eklenir
+        query_profiler.slow_threshold = Config.SLOW_QUERY_MS / 1000
+        query_profiler.max_statements = Config.QUERY_PROFILE_SIZE
         self.connection_pool = psycopg2.pool.SimpleConnectionPool(
             1, 20,
-            Config.DATABASE_URL
+            Config.DATABASE_URL,
+            connection_factory=MetricsConnection
+        )
+        self.promo_index = PromoIndex(Config.PROMO_INDEX_TTL, Config.PROMO_INDEX_RETRY_BACKOFF)
+        self.sponsor_progress = SponsorProgressCache(
+            Config.SPONSOR_CATALOG_TTL, Config.SPONSOR_PROGRESS_CACHE_SIZE
         )
-        self.init_db()
-        self.migrate_database()
+        self.membership_index = MembershipIndex(
+            Config.SPONSOR_CATALOG_TTL, Config.MEMBERSHIP_INDEX_SIZE, Config.MEMBERSHIP_INDEX_TTL
+        )
+        self.processed_actions = ProcessedActions(Config.IDEMPOTENCY_CACHE_SIZE)
+        self.banned_users = BannedUsers(Config.BANNED_USERS_TTL)
+        if Config.RUN_MIGRATIONS:
+            self.init_db()
+            self.migrate_database()
 
     def migrate_database(self):
         """Veritabanını yeni yapıya güncelle - Migration (Transaction Güvenli)"""
@@ -308,6 +547,178 @@ class Database:
                 conn.rollback()
                 print(f"ℹ️  sponsors.bot_is_admin güncelleme: {e}")
 
+            # 15. withdrawal_requests.reserved ekle - diamond talep anında bloke edilir
+            try:
+                cursor = conn.cursor()
+                cursor.execute("ALTER TABLE withdrawal_requests ADD COLUMN reserved BOOLEAN DEFAULT FALSE;")
+                conn.commit()
+                cursor.close()
+                print("✅ withdrawal_requests.reserved eklendi")
+            except Exception as e:
+                conn.rollback()
+                if "already exists" in str(e).lower() or "duplicate" in str(e).lower():
+                    print("ℹ️  withdrawal_requests.reserved zaten var")
+                else:
+                    print(f"⚠️  withdrawal_requests.reserved: {e}")
+
+            # 16. Kullanıcı başına tek bekleyen talep
+            # Çift bekleyen talep varsa index oluşturulmaz - Admin hangisinin kalacağına karar verir
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT user_id, array_agg(request_id ORDER BY request_id)
+                    FROM withdrawal_requests
+                    WHERE status = 'pending'
+                    GROUP BY user_id
+                    HAVING COUNT(*) > 1
+                """)
+                duplicates = cursor.fetchall()
+                if duplicates:
+                    details = ", ".join(f"{user_id}: {ids}" for user_id, ids in duplicates)
+                    logging.error(
+                        f"withdrawal_requests_one_pending oluşturulmadı - {len(duplicates)} kullanıcının "
+                        f"birden çok bekleyen talebi var (user_id: request_id'ler) {details}. "
+                        f"Fazla talepler admin tarafından onaylanıp/reddedilince sonraki başlatmada oluşturulur."
+                    )
+                else:
+                    cursor.execute("""
+                        CREATE UNIQUE INDEX IF NOT EXISTS withdrawal_requests_one_pending
+                        ON withdrawal_requests (user_id) WHERE status = 'pending'
+                    """)
+                    print("✅ withdrawal_requests_one_pending index oluşturuldu/kontrol edildi")
+                conn.commit()
+                cursor.close()
+            except Exception as e:
+                conn.rollback()
+                # Index olmadan create_withdrawal_request'in çift talep koruması yarışa açık
+                logging.error(f"withdrawal_requests_one_pending oluşturulamadı: {e}")
+
+            # 17. Eski görev kayıtlarının toplu silinmesi için index
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS user_sponsors_completed_date
+                    ON user_sponsors (completed_date)
+                """)
+                conn.commit()
+                cursor.close()
+                print("✅ user_sponsors_completed_date index oluşturuldu/kontrol edildi")
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️  user_sponsors_completed_date: {e}")
+
+            # 18. chat_member olaylarından beslenen üyelik indeksi
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS channel_memberships (
+                        channel_id TEXT,
+                        user_id BIGINT,
+                        status TEXT,
+                        updated_at BIGINT,
+                        PRIMARY KEY (channel_id, user_id)
+                    )
+                """)
+                conn.commit()
+                cursor.close()
+                print("✅ channel_memberships tablosu oluşturuldu/kontrol edildi")
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️  channel_memberships: {e}")
+
+            # 19. user_sponsors.verified_at ekle - Ödül sonrası üyelik doğrulaması
+            try:
+                cursor = conn.cursor()
+                cursor.execute("ALTER TABLE user_sponsors ADD COLUMN verified_at BIGINT;")
+                conn.commit()
+                cursor.close()
+                print("✅ user_sponsors.verified_at eklendi")
+            except Exception as e:
+                conn.rollback()
+                if "already exists" in str(e).lower() or "duplicate" in str(e).lower():
+                    print("ℹ️  user_sponsors.verified_at zaten var")
+                else:
+                    print(f"⚠️  user_sponsors.verified_at: {e}")
+
+            # 20. İşlenmiş işlemler - Tek seferlik oyun sonuçları
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS processed_actions (
+                        action_key TEXT PRIMARY KEY,
+                        user_id BIGINT,
+                        created_at BIGINT
+                    )
+                """)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_processed_actions_created_at
+                    ON processed_actions (created_at)
+                """)
+                conn.commit()
+                cursor.close()
+                print("✅ processed_actions tablosu oluşturuldu/kontrol edildi")
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️  processed_actions: {e}")
+
+            # 21. Banlı kullanıcılar için kısmi indeks - Ban listesi yenilemesi tablo taramaz
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_users_banned
+                    ON users (user_id) WHERE is_banned = TRUE
+                """)
+                conn.commit()
+                cursor.close()
+                print("✅ idx_users_banned oluşturuldu/kontrol edildi")
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️  idx_users_banned: {e}")
+
+            # 22. sponsors.bot_admin_verified_at ekle - Sadece API/olayla doğrulanmış admin güvenilir
+            try:
+                cursor = conn.cursor()
+                cursor.execute("ALTER TABLE sponsors ADD COLUMN bot_admin_verified_at BIGINT;")
+                conn.commit()
+                cursor.close()
+                print("✅ sponsors.bot_admin_verified_at eklendi")
+            except Exception as e:
+                conn.rollback()
+                if "already exists" in str(e).lower() or "duplicate" in str(e).lower():
+                    print("ℹ️  sponsors.bot_admin_verified_at zaten var")
+                else:
+                    print(f"⚠️  sponsors.bot_admin_verified_at: {e}")
+
+            # 23. user_sponsors.verify_checked_at ekle - Sonuçsuz kontroller sıranın sonuna geçer
+            try:
+                cursor = conn.cursor()
+                cursor.execute("ALTER TABLE user_sponsors ADD COLUMN verify_checked_at BIGINT;")
+                conn.commit()
+                cursor.close()
+                print("✅ user_sponsors.verify_checked_at eklendi")
+            except Exception as e:
+                conn.rollback()
+                if "already exists" in str(e).lower() or "duplicate" in str(e).lower():
+                    print("ℹ️  user_sponsors.verify_checked_at zaten var")
+                else:
+                    print(f"⚠️  user_sponsors.verify_checked_at: {e}")
+
+            # 24. Bekleyen duyurular - Slot klavyesi gibi tek instance'ın göndereceği postlar
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS pending_posts (
+                        name TEXT PRIMARY KEY,
+                        requested_at BIGINT
+                    )
+                """)
+                conn.commit()
+                cursor.close()
+                print("✅ pending_posts tablosu oluşturuldu/kontrol edildi")
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️  pending_posts: {e}")
+
             try:
                 cursor = conn.cursor()
                 cursor.execute("""
@@ -342,11 +753,16 @@ class Database:
 
 
     def get_connection(self):
-        """Bağlantı havuzundan bağlantı al"""
+        """Bağlantı havuzundan bağlantı al - Handler içinde güncellemenin birim bağlantısı"""
+        unit = active_unit()
+        if unit is not None:
+            return unit.connection()
         return self.connection_pool.getconn()
 
     def return_connection(self, conn):
-        """Bağlantıyı havuza geri ver"""
+        """Bağlantıyı havuza geri ver - Birim bağlantısı handler sonunda döner"""
+        if isinstance(conn, UnitConnection):
+            return
         self.connection_pool.putconn(conn)
 
     def init_db(self):
@@ -413,7 +829,8 @@ class Database:
                 sponsor_type TEXT DEFAULT 'task',
                 is_active BOOLEAN DEFAULT TRUE,
                 created_date BIGINT,
-                bot_is_admin BOOLEAN DEFAULT TRUE
+                bot_is_admin BOOLEAN DEFAULT TRUE,
+                bot_admin_verified_at BIGINT
             )
         """)
 
@@ -423,10 +840,40 @@ class Database:
                 user_id BIGINT,
                 sponsor_id INTEGER,
                 completed_date BIGINT,
+                verified_at BIGINT,
+                verify_checked_at BIGINT,
                 PRIMARY KEY (user_id, sponsor_id)
             )
         """)
 
+        # Sponsor kanal üyelikleri - chat_member olaylarından
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS channel_memberships (
+                channel_id TEXT,
+                user_id BIGINT,
+                status TEXT,
+                updated_at BIGINT,
+                PRIMARY KEY (channel_id, user_id)
+            )
+        """)
+
+        # İşlenmiş işlemler - Oyun nonce'ları (idempotens)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS processed_actions (
+                action_key TEXT PRIMARY KEY,
+                user_id BIGINT,
+                created_at BIGINT
+            )
+        """)
+
+        # Bekleyen duyurular - Lider instance gönderir
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS pending_posts (
+                name TEXT PRIMARY KEY,
+                requested_at BIGINT
+            )
+        """)
+
         # Para çekme talepleri - diamond NUMERIC
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS withdrawal_requests (
@@ -437,7 +884,8 @@ class Database:
                 manat_amount NUMERIC(10, 2),
                 request_date BIGINT,
                 status TEXT DEFAULT 'pending',
-                processed_date BIGINT
+                processed_date BIGINT,
+                reserved BOOLEAN DEFAULT FALSE
             )
         """)
 
@@ -475,42 +923,63 @@ class Database:
             return user_dict
         return None
 
-    def create_user(self, user_id: int, username: str, referred_by: Optional[int] = None):
-        """Yeni kullanıcı oluştur - Geliştirilmiş referal sistemi"""
+    def create_user(self, user_id: int, username: str, referred_by: Optional[int] = None) -> Dict:
+        """
+        Yeni kullanıcı oluştur - Referal ödülü ve günlük istatistik tek sorguda
+        Referans veren sadece kullanıcı gerçekten eklendiyse ödüllendirilir
+        Kullanıcı zaten varsa hiçbir şey yazılmaz (commit yok)
+        Returns: {"created": bool, "referral_count": referans verenin yeni referal sayısı veya None}
+                 | None (DB hatası)
+        """
         conn = self.get_connection()
-        cursor = conn.cursor()
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
 
         try:
             current_time = int(time.time())
             cursor.execute("""
-                INSERT INTO users (user_id, username, diamond, referred_by, joined_date, last_task_reset, last_activity)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (user_id) DO NOTHING
-            """, (user_id, username, Config.NEW_USER_BONUS, referred_by, current_time, current_time, current_time))
-
-            # Eğer referal varsa, referansı çağıran kişiye bonus ver
-            if referred_by:
-                cursor.execute("""
-                    UPDATE users
-                    SET diamond = diamond + %s, referral_count = referral_count + 1
-                    WHERE user_id = %s
-                """, (Config.REFERAL_REWARD, referred_by))
-
-                # ✅ YENİ: Günlük referal istatistiğini güncelle
-                conn.commit()  # Önce commit yap
-                cursor.close()
-                self.return_connection(conn)
-                self.update_daily_referral(referred_by)
-                return
-
-            conn.commit()
+                WITH ins AS (
+                    INSERT INTO users (user_id, username, diamond, referred_by, joined_date, last_task_reset, last_activity)
+                    VALUES (%(user_id)s, %(username)s, %(bonus)s, %(referred_by)s, %(now)s, %(now)s, %(now)s)
+                    ON CONFLICT (user_id) DO NOTHING
+                    RETURNING referred_by
+                ), ref AS (
+                    UPDATE users u
+                    SET diamond = u.diamond + %(reward)s, referral_count = u.referral_count + 1
+                    FROM ins
+                    WHERE u.user_id = ins.referred_by
+                    RETURNING u.user_id, u.referral_count
+                ), stats AS (
+                    INSERT INTO daily_stats (user_id, stat_date, daily_referrals_count)
+                    SELECT user_id, %(today)s, 1 FROM ref
+                    ON CONFLICT (user_id, stat_date)
+                    DO UPDATE SET daily_referrals_count = daily_stats.daily_referrals_count + 1
+                )
+                SELECT
+                    EXISTS (SELECT 1 FROM ins) AS created,
+                    (SELECT referral_count FROM ref) AS referral_count
+            """, {
+                "user_id": user_id,
+                "username": username,
+                "bonus": Config.NEW_USER_BONUS,
+                "referred_by": referred_by,
+                "reward": Config.REFERAL_REWARD,
+                "now": current_time,
+                "today": datetime.now().date()
+            })
+            result = dict(cursor.fetchone())
+            if result['created']:
+                conn.commit()
+            else:
+                # ON CONFLICT - Yazılan satır yok
+                conn.rollback()
+            return result
         except Exception as e:
             conn.rollback()
             logging.error(f"Kullanıcı oluşturma hatası: {e}")
+            return None
         finally:
-            if not conn.closed:
-                cursor.close()
-                self.return_connection(conn)
+            cursor.close()
+            self.return_connection(conn)
 
     def update_diamond(self, user_id: int, amount: float):
         """Diamond güncelle - Artık ondalıklı sayıları destekler"""
@@ -532,6 +1001,31 @@ class Database:
         user = self.get_user(user_id)
         return user['diamond'] if user else 0.0
 
+    def claim_daily_bonus(self, user_id: int, cooldown: int) -> bool:
+        """
+        Bonus zamanını atomik olarak al - Eşzamanlı iki istekten sadece biri geçer
+        Returns: False ise bekleme süresi dolmamış
+        """
+        now = int(time.time())
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                UPDATE users SET last_bonus_time = %s
+                WHERE user_id = %s AND COALESCE(last_bonus_time, 0) <= %s
+                RETURNING user_id
+            """, (now, user_id, now - cooldown))
+            claimed = cursor.fetchone() is not None
+            conn.commit()
+            return claimed
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Bonus alma hatası: {e}")
+            return False
+        finally:
+            cursor.close()
+            self.return_connection(conn)
+
     def set_last_bonus_time(self, user_id: int):
         """Son bonus alma zamanını kaydet"""
         conn = self.get_connection()
@@ -543,6 +1037,49 @@ class Database:
         cursor.close()
         self.return_connection(conn)
 
+    # ========== BAN SİSTEMİ ==========
+
+    def refresh_banned_users(self):
+        """Ban listesini DB'den yeniden yükle"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT user_id FROM users WHERE is_banned = TRUE")
+            self.banned_users.load([row[0] for row in cursor.fetchall()])
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Ban listesi yükleme hatası: {e}")
+        finally:
+            cursor.close()
+            self.return_connection(conn)
+
+    def is_user_banned(self, user_id: int) -> bool:
+        """Bellek içi kontrol - Liste TTL dolunca yenilenir"""
+        if self.banned_users.is_stale():
+            self.refresh_banned_users()
+        return user_id in self.banned_users.users
+
+    def set_user_banned(self, user_id: int, banned: bool) -> bool:
+        """Kullanıcıyı banla/banı kaldır - Returns: False ise kullanıcı yok"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                UPDATE users SET is_banned = %s WHERE user_id = %s
+            """, (banned, user_id))
+            found = cursor.rowcount > 0
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Ban güncelleme hatası: {e}")
+            return False
+        finally:
+            cursor.close()
+            self.return_connection(conn)
+        if found:
+            after_commit(lambda: self.banned_users.set(user_id, banned))
+        return found
+
     # ========== AKTİVİTE SİSTEMİ - YENİ ==========
 
     def update_last_activity(self, user_id: int):
@@ -595,6 +1132,7 @@ class Database:
                 VALUES (%s, %s, %s, %s)
             """, (code, diamond_reward, max_uses, int(time.time())))
             conn.commit()
+            after_commit(lambda: self.promo_index.add(code, diamond_reward, max_uses))
             return True
         except Exception as e:
             conn.rollback()
@@ -605,46 +1143,114 @@ class Database:
             self.return_connection(conn)
 
     def use_promo_code(self, code: str, user_id: int) -> Optional[float]:
-        """Promo kod kullan"""
+        """
+        Promo kod kullan - Tek sorguda atomik kullanım + bakiye ekleme
+        Returns: ödül | None (kod yok) | -1 (kod bitti) | -2 (zaten kullanılmış)
+        """
+        # Önce bellek içi indeks - yanlış yazılmış veya bitmiş kodlar DB'ye gitmez
+        if self.promo_index.is_stale():
+            self.refresh_promo_index()
+
+        if self.promo_index.loaded:
+            promo = self.promo_index.get(code)
+            if not promo:
+                return None
+            if promo['remaining'] <= 0:
+                return -1
+
         conn = self.get_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
-        cursor.execute("SELECT * FROM promo_codes WHERE code = %s", (code,))
-        promo = cursor.fetchone()
+        try:
+            # Kullanım kaydı -> koşullu sayaç artışı -> bakiye + günlük istatistik
+            # current_uses < max_uses koşulu satır kilidi altında tekrar
+            # değerlendirildiği için aynı anda gelen istekler max_uses'ı aşamaz
+            cursor.execute("""
+                WITH promo AS (
+                    SELECT code FROM promo_codes WHERE code = %(code)s
+                ), used AS (
+                    INSERT INTO used_promo_codes (user_id, code, used_date)
+                    SELECT %(user_id)s, code, %(now)s FROM promo
+                    ON CONFLICT (user_id, code) DO NOTHING
+                    RETURNING code
+                ), claim AS (
+                    UPDATE promo_codes p
+                    SET current_uses = p.current_uses + 1
+                    FROM used
+                    WHERE p.code = used.code AND p.current_uses < p.max_uses
+                    RETURNING p.diamond_reward
+                ), credit AS (
+                    UPDATE users u
+                    SET diamond = u.diamond + claim.diamond_reward
+                    FROM claim
+                    WHERE u.user_id = %(user_id)s
+                    RETURNING u.user_id
+                ), stats AS (
+                    INSERT INTO daily_stats (user_id, stat_date, daily_diamonds_earned)
+                    SELECT %(user_id)s, %(today)s, claim.diamond_reward
+                    FROM claim
+                    WHERE claim.diamond_reward > 0
+                    ON CONFLICT (user_id, stat_date)
+                    DO UPDATE SET daily_diamonds_earned =
+                        daily_stats.daily_diamonds_earned + EXCLUDED.daily_diamonds_earned
+                )
+                SELECT
+                    EXISTS (SELECT 1 FROM promo) AS found,
+                    EXISTS (SELECT 1 FROM used) AS fresh,
+                    (SELECT diamond_reward FROM claim) AS reward
+            """, {
+                "code": code,
+                "user_id": user_id,
+                "now": int(time.time()),
+                "today": datetime.now().date()
+            })
+            row = cursor.fetchone()
+
+            if not row['found']:
+                conn.rollback()
+                self.promo_index.remove(code)
+                return None
 
-        if not promo:
-            cursor.close()
-            self.return_connection(conn)
-            return None
+            if not row['fresh']:
+                conn.rollback()
+                return -2
+
+            if row['reward'] is None:
+                # Kod bitmiş - kullanım kaydını geri al
+                conn.rollback()
+                self.promo_index.mark_exhausted(code)
+                return -1
 
-        if promo['current_uses'] >= promo['max_uses']:
+            conn.commit()
+            after_commit(lambda: self.promo_index.consume(code))
+            return float(row['reward'])
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Promo kod kullanma hatası: {e}")
+            return None
+        finally:
             cursor.close()
             self.return_connection(conn)
-            return -1
 
-        cursor.execute("""
-            SELECT * FROM used_promo_codes WHERE user_id = %s AND code = %s
-        """, (user_id, code))
-
-        if cursor.fetchone():
+    def refresh_promo_index(self):
+        """Promo kod indeksini DB'den yeniden yükle - Hata olursa eski kopya kullanılır"""
+        try:
+            conn = self.get_connection()
+        except Exception as e:
+            self.promo_index.load_failed()
+            logging.error(f"Promo indeks yükleme hatası: {e}")
+            return
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            cursor.execute("SELECT code, diamond_reward, max_uses, current_uses FROM promo_codes")
+            self.promo_index.load(cursor.fetchall())
+        except Exception as e:
+            conn.rollback()
+            self.promo_index.load_failed()
+            logging.error(f"Promo indeks yükleme hatası: {e}")
+        finally:
             cursor.close()
             self.return_connection(conn)
-            return -2
-
-        cursor.execute("""
-            UPDATE promo_codes SET current_uses = current_uses + 1 WHERE code = %s
-        """, (code,))
-
-        cursor.execute("""
-            INSERT INTO used_promo_codes (user_id, code, used_date)
-            VALUES (%s, %s, %s)
-        """, (user_id, code, int(time.time())))
-
-        conn.commit()
-        reward = float(promo['diamond_reward'])
-        cursor.close()
-        self.return_connection(conn)
-        return reward
 
     def get_all_promo_codes(self) -> List[Dict]:
         """Tüm promo kodları getir"""
@@ -669,6 +1275,7 @@ class Database:
         conn.commit()
         cursor.close()
         self.return_connection(conn)
+        after_commit(lambda: self.promo_index.remove(code))
 
     # ========== SPONSOR İŞLEMLERİ - YENİ GELİŞTİRİLMİŞ ==========
 
@@ -682,6 +1289,7 @@ class Database:
                 VALUES (%s, %s, %s, %s, %s)
             """, (channel_id, channel_name, diamond_reward, sponsor_type, int(time.time())))
             conn.commit()
+            self.invalidate_sponsor_caches()
             return True
         except Exception as e:
             conn.rollback()
@@ -736,60 +1344,222 @@ class Database:
             result.append(sponsor_dict)
         return result
 
-    def get_user_next_sponsor(self, user_id: int) -> Optional[Dict]:
-        """Kullanıcının henüz tamamlamadığı bir sonraki task sponsorunu getir"""
+    def get_task_progress(self, user_id: int, refresh: bool = False) -> int:
+        """
+        Kullanıcının bugünkü görev bitmap'i - Önbellekte yoksa tek sorguyla yüklenir
+        refresh=True: DB'den tekrar yükle (başka işçide geri alınan görev)
+        """
+        progress = self.sponsor_progress
+        if progress.is_stale():
+            progress.load_catalog(self.get_task_sponsors())
+
+        day_start = get_day_start()
+        bits = None if refresh else progress.get_bits(user_id, day_start)
+        if bits is not None:
+            return bits
+
         conn = self.get_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor = conn.cursor()
         cursor.execute("""
-            SELECT s.* FROM sponsors s
-            WHERE s.is_active = TRUE
-            AND s.sponsor_type = %s
-            AND s.sponsor_id NOT IN (
-                SELECT sponsor_id FROM user_sponsors WHERE user_id = %s
-            )
-            ORDER BY s.created_date ASC
-            LIMIT 1
-        """, (Config.SPONSOR_TYPE_TASK, user_id))
-        sponsor = cursor.fetchone()
+            SELECT sponsor_id FROM user_sponsors
+            WHERE user_id = %s AND completed_date >= %s
+        """, (user_id, day_start))
+        bits = progress.bits_from_ids([row[0] for row in cursor.fetchall()])
         cursor.close()
         self.return_connection(conn)
-        if sponsor:
-            sponsor_dict = dict(sponsor)
-            sponsor_dict['diamond_reward'] = float(sponsor_dict['diamond_reward'])
-            return sponsor_dict
-        return None
+        progress.set_bits(user_id, day_start, bits)
+        return bits
+
+    def get_user_next_sponsor(self, user_id: int) -> Optional[Dict]:
+        """Kullanıcının bugün henüz tamamlamadığı bir sonraki task sponsorunu getir"""
+        bits = self.get_task_progress(user_id)
+        if self.sponsor_progress.all_done(bits):
+            # Geri alma lider işçide olur - Bu işçinin bitmap'i eski "tamam" bitini taşıyabilir
+            bits = self.get_task_progress(user_id, refresh=True)
+        sponsor = self.sponsor_progress.next_sponsor(bits)
+        return dict(sponsor) if sponsor else None
 
     def check_sponsor_completed(self, user_id: int, sponsor_id: int) -> bool:
-        """Sponsorun tamamlanıp tamamlanmadığını kontrol et"""
+        """Sponsorun bugün tamamlanıp tamamlanmadığını kontrol et"""
+        done = self.sponsor_progress.is_done(self.get_task_progress(user_id), sponsor_id)
+        if done is True:
+            # "Tamam" biti başka işçideki geri almadan sonra eskimiş olabilir - DB'den doğrula
+            done = self.sponsor_progress.is_done(self.get_task_progress(user_id, refresh=True), sponsor_id)
+        if done is not None:
+            return done
+
+        # Katalogda olmayan sponsor (pasif/başka tür) - DB'ye sor
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT * FROM user_sponsors WHERE user_id = %s AND sponsor_id = %s
-        """, (user_id, sponsor_id))
+            SELECT 1 FROM user_sponsors
+            WHERE user_id = %s AND sponsor_id = %s AND completed_date >= %s
+        """, (user_id, sponsor_id, get_day_start()))
         result = cursor.fetchone() is not None
         cursor.close()
         self.return_connection(conn)
         return result
 
-    def complete_sponsor(self, user_id: int, sponsor_id: int):
-        """Sponsoru tamamlandı olarak işaretle"""
+    def complete_sponsor(self, user_id: int, sponsor_id: int) -> bool:
+        """
+        Sponsoru bugün için tamamlandı olarak işaretle
+        Dünkü kayıt bugüne taşınır - Returns: False ise bugün zaten tamamlanmış
+        """
+        day_start = get_day_start()
         conn = self.get_connection()
         cursor = conn.cursor()
         try:
             cursor.execute("""
                 INSERT INTO user_sponsors (user_id, sponsor_id, completed_date)
                 VALUES (%s, %s, %s)
-                ON CONFLICT (user_id, sponsor_id) DO NOTHING
-            """, (user_id, sponsor_id, int(time.time())))
+                ON CONFLICT (user_id, sponsor_id)
+                DO UPDATE SET completed_date = EXCLUDED.completed_date, verified_at = NULL,
+                              verify_checked_at = NULL
+                WHERE user_sponsors.completed_date < %s
+                RETURNING sponsor_id
+            """, (user_id, sponsor_id, int(time.time()), day_start))
+            completed = cursor.fetchone() is not None
             conn.commit()
-            return True
+            # Her iki durumda da sponsor bugün tamamlanmış sayılır
+            after_commit(lambda: self.sponsor_progress.mark(user_id, day_start, sponsor_id))
+            return completed
         except Exception as e:
             conn.rollback()
+            logging.error(f"Sponsor tamamlama hatası: {e}")
             return False
         finally:
             cursor.close()
             self.return_connection(conn)
 
+    def purge_old_task_completions(self) -> int:
+        """Bugünden önceki görev kayıtlarını toplu sil - Returns: silinen kayıt sayısı"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                DELETE FROM user_sponsors WHERE completed_date < %s
+            """, (get_day_start(),))
+            deleted = cursor.rowcount
+            conn.commit()
+            return deleted
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Görev temizleme hatası: {e}")
+            return -1
+        finally:
+            cursor.close()
+            self.return_connection(conn)
+
+    def get_unverified_completions(self, older_than: int, limit: int) -> List[Dict]:
+        """
+        Doğrulanmamış bugünkü görev tamamlamaları - Hiç kontrol edilmeyenler ve en eskiler önce
+        Sonucu bilinemeyen (API hatası) kayıtlar sıranın sonuna geçer, yenileri bekletmez
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        # Bot admin değilse getChatMember başkasının üyeliğini söylemez
+        cursor.execute("""
+            SELECT us.user_id, us.sponsor_id, s.channel_id
+            FROM user_sponsors us
+            JOIN sponsors s ON s.sponsor_id = us.sponsor_id
+            WHERE us.verified_at IS NULL
+              AND us.completed_date >= %s AND us.completed_date < %s
+              AND s.sponsor_type = 'task' AND s.is_active = TRUE AND s.bot_is_admin = TRUE
+            ORDER BY us.verify_checked_at ASC NULLS FIRST, us.completed_date ASC
+            LIMIT %s
+        """, (get_day_start(), older_than, limit))
+        rows = [dict(row) for row in cursor.fetchall()]
+        cursor.close()
+        self.return_connection(conn)
+        return rows
+
+    def mark_completions_verified(self, pairs: List[tuple]):
+        """Kanalda kalan kullanıcılar - Tek sorguda doğrulandı olarak işaretle"""
+        if not pairs:
+            return
+        user_ids, sponsor_ids = zip(*pairs)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                UPDATE user_sponsors us SET verified_at = %s
+                FROM unnest(%s::bigint[], %s::int[]) AS v(user_id, sponsor_id)
+                WHERE us.user_id = v.user_id AND us.sponsor_id = v.sponsor_id
+            """, (int(time.time()), list(user_ids), list(sponsor_ids)))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Doğrulama işaretleme hatası: {e}")
+        finally:
+            cursor.close()
+            self.return_connection(conn)
+
+    def mark_completions_checked(self, pairs: List[tuple]):
+        """Sonucu bilinemeyen kontroller - Son kontrol zamanı yazılır, sonraki turda sona kalır"""
+        if not pairs:
+            return
+        user_ids, sponsor_ids = zip(*pairs)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                UPDATE user_sponsors us SET verify_checked_at = %s
+                FROM unnest(%s::bigint[], %s::int[]) AS v(user_id, sponsor_id)
+                WHERE us.user_id = v.user_id AND us.sponsor_id = v.sponsor_id
+            """, (int(time.time()), list(user_ids), list(sponsor_ids)))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Kontrol işaretleme hatası: {e}")
+        finally:
+            cursor.close()
+            self.return_connection(conn)
+
+    def claw_back_sponsor_rewards(self, pairs: List[tuple]) -> Dict[int, float]:
+        """
+        Kanaldan ayrılanlar - Kayıt silinir, ödül bakiyeden ve günlük istatistikten düşülür
+        Tek transaction, set bazlı. Returns: {user_id: geri alınan diamond}
+        """
+        if not pairs:
+            return {}
+        user_ids, sponsor_ids = zip(*pairs)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                WITH revoked AS (
+                    DELETE FROM user_sponsors us
+                    USING unnest(%s::bigint[], %s::int[]) AS v(user_id, sponsor_id)
+                    WHERE us.user_id = v.user_id AND us.sponsor_id = v.sponsor_id
+                      AND us.verified_at IS NULL
+                    RETURNING us.user_id, us.sponsor_id
+                ), totals AS (
+                    SELECT r.user_id, SUM(s.diamond_reward) AS amount
+                    FROM revoked r JOIN sponsors s ON s.sponsor_id = r.sponsor_id
+                    GROUP BY r.user_id
+                ), stats AS (
+                    UPDATE daily_stats d
+                    SET daily_diamonds_earned = GREATEST(d.daily_diamonds_earned - t.amount, 0)
+                    FROM totals t
+                    WHERE d.user_id = t.user_id AND d.stat_date = %s
+                )
+                UPDATE users u SET diamond = u.diamond - t.amount
+                FROM totals t
+                WHERE u.user_id = t.user_id
+                RETURNING u.user_id, t.amount
+            """, (list(user_ids), list(sponsor_ids), datetime.now().date()))
+            result = {user_id: float(amount) for user_id, amount in cursor.fetchall()}
+            conn.commit()
+            after_commit(lambda: self.sponsor_progress.forget(list(result)))
+            return result
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Ödül geri alma hatası: {e}")
+            return {}
+        finally:
+            cursor.close()
+            self.return_connection(conn)
+
     def delete_sponsor(self, sponsor_id: int):
         """Sponsor sil"""
         conn = self.get_connection()
@@ -798,17 +1568,257 @@ class Database:
         conn.commit()
         cursor.close()
         self.return_connection(conn)
+        self.invalidate_sponsor_caches()
+
+    def invalidate_sponsor_caches(self):
+        """Sponsor kataloğu ve kanal listesi DB'den tekrar yüklenir - Birim geri alınırsa yine"""
+        self.sponsor_progress.invalidate_catalog()
+        self.membership_index.invalidate_channels()
+        on_abort(self.sponsor_progress.invalidate_catalog)
+        on_abort(self.membership_index.invalidate_channels)
+
+    def update_sponsor_bot_admin_status(self, sponsor_id: int, is_admin: bool):
+        """Sponsorda botun admin durumunu güncelle"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE sponsors SET bot_is_admin = %s, bot_admin_verified_at = %s WHERE sponsor_id = %s
+            RETURNING lower(channel_id)
+        """, (is_admin, int(time.time()) if is_admin else None, sponsor_id))
+        channel_keys = [row[0] for row in cursor.fetchall()]
+        if not is_admin and channel_keys:
+            # Admin değilken olay gelmez - Kayıtlar güvenilmez hale gelir
+            cursor.execute("""
+                DELETE FROM channel_memberships WHERE channel_id = ANY(%s)
+            """, (channel_keys,))
+        conn.commit()
+        cursor.close()
+        self.return_connection(conn)
+        if not is_admin:
+            after_commit(lambda: self.membership_index.drop_channels(channel_keys))
+        self.invalidate_sponsor_caches()
+
+    def update_bot_admin_status_by_chat(self, channel_keys: List[str], is_admin: bool):
+        """my_chat_member olayından - Kanal anahtarlarına göre admin durumunu güncelle"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE sponsors SET bot_is_admin = %s, bot_admin_verified_at = %s
+            WHERE lower(channel_id) = ANY(%s)
+        """, (is_admin, int(time.time()) if is_admin else None, channel_keys))
+        if not is_admin:
+            cursor.execute("""
+                DELETE FROM channel_memberships WHERE channel_id = ANY(%s)
+            """, (channel_keys,))
+        conn.commit()
+        cursor.close()
+        self.return_connection(conn)
+        if not is_admin:
+            after_commit(lambda: self.membership_index.drop_channels(channel_keys))
+        self.invalidate_sponsor_caches()
+
+    # ========== İDEMPOTENS ==========
+
+    def claim_action(self, action_key: str, user_id: int) -> bool:
+        """
+        Tek seferlik işlemi sahiplen (örn. oyun sonucu) - Önce bellek, sonra DB
+        Returns: False ise işlem daha önce yapılmış (veya DB hatası - ödeme yapılmaz)
+        """
+        if self.processed_actions.seen(action_key):
+            return False
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO processed_actions (action_key, user_id, created_at)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (action_key) DO NOTHING
+                RETURNING action_key
+            """, (action_key, user_id, int(time.time())))
+            claimed = cursor.fetchone() is not None
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"İşlem sahiplenme hatası: {e}")
+            return False
+        finally:
+            cursor.close()
+            self.return_connection(conn)
+        after_commit(lambda: self.processed_actions.add(action_key))
+        return claimed
+
+    def is_action_claimed(self, action_key: str) -> bool:
+        """Sadece bellek - Ucuz ön kontrol, kesin karar claim_action'dadır"""
+        return self.processed_actions.seen(action_key)
+
+    def claim_tap(self, user_id: int, data: str, message_id: int) -> bool:
+        """Aynı mesajdaki aynı butona kısa süre içinde ikinci basış - Returns: False ise tekrar"""
+        key = f"tap:{user_id}:{message_id}:{data}"
+        if self.processed_actions.seen(key):
+            return False
+        self.processed_actions.add(key, Config.TAP_WINDOW)
+        return True
+
+    def purge_processed_actions(self) -> int:
+        """Saklama süresi dolmuş işlem anahtarlarını sil - Returns: silinen kayıt sayısı"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                DELETE FROM processed_actions WHERE created_at < %s
+            """, (int(time.time()) - Config.IDEMPOTENCY_RETENTION,))
+            deleted = cursor.rowcount
+            conn.commit()
+            return deleted
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"İşlem anahtarı temizleme hatası: {e}")
+            return -1
+        finally:
+            cursor.close()
+            self.return_connection(conn)
+
+    # ========== BEKLEYEN DUYURULAR ==========
+
+    def request_post(self, name: str):
+        """Duyuru isteğini kaydet - Hangi instance liderse o gönderir, yeniden başlatmada kaybolmaz"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO pending_posts (name, requested_at) VALUES (%s, %s)
+                ON CONFLICT (name) DO UPDATE SET requested_at = EXCLUDED.requested_at
+            """, (name, int(time.time())))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Duyuru isteği kaydedilemedi ({name}): {e}")
+        finally:
+            cursor.close()
+            self.return_connection(conn)
+
+    def take_post(self, name: str) -> bool:
+        """Bekleyen duyuruyu üstlen - Sadece bir çağıran True alır"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DELETE FROM pending_posts WHERE name = %s RETURNING name", (name,))
+            taken = cursor.fetchone() is not None
+            conn.commit()
+            return taken
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Duyuru isteği okunamadı ({name}): {e}")
+            return False
+        finally:
+            cursor.close()
+            self.return_connection(conn)
+
+    # ========== ÜYELİK İNDEKSİ ==========
+
+    def purge_stale_memberships(self) -> int:
+        """MEMBERSHIP_INDEX_TTL'den eski üyelik kayıtlarını sil - Returns: silinen kayıt sayısı"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                DELETE FROM channel_memberships WHERE updated_at < %s
+            """, (self.membership_index.fresh_since(),))
+            deleted = cursor.rowcount
+            conn.commit()
+            return deleted
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Üyelik kaydı temizleme hatası: {e}")
+            return -1
+        finally:
+            cursor.close()
+            self.return_connection(conn)
+
+    def refresh_membership_channels(self):
+        """Sponsor kanal listesini ve bot admin durumlarını indekse yükle"""
+        if self.membership_index.is_stale():
+            self.membership_index.load_channels(self.get_active_sponsors())
+
+    def get_sponsor_channel_keys(self, chat_id: int, username: Optional[str]) -> List[str]:
+        """Olaydaki sohbetin sponsor kanal anahtarları - Sponsor değilse boş"""
+        self.refresh_membership_channels()
+        candidates = [str(chat_id)]
+        if username:
+            candidates.append(f"@{username}".lower())
+        return [key for key in candidates if key in self.membership_index.channels]
+
+    def record_channel_membership(self, channel_keys: List[str], user_id: int, status: str):
+        """Üyelik durumunu bellek + DB'ye yaz (write-through)"""
+        now = int(time.time())
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO channel_memberships (channel_id, user_id, status, updated_at)
+                SELECT unnest(%s::text[]), %s, %s, %s
+                ON CONFLICT (channel_id, user_id)
+                DO UPDATE SET status = EXCLUDED.status, updated_at = EXCLUDED.updated_at
+            """, (channel_keys, user_id, status, now))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Üyelik kaydı hatası: {e}")
+            return
+        finally:
+            cursor.close()
+            self.return_connection(conn)
 
-    def update_sponsor_bot_admin_status(self, sponsor_id: int, is_admin: bool):
-        """Sponsorda botun admin durumunu güncelle"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE sponsors SET bot_is_admin = %s WHERE sponsor_id = %s
-        """, (is_admin, sponsor_id))
-        conn.commit()
-        cursor.close()
-        self.return_connection(conn)
+        def remember():
+            for key in channel_keys:
+                self.membership_index.put(key, user_id, status, now)
+        after_commit(remember)
+
+    def remember_channel_status(self, channel_id: str, user_id: int, status: str):
+        """API'den öğrenilen durumu indekse ekle - Sadece olay alınan (admin) kanallarda"""
+        self.refresh_membership_channels()
+        key = channel_id.lower()
+        if self.membership_index.is_trusted(key):
+            self.record_channel_membership([key], user_id, status)
+
+    def lookup_channel_statuses(self, channel_ids: List[str], user_id: int) -> Dict[str, str]:
+        """
+        İndeksten bilinen üyelik durumları - Önce bellek, sonra tek DB sorgusu
+        Güvenilmeyen, kaydı olmayan veya kaydı eskimiş kanallar sonuçta yer almaz (API'ye sorulmalı)
+        """
+        self.refresh_membership_channels()
+        index = self.membership_index
+        result = {}
+        misses = {}
+        for channel_id in channel_ids:
+            key = channel_id.lower()
+            if not index.is_trusted(key):
+                continue
+            status = index.get(key, user_id)
+            if status is not None:
+                result[channel_id] = status
+            else:
+                misses[key] = channel_id
+
+        if misses:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            try:
+                cursor.execute("""
+                    SELECT channel_id, status, updated_at FROM channel_memberships
+                    WHERE user_id = %s AND channel_id = ANY(%s) AND updated_at >= %s
+                """, (user_id, list(misses), index.fresh_since()))
+                for key, status, updated_at in cursor.fetchall():
+                    index.put(key, user_id, status, updated_at)
+                    result[misses[key]] = status
+            except Exception as e:
+                # Bulunamayan kanallar API'ye sorulur
+                conn.rollback()
+                logging.error(f"Üyelik indeksi okuma hatası: {e}")
+            finally:
+                cursor.close()
+                self.return_connection(conn)
+        return result
 
     def get_sponsor_by_id(self, sponsor_id: int) -> Optional[Dict]:
         """ID'ye göre sponsor getir"""
@@ -824,64 +1834,57 @@ class Database:
             return sponsor_dict
         return None
 
-    def reset_user_daily_tasks(self, user_id: int):
-        """Kullanıcının günlük görevlerini sıfırla"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        # Sadece task tipindeki sponsorları sıfırla
-        cursor.execute("""
-            DELETE FROM user_sponsors
-            WHERE user_id = %s
-            AND sponsor_id IN (
-                SELECT sponsor_id FROM sponsors WHERE sponsor_type = %s
-            )
-        """, (user_id, Config.SPONSOR_TYPE_TASK))
-        cursor.execute("""
-            UPDATE users SET last_task_reset = %s WHERE user_id = %s
-        """, (int(time.time()), user_id))
-        conn.commit()
-        cursor.close()
-        self.return_connection(conn)
-
-    def check_daily_task_reset(self, user_id: int) -> bool:
-        """Günlük görevlerin sıfırlanması gerekip gerekmediğini kontrol et"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT last_task_reset FROM users WHERE user_id = %s
-        """, (user_id,))
-        result = cursor.fetchone()
-        cursor.close()
-        self.return_connection(conn)
-
-        if not result:
-            return False
-
-        last_reset = result[0]
-        current_time = int(time.time())
-
-        # 24 saat geçtiyse sıfırla
-        if current_time - last_reset >= 86400:
-            return True
-        return False
-
     # ========== PARA ÇEKME İŞLEMLERİ ==========
 
-    def create_withdrawal_request(self, user_id: int, username: str, diamond: float, manat: float):
-        """Para çekme talebi oluştur"""
+    def create_withdrawal_request(self, user_id: int, username: str, diamond: float, manat: float) -> int:
+        """
+        Para çekme talebi oluştur - Diamond talep anında atomik olarak bloke edilir
+        Returns: request_id | -1 (yetersiz bakiye) | -2 (bekleyen talep zaten var)
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO withdrawal_requests
-            (user_id, username, diamond_amount, manat_amount, request_date)
-            VALUES (%s, %s, %s, %s, %s)
-            RETURNING request_id
-        """, (user_id, username, diamond, manat, int(time.time())))
-        request_id = cursor.fetchone()[0]
-        conn.commit()
-        cursor.close()
-        self.return_connection(conn)
-        return request_id
+        try:
+            cursor.execute("""
+                WITH debit AS (
+                    UPDATE users
+                    SET diamond = diamond - %(diamond)s
+                    WHERE user_id = %(user_id)s
+                    AND diamond >= %(diamond)s
+                    AND NOT EXISTS (
+                        SELECT 1 FROM withdrawal_requests
+                        WHERE user_id = %(user_id)s AND status = 'pending'
+                    )
+                    RETURNING user_id
+                )
+                INSERT INTO withdrawal_requests
+                (user_id, username, diamond_amount, manat_amount, request_date, reserved)
+                SELECT user_id, %(username)s, %(diamond)s, %(manat)s, %(now)s, TRUE FROM debit
+                RETURNING request_id
+            """, {
+                "user_id": user_id,
+                "username": username,
+                "diamond": diamond,
+                "manat": manat,
+                "now": int(time.time())
+            })
+            row = cursor.fetchone()
+
+            if row:
+                conn.commit()
+                return row[0]
+
+            conn.rollback()
+            cursor.execute("""
+                SELECT 1 FROM withdrawal_requests WHERE user_id = %s AND status = 'pending'
+            """, (user_id,))
+            return -2 if cursor.fetchone() else -1
+        except psycopg2.IntegrityError:
+            # Aynı anda gelen ikinci talep - tekil index yakaladı
+            conn.rollback()
+            return -2
+        finally:
+            cursor.close()
+            self.return_connection(conn)
 
     def get_withdrawal_request(self, request_id: int) -> Optional[Dict]:
         """Para çekme talebini getir"""
@@ -900,58 +1903,132 @@ class Database:
             return req_dict
         return None
 
-    def approve_withdrawal(self, request_id: int):
-        """Para çekme talebini onayla ve diamond'ı düş"""
+    def approve_withdrawals(self, request_ids: List[int]) -> List[Dict]:
+        """
+        Bekleyen talepleri tek transaction'da toplu onayla
+        Returns: onaylanan talepler (zaten işlenmiş olanlar atlanır)
+        """
+        if not request_ids:
+            return []
+
         conn = self.get_connection()
-        cursor = conn.cursor()
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            # Bloke edilmemiş (eski) talepler için diamond şimdi düşülür
+            cursor.execute("""
+                WITH approved AS (
+                    UPDATE withdrawal_requests
+                    SET status = 'approved', processed_date = %(now)s
+                    WHERE request_id = ANY(%(ids)s) AND status = 'pending'
+                    RETURNING request_id, user_id, username, diamond_amount, manat_amount, reserved
+                ), per_user AS (
+                    SELECT user_id,
+                           SUM(diamond_amount) AS total,
+                           SUM(CASE WHEN reserved THEN 0 ELSE diamond_amount END) AS unreserved
+                    FROM approved
+                    GROUP BY user_id
+                ), debit AS (
+                    UPDATE users u
+                    SET diamond = u.diamond - per_user.unreserved,
+                        total_withdrawn = u.total_withdrawn + per_user.total
+                    FROM per_user
+                    WHERE u.user_id = per_user.user_id
+                    RETURNING u.user_id
+                ), stats AS (
+                    INSERT INTO daily_stats (user_id, stat_date, daily_withdrawn)
+                    SELECT user_id, %(today)s, total FROM per_user
+                    ON CONFLICT (user_id, stat_date)
+                    DO UPDATE SET daily_withdrawn = daily_stats.daily_withdrawn + EXCLUDED.daily_withdrawn
+                )
+                SELECT request_id, user_id, username, diamond_amount, manat_amount
+                FROM approved
+                ORDER BY request_id
+            """, {
+                "ids": list(request_ids),
+                "now": int(time.time()),
+                "today": datetime.now().date()
+            })
+            approved = cursor.fetchall()
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Toplu onay hatası: {e}")
+            approved = []
+        finally:
+            cursor.close()
+            self.return_connection(conn)
 
-        # Talebi getir
-        cursor.execute("""
-            SELECT user_id, diamond_amount FROM withdrawal_requests
-            WHERE request_id = %s
-        """, (request_id,))
-        result = cursor.fetchone()
+        result = []
+        for r in approved:
+            req_dict = dict(r)
+            req_dict['diamond_amount'] = float(req_dict['diamond_amount'])
+            req_dict['manat_amount'] = float(req_dict['manat_amount'])
+            result.append(req_dict)
+        return result
 
-        if result:
-            user_id, diamond_amount = result
+    def approve_withdrawal(self, request_id: int) -> Optional[Dict]:
+        """Para çekme talebini onayla - Returns: onaylanan talep veya None (yok/işlenmiş)"""
+        approved = self.approve_withdrawals([request_id])
+        return approved[0] if approved else None
 
-            # Talebi onayla
-            cursor.execute("""
-                UPDATE withdrawal_requests
-                SET status = 'approved', processed_date = %s
-                WHERE request_id = %s
-            """, (int(time.time()), request_id))
+    def reject_withdrawals(self, request_ids: List[int]) -> List[Dict]:
+        """
+        Bekleyen talepleri toplu reddet - Bloke edilen diamond iade edilir
+        Returns: reddedilen talepler
+        """
+        if not request_ids:
+            return []
 
-            # Diamond'ı düş
+        conn = self.get_connection()
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        try:
             cursor.execute("""
-                UPDATE users
-                SET diamond = diamond - %s, total_withdrawn = total_withdrawn + %s
-                WHERE user_id = %s
-            """, (diamond_amount, diamond_amount, user_id))
-
+                WITH rejected AS (
+                    UPDATE withdrawal_requests
+                    SET status = 'rejected', processed_date = %(now)s
+                    WHERE request_id = ANY(%(ids)s) AND status = 'pending'
+                    RETURNING request_id, user_id, username, diamond_amount, manat_amount, reserved
+                ), refund AS (
+                    UPDATE users u
+                    SET diamond = u.diamond + r.total
+                    FROM (
+                        SELECT user_id, SUM(diamond_amount) AS total
+                        FROM rejected
+                        WHERE reserved
+                        GROUP BY user_id
+                    ) r
+                    WHERE u.user_id = r.user_id
+                    RETURNING u.user_id
+                )
+                SELECT request_id, user_id, username, diamond_amount, manat_amount
+                FROM rejected
+                ORDER BY request_id
+            """, {
+                "ids": list(request_ids),
+                "now": int(time.time())
+            })
+            rejected = cursor.fetchall()
             conn.commit()
-
-            # ✅ YENİ: Günlük çekim istatistiğini güncelle
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Toplu red hatası: {e}")
+            rejected = []
+        finally:
             cursor.close()
             self.return_connection(conn)
-            self.update_daily_withdrawn(user_id, float(diamond_amount))
-            return
 
-        cursor.close()
-        self.return_connection(conn)
+        result = []
+        for r in rejected:
+            req_dict = dict(r)
+            req_dict['diamond_amount'] = float(req_dict['diamond_amount'])
+            req_dict['manat_amount'] = float(req_dict['manat_amount'])
+            result.append(req_dict)
+        return result
 
-    def reject_withdrawal(self, request_id: int):
-        """Para çekme talebini reddet"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE withdrawal_requests
-            SET status = 'rejected', processed_date = %s
-            WHERE request_id = %s
-        """, (int(time.time()), request_id))
-        conn.commit()
-        cursor.close()
-        self.return_connection(conn)
+    def reject_withdrawal(self, request_id: int) -> Optional[Dict]:
+        """Para çekme talebini reddet - Returns: reddedilen talep veya None (yok/işlenmiş)"""
+        rejected = self.reject_withdrawals([request_id])
+        return rejected[0] if rejected else None
 
     def get_pending_withdrawals(self) -> List[Dict]:
         """Bekleyen para çekme taleplerini getir"""
@@ -973,6 +2050,36 @@ class Database:
             result.append(req_dict)
         return result
 
+    def get_pending_withdrawals_page(self, offset: int, limit: int) -> tuple[List[Dict], int]:
+        """Bekleyen talepleri sayfa sayfa getir (en eski önce) - Returns: (talepler, toplam)"""
+        conn = self.get_connection()
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute("""
+            SELECT *, COUNT(*) OVER () AS total_count
+            FROM withdrawal_requests
+            WHERE status = 'pending'
+            ORDER BY request_date ASC, request_id ASC
+            OFFSET %s LIMIT %s
+        """, (offset, limit))
+        requests = cursor.fetchall()
+
+        if requests:
+            total = requests[0]['total_count']
+        else:
+            cursor.execute("SELECT COUNT(*) AS total_count FROM withdrawal_requests WHERE status = 'pending'")
+            total = cursor.fetchone()['total_count']
+
+        cursor.close()
+        self.return_connection(conn)
+        result = []
+        for r in requests:
+            req_dict = dict(r)
+            req_dict.pop('total_count', None)
+            req_dict['diamond_amount'] = float(req_dict['diamond_amount'])
+            req_dict['manat_amount'] = float(req_dict['manat_amount'])
+            result.append(req_dict)
+        return result, total
+
     # ========== DİĞER İŞLEMLER ==========
 
     def get_all_user_ids(self) -> List[int]:
@@ -1173,40 +2280,392 @@ class Database:
 # Global database instance
 db = Database()
 
+# ============================================================================
+# ARKA PLAN BİLDİRİM KUYRUĞU
+# ============================================================================
+
+class NotificationQueue:
+    """Arka plan mesaj gönderici - Admin işlemleri Bot API çağrılarını beklemeden biter"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task = None
+
+    def put(self, chat_id, text: str, parse_mode: str = "HTML"):
+        """Mesajı kuyruğa ekle"""
+        self.queue.put_nowait((chat_id, text, parse_mode))
+
+    def start(self, application):
+        """Gönderici görevini başlat (post_init içinde çağrılır)"""
+        # application.create_task kullanılmaz: Application.stop() bu görevleri bekler,
+        # sonsuz döngü kapanışı kilitlerdi
+        if self.task is None:
+            self.task = asyncio.create_task(self._worker(application.bot))
+
+    async def stop(self, timeout: float = 5.0):
+        """Kuyruktakileri kısa süre göndermeyi dene, sonra görevi durdur (post_stop içinde)"""
+        if self.task is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Gönderilmemiş bildirim: {self.queue.qsize()}")
+        self.task.cancel()
+        self.task = None
+
+    async def _worker(self, bot):
+        while True:
+            chat_id, text, parse_mode = await self.queue.get()
+            try:
+                await bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+            except RetryAfter as e:
+                # Flood limiti - bekle ve bir kez daha dene
+                await asyncio.sleep(e.retry_after)
+                try:
+                    await bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+                except Exception as e:
+                    logging.error(f"Bildirim gönderilemedi {chat_id}: {e}")
+            except Exception as e:
+                logging.error(f"Bildirim gönderilemedi {chat_id}: {e}")
+            finally:
+                self.queue.task_done()
+            await asyncio.sleep(self.interval)
+
+# Global bildirim kuyruğu
+notifier = NotificationQueue(Config.NOTIFY_INTERVAL)
+
+# ============================================================================
+# JOB LİDERLİĞİ - PostgreSQL ADVISORY LOCK
+# ============================================================================
+
+class JobLeader:
+    """
+    Job başına liderlik - Her job adı için session-level advisory lock
+    Lock ayrı bir bağlantıda tutulur; instance ölürse bağlantı kapanır ve
+    lock serbest kalır, diğer instance bir sonraki kontrolde devralır
+    """
+
+    def __init__(self, dsn: str, namespace: str):
+        self.dsn = dsn
+        self.namespace = namespace
+        self.conn = None
+        self.names = set()  # Liderliği istenen job'lar
+        self.held = set()  # Lock'u bizde olan job'lar
+
+    def lock_key(self, name: str) -> int:
+        return zlib.crc32(f"{self.namespace}:{name}".encode())
+
+    def _connect(self):
+        if self.conn is None or self.conn.closed:
+            self.held.clear()
+            # Keepalive: kopan bağlantı hızlı fark edilir, lock bekletilmez
+            self.conn = psycopg2.connect(
+                self.dsn, keepalives=1, keepalives_idle=10,
+                keepalives_interval=5, keepalives_count=3
+            )
+            self.conn.autocommit = True
+        return self.conn
+
+    def _drop(self):
+        """Bağlantıyı kapat - Tüm lock'lar sunucu tarafında bırakılır"""
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        self.conn = None
+        self.held.clear()
+
+    def _ping(self) -> bool:
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            return True
+        except Exception as e:
+            logging.error(f"Liderlik bağlantısı koptu: {e}")
+            self._drop()
+            return False
+
+    def acquire(self, name: str) -> bool:
+        """Liderlik bizdeyse True - Değilse almayı dene"""
+        self.names.add(name)
+        if name in self.held and self._ping():
+            return True
+
+        try:
+            cursor = self._connect().cursor()
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (self.lock_key(name),))
+            acquired = cursor.fetchone()[0]
+            cursor.close()
+        except Exception as e:
+            logging.error(f"Liderlik alma hatası ({name}): {e}")
+            self._drop()
+            return False
+
+        if acquired:
+            self.held.add(name)
+            logging.info(f"👑 Job liderliği alındı: {name}")
+        return acquired
+
+    def renew(self):
+        """Tutulan lock'ların bağlantısını doğrula, boştakileri devralmayı dene"""
+        if self.held:
+            self._ping()
+        for name in self.names - self.held:
+            self.acquire(name)
+
+def leader_job(name: str, callback):
+    """Job callback'ini sadece lider instance'ta çalışacak şekilde sar"""
+    job_leader.names.add(name)
+
+    async def run(context: ContextTypes.DEFAULT_TYPE):
+        if not job_leader.acquire(name):
+            return
+        await callback(context)
+    return run
+
+# Global job liderliği - Bağlantı ilk kullanımda açılır
+job_leader = JobLeader(Config.DATABASE_URL, Config.LEADER_LOCK_NAMESPACE)
+
+# Global üyelik önbelleği
+membership_cache = MembershipCache(
+    Config.MEMBERSHIP_CACHE_TTL, Config.MEMBERSHIP_NEGATIVE_TTL, Config.MEMBERSHIP_CACHE_SIZE
+)
+
+# ============================================================================
+# EŞZAMANLI İŞLEME - KULLANICI BAŞINA SIRA
+# ============================================================================
+
+class UserOrderedProcessor(BaseUpdateProcessor):
+    """
+    CONCURRENT_UPDATES > 1 için güncelleme işleyici - Farklı kullanıcılar paralel,
+    aynı kullanıcının güncellemeleri geliş sırasıyla tek tek işlenir (cluster'daki sıra garantisi)
+    Sırada bekleyen güncelleme de bir işleme yeri tutar; aynı kullanıcının patlaması en kötü
+    durumda sıralı işlemeye (CONCURRENT_UPDATES=1) düşer
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self.locks: Dict[int, asyncio.Lock] = {}
+        self.holders: Dict[int, int] = {}  # Kilidi tutan + bekleyen güncelleme sayısı
+
+    async def do_process_update(self, update: object, coroutine):
+        user = update.effective_user if isinstance(update, Update) else None
+        if user is None:
+            await coroutine
+            return
+
+        # asyncio.Lock bekleyenleri geliş sırasıyla uyandırır
+        lock = self.locks.setdefault(user.id, asyncio.Lock())
+        self.holders[user.id] = self.holders.get(user.id, 0) + 1
+        try:
+            async with lock:
+                await coroutine
+        finally:
+            self.holders[user.id] -= 1
+            if not self.holders[user.id]:
+                del self.holders[user.id]
+                del self.locks[user.id]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
 # ============================================================================
 # YARDIMCI FONKSIYONLAR
 # ============================================================================
 
+MEMBER_STATUSES = ("member", "administrator", "creator")
+
+def normalize_member_status(member) -> str:
+    """ChatMember durumunu sadeleştir - Kısıtlı ama kanalda olan kullanıcı üye sayılır"""
+    if member.status == "restricted":
+        return "member" if getattr(member, "is_member", False) else "left"
+    return str(member.status)
+
 async def check_channel_membership(user_id: int, context: ContextTypes.DEFAULT_TYPE) -> tuple[bool, List[str]]:
     """
     Kullanıcının tüm zorunlu kanalları takip edip etmediğini kontrol et
+    Önce chat_member indeksine bakılır, bilinmeyen kanallar API'ye sorulur
     Returns: (is_member, not_joined_channels)
     """
     required_channels = db.get_required_channels()
+    known = db.lookup_channel_statuses([s['channel_id'] for s in required_channels], user_id)
     not_joined = []
 
     for sponsor in required_channels:
-        try:
-            member = await context.bot.get_chat_member(sponsor['channel_id'], user_id)
-            if member.status in ["left", "kicked"]:
+        status = known.get(sponsor['channel_id'])
+        if status is None:
+            try:
+                member = await context.bot.get_chat_member(sponsor['channel_id'], user_id)
+                status = normalize_member_status(member)
+                db.remember_channel_status(sponsor['channel_id'], user_id, status)
+            except Exception as e:
+                logging.error(f"Kanal kontrolü hatası {sponsor['channel_id']}: {e}")
                 not_joined.append(sponsor['channel_name'])
-        except Exception as e:
-            logging.error(f"Kanal kontrolü hatası {sponsor['channel_id']}: {e}")
+                continue
+        if status in ["left", "kicked"]:
             not_joined.append(sponsor['channel_name'])
 
     return (len(not_joined) == 0, not_joined)
 
-async def check_sponsor_membership(user_id: int, channel_id: str, context: ContextTypes.DEFAULT_TYPE) -> bool:
-    """Kullanıcının sponsor kanalını takip edip etmediğini kontrol et"""
+async def fetch_sponsor_membership(user_id: int, channel_id: str, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    """Üyeliği doğrudan Bot API'den sor - Sonuç indekse yazılır"""
     try:
         member = await context.bot.get_chat_member(channel_id, user_id)
-        if member.status in ["member", "administrator", "creator"]:
-            return True
-        return False
+        status = normalize_member_status(member)
+        db.remember_channel_status(channel_id, user_id, status)
+        return status in MEMBER_STATUSES
     except Exception as e:
         logging.error(f"Sponsor kontrol hatası: {e}")
         return False
 
+async def check_sponsor_membership(user_id: int, channel_id: str, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    """Kullanıcının sponsor kanalını takip edip etmediğini kontrol et - İndeks, önbellek, birleştirilmiş API"""
+    status = db.lookup_channel_statuses([channel_id], user_id).get(channel_id)
+    if status is not None:
+        return status in MEMBER_STATUSES
+
+    key = (user_id, channel_id)
+    cached = membership_cache.get(key)
+    if cached is not None:
+        return cached
+
+    # Aynı (kullanıcı, kanal) için devam eden çağrı varsa onu bekle
+    pending = membership_cache.inflight.get(key)
+    if pending is not None:
+        flush_unit()
+        return await asyncio.shield(pending)
+
+    task = asyncio.ensure_future(fetch_sponsor_membership(user_id, channel_id, context))
+    membership_cache.inflight[key] = task
+    flush_unit()
+    try:
+        is_member = await asyncio.shield(task)
+    finally:
+        if membership_cache.inflight.get(key) is task:
+            del membership_cache.inflight[key]
+    membership_cache.put(key, is_member)
+    return is_member
+
+async def verify_completion_membership(user_id: int, channel_id: str, bot) -> Optional[bool]:
+    """Doğrulama için üyelik - Bilinmiyorsa (API hatası, 429) None: ödüle dokunulmaz"""
+    status = db.lookup_channel_statuses([channel_id], user_id).get(channel_id)
+    if status is None:
+        try:
+            member = await bot.get_chat_member(channel_id, user_id)
+        except RetryAfter as e:
+            # Interaktif trafiğe yer aç - Bu tur burada yavaşlar
+            await asyncio.sleep(e.retry_after)
+            return None
+        except Exception as e:
+            logging.warning(f"Doğrulama kontrolü hatası {channel_id}: {e}")
+            return None
+        status = normalize_member_status(member)
+        db.remember_channel_status(channel_id, user_id, status)
+    return status in MEMBER_STATUSES
+
+async def verify_sponsor_admin_rights(bot) -> int:
+    """
+    Admin durumu hiç doğrulanmamış veya eskimiş sponsor kanallarını API'ye sor
+    Zorunlu kanallar görev ekranından geçmez - Üyelik indeksine güven buradan gelir
+    Returns: kontrol edilen kanal sayısı
+    """
+    fresh_since = int(time.time()) - Config.MEMBERSHIP_INDEX_TTL
+    checked = 0
+    for sponsor in db.get_active_sponsors():
+        verified_at = sponsor.get('bot_admin_verified_at')
+        if sponsor['bot_is_admin'] and verified_at is not None and verified_at >= fresh_since:
+            continue
+        try:
+            bot_member = await bot.get_chat_member(sponsor['channel_id'], bot.id)
+        except Exception as e:
+            logging.warning(f"Bot admin doğrulaması hatası {sponsor['channel_id']}: {e}")
+            continue
+        db.update_sponsor_bot_admin_status(
+            sponsor['sponsor_id'], bot_member.status in ["administrator", "creator"]
+        )
+        checked += 1
+    return checked
+
+def update_backlog(application: Application) -> int:
+    """İşlenen + kuyrukta bekleyen güncellemeler - CONCURRENT_UPDATES=1 iken de yükü gösterir"""
+    return int(metrics.gauge("bot_updates_in_flight")) + application.update_queue.qsize()
+
+async def verify_sponsor_completions(application: Application) -> tuple[int, int]:
+    """
+    Ödül alınmış görevleri toplu tekrar kontrol et, ayrılanların ödülünü geri al
+    Eşzamanlılık ve hız sınırlı; bot meşgulken tur erken biter, kalanlar sonraki tura kalır
+    Returns: (doğrulanan, geri alınan)
+    """
+    bot = application.bot
+    completions = db.get_unverified_completions(
+        int(time.time()) - Config.SPONSOR_VERIFY_DELAY, Config.SPONSOR_VERIFY_BATCH
+    )
+    if not completions:
+        return (0, 0)
+
+    semaphore = asyncio.Semaphore(Config.SPONSOR_VERIFY_CONCURRENCY)
+    stayed, left, unknown = [], [], []
+
+    async def check(row: Dict):
+        async with semaphore:
+            is_member = await verify_completion_membership(row['user_id'], row['channel_id'], bot)
+        if is_member is True:
+            stayed.append((row['user_id'], row['sponsor_id']))
+        elif is_member is False:
+            left.append((row['user_id'], row['sponsor_id']))
+        else:
+            unknown.append((row['user_id'], row['sponsor_id']))
+
+    tasks = []
+    for row in completions:
+        if update_backlog(application) >= Config.SPONSOR_VERIFY_MAX_BACKLOG:
+            break
+        tasks.append(asyncio.create_task(check(row)))
+        await asyncio.sleep(Config.SPONSOR_VERIFY_PAUSE)
+    await asyncio.gather(*tasks)
+
+    db.mark_completions_verified(stayed)
+    db.mark_completions_checked(unknown)
+    clawed = db.claw_back_sponsor_rewards(left)
+    for user_id, amount in clawed.items():
+        notifier.put(
+            user_id,
+            f"⚠️ <b>Sponsor kanaldan çykdyňyz!</b>\n\n"
+            f"💎 Zadanýa üçin alnan <b>{amount:.1f} diamond</b> yzyna alyndy.\n"
+            f"📢 Kanala gaýtadan goşulyp zadanýany täzeden ýerine ýetirip bilersiňiz."
+        )
+    return (len(stayed), len(left))
+
+async def handle_chat_member_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Sponsor kanallarındaki katılma/ayrılma olayları - Üyelik indeksini günceller"""
+    change = update.chat_member
+    chat = change.chat
+    keys = db.get_sponsor_channel_keys(chat.id, chat.username)
+    if not keys:
+        return
+
+    user_id = change.new_chat_member.user.id
+    status = normalize_member_status(change.new_chat_member)
+    db.record_channel_membership(keys, user_id, status)
+
+async def handle_bot_chat_member_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Botun sponsor kanalındaki yetkisi değişti - bot_is_admin güncellenir"""
+    change = update.my_chat_member
+    chat = change.chat
+    keys = db.get_sponsor_channel_keys(chat.id, chat.username)
+    if not keys:
+        return
+
+    is_admin = change.new_chat_member.status in ["administrator", "creator"]
+    db.update_bot_admin_status_by_chat(keys, is_admin)
+    logging.info(f"Bot admin durumu değişti {chat.id}: {is_admin}")
+
 async def check_bot_admin_in_sponsor(sponsor_id: int, context: ContextTypes.DEFAULT_TYPE) -> bool:
     """Botun sponsor kanalında admin olup olmadığını kontrol et"""
     sponsor = db.get_sponsor_by_id(sponsor_id)
@@ -1217,8 +2676,8 @@ async def check_bot_admin_in_sponsor(sponsor_id: int, context: ContextTypes.DEFA
         bot_member = await context.bot.get_chat_member(sponsor['channel_id'], context.bot.id)
         is_admin = bot_member.status in ["administrator", "creator"]
 
-        # Durumu veritabanında güncelle
-        if sponsor['bot_is_admin'] != is_admin:
+        # Durumu veritabanında güncelle - İlk olumlu cevap kanalı üyelik indeksi için güvenilir yapar
+        if sponsor['bot_is_admin'] != is_admin or (is_admin and sponsor.get('bot_admin_verified_at') is None):
             db.update_sponsor_bot_admin_status(sponsor_id, is_admin)
 
             # Eğer bot admin değilse, admin'e bildirim gönder
@@ -1430,33 +2889,33 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    # Kullanıcıyı kaydet
-    existing_user = db.get_user(user.id)
+    # Kullanıcıyı kaydet - zaten varsa hiçbir şey değişmez
+    signup = db.create_user(user.id, user.username or "noname", referred_by)
 
-    if not existing_user:
-        db.create_user(user.id, user.username or "noname", referred_by)
+    if signup is None:
+        await update.message.reply_text("❌ Bir hata ýüze çykdy! Biraz soňra täzeden synanyşyň.")
+        return
 
+    if signup['created']:
         welcome_msg = (
             f"🎊 <b>Gutlaýarys {user.first_name}!</b>\n\n"
             f"💎 Başlangyç bonusy: <b>{Config.NEW_USER_BONUS} diamond</b>\n"
         )
 
-        if referred_by:
+        if signup['referral_count'] is not None:
             welcome_msg += f"🎁 Sizi çagyran adama hem <b>{Config.REFERAL_REWARD} diamond</b> berildi!\n"
 
             try:
-                referrer_data = db.get_user(referred_by)
-                if referrer_data:
-                    await context.bot.send_message(
-                        chat_id=referred_by,
-                        text=(
-                            f"🎉 <b>Täze Referal!</b>\n\n"
-                            f"👤 @{user.username or user.first_name} siziň referalyňyz bilen bota goşuldy!\n"
-                            f"💎 Bonus: <b>+{Config.REFERAL_REWARD} diamond</b>\n\n"
-                            f"👥 Jemi referalyňyz: <b>{referrer_data['referral_count'] + 1}</b>"
-                        ),
-                        parse_mode="HTML"
-                    )
+                await context.bot.send_message(
+                    chat_id=referred_by,
+                    text=(
+                        f"🎉 <b>Täze Referal!</b>\n\n"
+                        f"👤 @{user.username or user.first_name} siziň referalyňyz bilen bota goşuldy!\n"
+                        f"💎 Bonus: <b>+{Config.REFERAL_REWARD} diamond</b>\n\n"
+                        f"👥 Jemi referalyňyz: <b>{signup['referral_count']}</b>"
+                    ),
+                    parse_mode="HTML"
+                )
             except Exception as e:
                 logging.error(f"Duýdyryş ugradylmady: {e}")
 
@@ -1608,13 +3067,13 @@ async def debug_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE)
 """
 DÜZELTME: SLOT oyunu için handler sıralaması düzeltildi
 """
-def main():
-    """Bot'u başlat"""
-    logging.basicConfig(
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        level=logging.INFO
-    )
-
+def build_application(run_jobs: bool = True, with_updater: bool = True, bot=None) -> Application:
+    """
+    Handler'ları ve job'ları kayıtlı Application oluştur
+    run_jobs=False: periyodik job'lar ve slot kurulumu başka bir işçide çalışır
+    with_updater=False: güncellemeler dışarıdan update_queue'ya verilir (webhook cluster)
+    bot: hazır Bot nesnesi (yük simülasyonu gibi durumlar için), yoksa token ile oluşturulur
+    """
     # Import handlers
     from bot_handlers import (
         button_callback,
@@ -1624,7 +3083,21 @@ def main():
     )
     from bot_admin import admin_command, handle_mass_post, handle_broadcast_message
 
-    application = Application.builder().token(Config.BOT_TOKEN).build()
+    builder = Application.builder()
+    if bot is None:
+        # Elle kurulan Bot'un varsayılan havuzu tek bağlantı - Builder'ın token() ile verdiği boyut
+        bot = MetricsBot(
+            Config.BOT_TOKEN,
+            request=HTTPXRequest(connection_pool_size=Config.BOT_API_POOL_SIZE),
+            get_updates_request=HTTPXRequest()
+        )
+    builder = builder.bot(bot)
+    if not with_updater:
+        builder = builder.updater(None)
+    if Config.CONCURRENT_UPDATES > 1:
+        # Aynı kullanıcının güncellemeleri yine sıralı - Handler'lar bu sıraya güvenir
+        builder = builder.concurrent_updates(UserOrderedProcessor(Config.CONCURRENT_UPDATES))
+    application = builder.build()
 
     # ============ KOMUTLAR ============
     application.add_handler(CommandHandler("start", start_command))
@@ -1639,10 +3112,16 @@ def main():
     application.add_handler(CommandHandler("approve", admin_command))
     application.add_handler(CommandHandler("reject", admin_command))
     application.add_handler(CommandHandler("resetdiamonds", reset_all_diamonds_command))
+    application.add_handler(CommandHandler("ban", admin_command))
+    application.add_handler(CommandHandler("unban", admin_command))
 
     # Callback handlers
     application.add_handler(CallbackQueryHandler(button_callback))
 
+    # Sponsor kanal üyelik olayları (bot kanalda admin olmalı)
+    application.add_handler(ChatMemberHandler(handle_chat_member_update, ChatMemberHandler.CHAT_MEMBER))
+    application.add_handler(ChatMemberHandler(handle_bot_chat_member_update, ChatMemberHandler.MY_CHAT_MEMBER))
+
     # ⚠️ ÖNEMLİ: SLOT HANDLER EN ÖNCE OLMALI!
     application.add_handler(MessageHandler(
         filters.TEXT & filters.Regex("^🎰 SLOT OÝNA$") & ~filters.COMMAND,
@@ -1667,15 +3146,60 @@ def main():
         await check_and_penalize_inactive_users(context.application)
 
     # İlk kontrolü 1 dakika sonra başlat, sonra her 6 saatte tekrarla
-    application.job_queue.run_repeating(
-        inactivity_job_callback,
-        interval=21600,  # 6 saat (saniye cinsinden)
-        first=60  # İlk çalıştırma 60 saniye sonra
-    )
+    if run_jobs:
+        application.job_queue.run_repeating(
+            leader_job("inactivity", inactivity_job_callback),
+            interval=21600,  # 6 saat (saniye cinsinden)
+            first=60  # İlk çalıştırma 60 saniye sonra
+        )
+
+    # ============ GÜNLÜK GÖREV TEMİZLİĞİ ============
+    async def task_purge_job_callback(context: ContextTypes.DEFAULT_TYPE):
+        """Her gece önceki günlerin görev kayıtlarını toplu sil"""
+        deleted = db.purge_old_task_completions()
+        logging.info(f"🧹 Eski görev kayıtları silindi: {deleted}")
+        deleted = db.purge_processed_actions()
+        logging.info(f"🧹 Eski işlem anahtarları silindi: {deleted}")
+        deleted = db.purge_stale_memberships()
+        logging.info(f"🧹 Eskimiş üyelik kayıtları silindi: {deleted}")
+
+    # Gün sınırı yerel saate göre hesaplandığı için job da yerel saatte çalışır
+    if run_jobs:
+        application.job_queue.run_daily(
+            leader_job("task_purge", task_purge_job_callback),
+            time=dt_time(0, 5, tzinfo=datetime.now().astimezone().tzinfo)
+        )
+
+    # ============ SPONSOR ÖDÜL DOĞRULAMASI ============
+    async def sponsor_verify_job_callback(context: ContextTypes.DEFAULT_TYPE):
+        """Görev ödülü alıp kanaldan ayrılanları bul ve ödülü geri al"""
+        await verify_sponsor_admin_rights(context.bot)
+        verified, revoked = await verify_sponsor_completions(context.application)
+        if verified or revoked:
+            logging.info(f"🔎 Sponsor doğrulaması: {verified} kaldı, {revoked} geri alındı")
+
+    if run_jobs:
+        application.job_queue.run_repeating(
+            leader_job("sponsor_verify", sponsor_verify_job_callback),
+            interval=Config.SPONSOR_VERIFY_INTERVAL,
+            first=Config.SPONSOR_VERIFY_INTERVAL
+        )
+
+    # ============ JOB LİDERLİĞİ ============
+    async def leader_renew_callback(context: ContextTypes.DEFAULT_TYPE):
+        """Lider ölürse job'lar bir sonraki tick'i beklemeden devralınır"""
+        job_leader.renew()
+
+    if run_jobs:
+        application.job_queue.run_repeating(
+            leader_renew_callback,
+            interval=Config.LEADER_RENEW_INTERVAL,
+            first=1
+        )
 
 
     # ============ SLOT BUTONU KURULUMU ============
-    async def setup_slot_on_startup(application):
+    async def setup_slot_on_startup(application) -> bool:
         try:
             keyboard = ReplyKeyboardMarkup(
                 [[KeyboardButton("🎰 SLOT OÝNA")]],
@@ -1695,10 +3219,56 @@ def main():
                 reply_markup=keyboard
             )
             logging.info("✅ SLOT butonu gönderildi")
+            return True
         except Exception as e:
             logging.error(f"Slot button kurulum hatası: {e}")
+            return False
+
+    async def slot_setup_job_callback(context: ContextTypes.DEFAULT_TYPE):
+        """Başlatılan instance'ların istediği slot butonunu lider tek sefer gönderir"""
+        if db.take_post("slot_keyboard") and not await setup_slot_on_startup(context.application):
+            db.request_post("slot_keyboard")
+
+    if run_jobs:
+        application.job_queue.run_repeating(
+            leader_job("slot_setup", slot_setup_job_callback),
+            interval=Config.LEADER_RENEW_INTERVAL,
+            first=1
+        )
+
+    async def post_init(application):
+        notifier.start(application)
+        db.refresh_banned_users()
+        # Slot butonu isteği DB'de tutulur - Lider ölse de devralan instance gönderir
+        if run_jobs:
+            db.request_post("slot_keyboard")
+
+    async def post_stop(application):
+        await notifier.stop()
+
+    application.post_init = post_init
+    application.post_stop = post_stop
+
+    # Güncelleme başına tek bağlantı ve tek commit - Ölçüm commit süresini de kapsar
+    bind_units(application, db.connection_pool)
+
+    # Tüm handler'lar süre/hata ölçümüyle sarılır
+    instrument_application(application)
+
+    # Ön filtre - Ölçümden sonra eklenir: düşürülen güncellemeler handler metriği üretmez
+    from bot_guard import prefilter_update
+    application.add_handler(TypeHandler(Update, prefilter_update), group=-1)
+    return application
+
+def main():
+    """Bot'u başlat - Tek süreç, polling"""
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
 
-    application.post_init = setup_slot_on_startup
+    application = build_application()
+    start_metrics_server(Config.METRICS_PORT)
 
     # ============ BOTU BAŞLAT ============
     print("🤖 Bot başladı...")
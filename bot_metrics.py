@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Metrik Modülü - Handler gecikmesi, DB / Bot API / bekleme süreleri, hata sayıları
+Her güncelleme için süreler bir contextvar'da toplanır; sonuçlar Prometheus
+metin formatında yerel bir HTTP endpoint'inden (/metrics) okunur.
+SQL profili (en yavaş / en sık ifadeler) /queries adresinden düz metin okunur.
+Bu modül bot_main'i import etmez - bot_main bu modülü kullanır.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+import psycopg2.extensions
+from telegram.error import RetryAfter
+from telegram.ext import ExtBot
+
+from bot_uow import flush_unit, strip_savepoint_prefix
+
+# Prometheus varsayılanlarına yakın kovalar (saniye)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# ============================================================================
+# METRİK KAYDI
+# ============================================================================
+
+class Histogram:
+    """Sabit kovalı histogram"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+class MetricsRegistry:
+    """Sayaç ve histogramlar - Event loop yazar, HTTP thread'i okur"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[str, Dict[tuple, float]] = {}
+        self.histograms: Dict[str, Dict[tuple, Histogram]] = {}
+        self.gauges: Dict[str, float] = {}
+        self.help: Dict[str, str] = {}
+
+    def describe(self, name: str, text: str):
+        self.help[name] = text
+
+    def inc(self, name: str, labels: tuple = (), amount: float = 1):
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + amount
+
+    def observe(self, name: str, labels: tuple, value: float):
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = Histogram()
+            histogram.observe(value)
+
+    def add_gauge(self, name: str, amount: float):
+        with self.lock:
+            self.gauges[name] = self.gauges.get(name, 0) + amount
+
+    def gauge(self, name: str) -> float:
+        with self.lock:
+            return self.gauges.get(name, 0)
+
+    def counter_values(self, name: str) -> Dict[tuple, float]:
+        with self.lock:
+            return dict(self.counters.get(name, {}))
+
+    @staticmethod
+    def _labels(labels: tuple, extra: str = "") -> str:
+        parts = [
+            '%s="%s"' % (key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+            for key, value in labels
+        ]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> str:
+        """Prometheus metin formatı"""
+        lines = []
+        with self.lock:
+            for name, series in sorted(self.counters.items()):
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in series.items():
+                    lines.append(f"{name}{self._labels(labels)} {value}")
+            for name, value in sorted(self.gauges.items()):
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+            for name, series in sorted(self.histograms.items()):
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in series.items():
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        bucket = self._labels(labels, 'le="%s"' % bound)
+                        lines.append(f"{name}_bucket{bucket} {count}")
+                    bucket = self._labels(labels, 'le="+Inf"')
+                    lines.append(f"{name}_bucket{bucket} {histogram.count}")
+                    lines.append(f"{name}_sum{self._labels(labels)} {histogram.total}")
+                    lines.append(f"{name}_count{self._labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+# Global metrik kaydı
+metrics = MetricsRegistry()
+metrics.describe("bot_update_seconds", "Handler toplam süresi")
+metrics.describe("bot_update_db_seconds", "Güncelleme başına SQL süresi")
+metrics.describe("bot_update_api_seconds", "Güncelleme başına Bot API süresi")
+metrics.describe("bot_update_sleep_seconds", "Güncelleme başına animasyon beklemesi")
+metrics.describe("bot_update_errors_total", "Handler hataları")
+metrics.describe("bot_api_calls_total", "Bot API çağrıları (metot, handler)")
+metrics.describe("bot_api_retry_after_total", "429 RetryAfter cevapları (metot, handler)")
+metrics.describe("bot_api_retry_after_seconds_total", "429 ile istenen toplam bekleme")
+metrics.describe("bot_api_retry_after_seconds", "429 ile istenen bekleme dağılımı")
+metrics.describe("bot_updates_in_flight", "Şu anda işlenen güncelleme sayısı")
+
+# ============================================================================
+# GÜNCELLEME BAŞINA SÜRE TAKİBİ
+# ============================================================================
+
+# Aktif güncellemenin süre sepeti: {"db": sn, "api": sn, "sleep": sn}
+current_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "current_timings", default=None
+)
+
+# Aktif güncellemeyi işleyen handler etiketi - Job ve arka plan görevlerinde "background"
+current_handler: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_handler", default="background"
+)
+
+@contextmanager
+def track(kind: str):
+    """Bloğun süresini aktif güncellemenin ilgili sepetine ekle"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = current_timings.get()
+        if timings is not None:
+            timings[kind] += time.perf_counter() - started
+
+async def pause(seconds: float):
+    """Animasyon beklemesi - asyncio.sleep yerine, süre 'sleep' olarak sayılır"""
+    flush_unit()
+    with track("sleep"):
+        await asyncio.sleep(seconds)
+
+def update_label(update, fallback: str) -> str:
+    """Metrik etiketi - Callback'lerde sayı içermeyen önek, komutlarda komut adı"""
+    query = getattr(update, "callback_query", None)
+    if query is not None and query.data:
+        parts = []
+        for part in query.data.split("_"):
+            if any(ch.isdigit() for ch in part):
+                break
+            parts.append(part)
+        return "_".join(parts) or fallback
+
+    message = getattr(update, "message", None)
+    if message is not None and message.text and message.text.startswith("/"):
+        return message.text.split()[0].split("@")[0]
+    return fallback
+
+def instrument(callback, name: Optional[str] = None):
+    """Handler callback'ini süre ve hata ölçümüyle sar"""
+    fallback = name or callback.__name__
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        label = update_label(update, fallback)
+        timings = {"db": 0.0, "api": 0.0, "sleep": 0.0}
+        token = current_timings.set(timings)
+        handler_token = current_handler.set(label)
+        started = time.perf_counter()
+        metrics.add_gauge("bot_updates_in_flight", 1)
+        try:
+            return await callback(update, context)
+        except Exception as e:
+            metrics.inc("bot_update_errors_total", (("handler", label), ("error", type(e).__name__)))
+            raise
+        finally:
+            metrics.add_gauge("bot_updates_in_flight", -1)
+            elapsed = time.perf_counter() - started
+            current_timings.reset(token)
+            current_handler.reset(handler_token)
+            labels = (("handler", label),)
+            metrics.observe("bot_update_seconds", labels, elapsed)
+            metrics.observe("bot_update_db_seconds", labels, timings["db"])
+            metrics.observe("bot_update_api_seconds", labels, timings["api"])
+            metrics.observe("bot_update_sleep_seconds", labels, timings["sleep"])
+
+    return wrapper
+
+def instrument_application(application):
+    """Kayıtlı tüm handler'ları ölçümle sar (build_application sonunda çağrılır)"""
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            handler.callback = instrument(handler.callback)
+
+# ============================================================================
+# DB VE BOT API ÖLÇÜMÜ
+# ============================================================================
+
+class QueryProfiler:
+    """
+    SQL profili - İfade (fingerprint) başına çağrı, süre, satır ve çağıran metot
+    En pahalı max_statements ifade tutulur; eşik üstü sorgular loglanır
+    """
+
+    def __init__(self, slow_threshold: float = 0.2, max_statements: int = 500):
+        self.slow_threshold = slow_threshold
+        self.max_statements = max_statements
+        self.lock = threading.Lock()
+        self.statements: Dict[str, Dict] = {}
+
+    @staticmethod
+    def fingerprint(query) -> str:
+        """Parametreler ayrı geldiği için boşlukları sadeleştirmek yeterli"""
+        if isinstance(query, bytes):
+            query = query.decode(errors="replace")
+        return " ".join(strip_savepoint_prefix(str(query)).split())
+
+    @staticmethod
+    def caller() -> str:
+        """SQL'i çalıştıran ilk dış fonksiyon (Database metodu)"""
+        frame = sys._getframe(2)
+        while frame is not None and frame.f_code.co_filename == __file__:
+            frame = frame.f_back
+        return frame.f_code.co_name if frame is not None else "?"
+
+    def record(self, query, elapsed: float, rows: int, caller: str):
+        fingerprint = self.fingerprint(query)
+        with self.lock:
+            stats = self.statements.get(fingerprint)
+            if stats is None:
+                if len(self.statements) >= self.max_statements:
+                    # Toplam süresi en az olanı at - Pahalı ifadeler kalır
+                    cheapest = min(self.statements, key=lambda k: self.statements[k]["total"])
+                    del self.statements[cheapest]
+                stats = self.statements[fingerprint] = {
+                    "calls": 0, "total": 0.0, "max": 0.0, "rows": 0, "callers": {}
+                }
+            stats["calls"] += 1
+            stats["total"] += elapsed
+            stats["max"] = max(stats["max"], elapsed)
+            stats["rows"] += max(rows, 0)
+            stats["callers"][caller] = stats["callers"].get(caller, 0) + 1
+
+        metrics.inc("bot_sql_seconds_total", (("method", caller),), elapsed)
+        metrics.inc("bot_sql_calls_total", (("method", caller),))
+        if elapsed >= self.slow_threshold:
+            logging.warning(
+                f"🐢 Yavaş sorgu {elapsed * 1000:.1f} ms ({caller}, {rows} satır): {fingerprint[:300]}"
+            )
+
+    def top(self, n: int = 20, by: str = "total") -> list:
+        """by: total | max | calls"""
+        with self.lock:
+            items = [(k, dict(v, callers=dict(v["callers"]))) for k, v in self.statements.items()]
+        items.sort(key=lambda item: item[1][by], reverse=True)
+        return items[:n]
+
+    def report(self, n: int = 20) -> str:
+        """En yavaş ve en sık ifadeler - /queries endpoint'i için düz metin"""
+        lines = []
+        for title, by in (("TOPLAM SÜRE", "total"), ("EN YAVAŞ", "max"), ("EN SIK", "calls")):
+            lines.append(f"=== {title} ===")
+            for fingerprint, stats in self.top(n, by):
+                callers = ", ".join(f"{name}×{count}" for name, count in stats["callers"].items())
+                lines.append(
+                    f"{stats['total'] * 1000:10.1f} ms toplam  {stats['max'] * 1000:8.1f} ms max  "
+                    f"{stats['calls']:7} çağrı  {stats['rows']:8} satır  [{callers}]  {fingerprint[:200]}"
+                )
+            lines.append("")
+        return "\n".join(lines)
+
+# Global SQL profili - Eşik bot_main'de Config'ten ayarlanır
+query_profiler = QueryProfiler()
+metrics.describe("bot_sql_seconds_total", "Database metodu başına toplam SQL süresi")
+metrics.describe("bot_sql_calls_total", "Database metodu başına SQL çağrısı")
+
+class MetricsCursorMixin:
+    """execute süresini 'db' sepetine ve SQL profiline ekler"""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            self._profile(query, started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            self._profile(query, started)
+
+    def _profile(self, query, started: float):
+        elapsed = time.perf_counter() - started
+        timings = current_timings.get()
+        if timings is not None:
+            timings["db"] += elapsed
+        query_profiler.record(query, elapsed, self.rowcount, QueryProfiler.caller())
+
+_cursor_classes: Dict[type, type] = {}
+
+def metrics_cursor_class(base: type) -> type:
+    """Her cursor türü (RealDictCursor vb.) için ölçümlü alt sınıf"""
+    cls = _cursor_classes.get(base)
+    if cls is None:
+        cls = _cursor_classes[base] = type(f"Metrics{base.__name__}", (MetricsCursorMixin, base), {})
+    return cls
+
+class MetricsConnection(psycopg2.extensions.connection):
+    """Pool'a connection_factory olarak verilir - Tüm cursor'lar ölçümlü açılır"""
+
+    def cursor(self, *args, **kwargs):
+        base = kwargs.get("cursor_factory") or self.cursor_factory or psycopg2.extensions.cursor
+        kwargs["cursor_factory"] = metrics_cursor_class(base)
+        return super().cursor(*args, **kwargs)
+
+    def commit(self):
+        with track("db"):
+            return super().commit()
+
+class MetricsBot(ExtBot):
+    """Bot API çağrıları - Süre 'api' sepetine, sayılar metot ve handler başına"""
+
+    async def _post(self, endpoint: str, data=None, **kwargs):
+        handler = current_handler.get()
+        # Bekleyen yazmalar ağ beklemesinden önce commit edilir - Kilitler tutulmaz
+        flush_unit()
+        metrics.inc("bot_api_calls_total", (("method", endpoint), ("handler", handler)))
+        try:
+            with track("api"):
+                return await super()._post(endpoint, data, **kwargs)
+        except RetryAfter as e:
+            retry_after = getattr(e.retry_after, "total_seconds", lambda: e.retry_after)()
+            metrics.inc("bot_api_retry_after_total", (("method", endpoint), ("handler", handler)))
+            metrics.inc("bot_api_retry_after_seconds_total", (("method", endpoint),), retry_after)
+            metrics.observe("bot_api_retry_after_seconds", (("method", endpoint),), retry_after)
+            raise
+
+def api_usage_summary(limit: int = 10) -> Dict[str, list]:
+    """Admin paneli için - En çok çağrılan metotlar/handler'lar ve 429'lar"""
+    by_method: Dict[str, float] = {}
+    by_handler: Dict[str, float] = {}
+    for labels, count in metrics.counter_values("bot_api_calls_total").items():
+        values = dict(labels)
+        by_method[values["method"]] = by_method.get(values["method"], 0) + count
+        by_handler[values["handler"]] = by_handler.get(values["handler"], 0) + count
+
+    limited: Dict[str, float] = {}
+    for labels, count in metrics.counter_values("bot_api_retry_after_total").items():
+        values = dict(labels)
+        key = f"{values['handler']} → {values['method']}"
+        limited[key] = limited.get(key, 0) + count
+    delays = {
+        dict(labels)["method"]: seconds
+        for labels, seconds in metrics.counter_values("bot_api_retry_after_seconds_total").items()
+    }
+
+    def top(counts: Dict[str, float]) -> list:
+        return sorted(counts.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    return {
+        "methods": top(by_method),
+        "handlers": top(by_handler),
+        "rate_limited": top(limited),
+        "retry_delays": top(delays),
+    }
+
+# ============================================================================
+# HTTP ENDPOINT
+# ============================================================================
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/metrics":
+            body = metrics.render().encode()
+        elif path == "/queries":
+            body = query_profiler.report().encode()
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port: int):
+    """/metrics endpoint'ini arka plan thread'inde başlat (port 0 = kapalı)"""
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+    except OSError as e:
+        # Port doluysa bot metriksiz çalışmaya devam eder
+        logging.error(f"❌ Metrik sunucusu başlatılamadı (port {port}): {e}")
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logging.info(f"📈 Metrikler: http://127.0.0.1:{port}/metrics")
+    return server
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Callback Router Modülü - Kayıt tabanlı buton yönlendirmesi
+Sabit callback'ler sözlükten, parametreli olanlar (apple_choice_1_2 gibi)
+önek ağacından bulunur; arama süresi route sayısından bağımsızdır.
+Admin kontrolü, aktivite güncellemesi ve kullanıcı kaydı route bilgisine
+göre tek yerde uygulanır.
+"""
+
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from bot_main import db, Config
+
+CallbackFunc = Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[None]]
+
+class Route:
+    """Tek bir callback route'u ve ortak kontrolleri"""
+
+    __slots__ = ("pattern", "handler", "requires_admin", "touches_activity", "needs_user", "dedupe_taps")
+
+    def __init__(self, pattern: str, handler: CallbackFunc, requires_admin: bool = False,
+                 touches_activity: bool = True, needs_user: bool = False, dedupe_taps: bool = False):
+        self.pattern = pattern
+        self.handler = handler
+        self.requires_admin = requires_admin
+        self.touches_activity = touches_activity
+        self.needs_user = needs_user
+        self.dedupe_taps = dedupe_taps
+
+class CallbackRouter:
+    """Tam eşleşme sözlüğü + önek ağacı (en uzun önek kazanır)"""
+
+    def __init__(self):
+        self.exact: Dict[str, Route] = {}
+        self.trie: Dict = {}  # karakter -> alt düğüm, None anahtarı -> Route
+
+    def add(self, pattern: str, handler: CallbackFunc, prefix: bool = False, **options):
+        """Route ekle - prefix=True ise pattern ile başlayan tüm callback'ler"""
+        route = Route(pattern, handler, **options)
+        if not prefix:
+            if pattern in self.exact:
+                raise ValueError(f"Callback zaten kayıtlı: {pattern}")
+            self.exact[pattern] = route
+            return
+
+        node = self.trie
+        for ch in pattern:
+            node = node.setdefault(ch, {})
+        if None in node:
+            raise ValueError(f"Callback öneki zaten kayıtlı: {pattern}")
+        node[None] = route
+
+    def resolve(self, data: str) -> Optional[Route]:
+        route = self.exact.get(data)
+        if route is not None:
+            return route
+
+        # game_ ve game_play_ gibi iç içe öneklerde en uzunu seçilir
+        found = None
+        node = self.trie
+        for ch in data:
+            node = node.get(ch)
+            if node is None:
+                break
+            found = node.get(None, found)
+        return found
+
+    async def dispatch(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """CallbackQueryHandler callback'i"""
+        query = update.callback_query
+        user_id = query.from_user.id
+        route = self.resolve(query.data or "")
+
+        if route is None:
+            await query.answer()
+            db.update_last_activity(user_id)
+            logging.debug(f"Bilinmeyen callback: {query.data}")
+            return
+
+        if route.requires_admin and user_id not in Config.ADMIN_IDS:
+            await query.answer("❌ Siziň admin wezipaňiz ýok!", show_alert=True)
+            return
+
+        # Aynı mesajdaki aynı butona çift basış - İkincisi sessizce düşer
+        if route.dedupe_taps and query.message is not None and \
+                not db.claim_tap(user_id, query.data, query.message.message_id):
+            await query.answer()
+            return
+
+        if route.needs_user:
+            # Handler kaydı context.user_record üzerinden okur - Tekrar sorgulanmaz
+            context.user_record = db.get_user(user_id)
+            if not context.user_record:
+                await query.answer("❌ Hata! /start ile başlayın", show_alert=True)
+                return
+
+        await query.answer()
+
+        if route.touches_activity:
+            db.update_last_activity(user_id)
+
+        await route.handler(update, context)
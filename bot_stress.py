@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Eşzamanlılık Stres Testi - Para hareket ettiren Database metotlarını paralel çağırır
+Promo kod: max_uses'tan fazla kullanıcı aynı kodu aynı anda (çift dokunuşla) kullanır;
+kullanım sayısı ve verilen diamond max_uses'ı aşmamalı, kullanıcı başına tek ödül.
+Para çekme: aynı kullanıcı aynı anda birden çok talep gönderir; tek talep açılmalı,
+bakiye eksiye düşmemeli ve bloke edilen diamond bakiyeden tam düşmeli.
+Bir kontrol bozulursa çıkış kodu 1 olur.
+
+⚠️ DATABASE_URL yerel/test veritabanını göstermeli - Test satır ekler/siler.
+Çalıştırma: python bot_stress.py --users 200 --threads 32 --max-uses 50
+"""
+
+import argparse
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import psycopg2.pool
+
+from bot_main import db, Config, MetricsConnection
+
+STRESS_USER_BASE = -3_000_000_000  # Negatif ve aşağı doğru - Telegram kullanıcı ID'leri pozitif, gerçek kullanıcıyla çakışmaz
+STRESS_PROMO_PREFIX = "STRESS-"
+
+# ============================================================================
+# VERİ
+# ============================================================================
+
+def use_threaded_pool(threads: int):
+    """SimpleConnectionPool thread-safe değil - Test süresince thread'ler arası paylaşılabilir havuz"""
+    db.connection_pool.closeall()
+    db.connection_pool = psycopg2.pool.ThreadedConnectionPool(
+        1, threads + 2,
+        Config.DATABASE_URL,
+        connection_factory=MetricsConnection
+    )
+
+def seed_users(user_ids: List[int], diamond: float):
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO users (user_id, username, diamond, joined_date, last_activity)
+        SELECT id, 'stress', %s, %s, %s FROM unnest(%s::bigint[]) AS id
+    """, (diamond, int(time.time()), int(time.time()), user_ids))
+    conn.commit()
+    cursor.close()
+    db.return_connection(conn)
+
+def cleanup(user_ids: List[int], promo_code: str):
+    """Bu çalıştırmanın kullanıcılarını ve promo kodunu sil - Başka satıra dokunmaz"""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    for table in ("used_promo_codes", "withdrawal_requests", "daily_stats", "users"):
+        cursor.execute(f"DELETE FROM {table} WHERE user_id = ANY(%s)", (user_ids,))
+    cursor.execute("DELETE FROM promo_codes WHERE code = %s", (promo_code,))
+    conn.commit()
+    cursor.close()
+    db.return_connection(conn)
+    db.promo_index.remove(promo_code)
+
+def fetch_one(sql: str, params: tuple):
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    row = cursor.fetchone()
+    cursor.close()
+    db.return_connection(conn)
+    return row
+
+def run_parallel(calls: List[tuple], threads: int) -> List:
+    """Tüm çağrılar kuyruğa girince aynı anda başlar - İlk dalga kapıda bekler"""
+    start = threading.Event()
+
+    def call(item):
+        fn, args = item
+        start.wait()
+        return fn(*args)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [pool.submit(call, item) for item in calls]
+        start.set()
+        return [future.result() for future in futures]
+
+# ============================================================================
+# SENARYOLAR
+# ============================================================================
+
+def stress_promo(user_ids: List[int], promo_code: str, max_uses: int, reward: float,
+                 taps: int, threads: int) -> List[str]:
+    """max_uses'tan fazla kullanıcı, her biri taps kez - Fazla kullanım olmamalı"""
+    db.create_promo_code(promo_code, reward, max_uses)
+    calls = [(db.use_promo_code, (promo_code, user_id)) for user_id in user_ids for _ in range(taps)]
+    started = time.perf_counter()
+    results = run_parallel(calls, threads)
+    elapsed = time.perf_counter() - started
+
+    rewarded = Counter(user_id for (_, (_, user_id)), result in zip(calls, results)
+                       if result is not None and result > 0)
+    expected = min(max_uses, len(user_ids))
+    current_uses = fetch_one("SELECT current_uses FROM promo_codes WHERE code = %s", (promo_code,))[0]
+    used_rows = fetch_one("SELECT COUNT(*) FROM used_promo_codes WHERE code = %s", (promo_code,))[0]
+    credited = float(fetch_one("SELECT COALESCE(SUM(diamond), 0) FROM users WHERE user_id = ANY(%s)",
+                               (user_ids,))[0])
+
+    print(f"🎟 {len(calls)} kullanım / {elapsed:.2f} sn - sonuçlar: {dict(Counter(results))}")
+    failures = []
+    if current_uses != expected:
+        failures.append(f"current_uses {current_uses} != {expected}")
+    if used_rows != expected:
+        failures.append(f"used_promo_codes {used_rows} != {expected}")
+    if sum(rewarded.values()) != expected:
+        failures.append(f"başarılı kullanım {sum(rewarded.values())} != {expected}")
+    if any(count > 1 for count in rewarded.values()):
+        failures.append("aynı kullanıcı birden çok ödül aldı")
+    if abs(credited - expected * reward) > 1e-6:
+        failures.append(f"verilen diamond {credited} != {expected * reward}")
+    return failures
+
+def stress_withdrawals(user_ids: List[int], amount: float, taps: int, threads: int) -> List[str]:
+    """Bakiye iki talebe yeter, her kullanıcı taps talep - Tek talep açılmalı"""
+    balance = amount * 2
+    seed_users(user_ids, balance)
+    calls = [(db.create_withdrawal_request, (user_id, "stress", amount, amount / Config.DIAMOND_TO_MANAT))
+             for user_id in user_ids for _ in range(taps)]
+    started = time.perf_counter()
+    results = run_parallel(calls, threads)
+    elapsed = time.perf_counter() - started
+
+    opened: Dict[int, int] = Counter(user_id for (_, (user_id, *_)), result in zip(calls, results)
+                                     if result > 0)
+    pending = fetch_one("""
+        SELECT COUNT(*), COUNT(DISTINCT user_id) FROM withdrawal_requests
+        WHERE user_id = ANY(%s) AND status = 'pending'
+    """, (user_ids,))
+    balances = fetch_one("""
+        SELECT MIN(diamond), SUM(diamond) FROM users WHERE user_id = ANY(%s)
+    """, (user_ids,))
+
+    print(f"💸 {len(calls)} talep / {elapsed:.2f} sn - sonuçlar: "
+          f"{dict(Counter('açıldı' if r > 0 else r for r in results))}")
+    failures = []
+    if len(opened) != len(user_ids) or any(count != 1 for count in opened.values()):
+        failures.append("kullanıcı başına tam bir talep açılmadı")
+    if pending[0] != len(user_ids) or pending[1] != len(user_ids):
+        failures.append(f"bekleyen talep {pending[0]} (kullanıcı {pending[1]}) != {len(user_ids)}")
+    if float(balances[0]) < 0:
+        failures.append(f"eksi bakiye: {balances[0]}")
+    if abs(float(balances[1]) - len(user_ids) * (balance - amount)) > 1e-6:
+        failures.append(f"toplam bakiye {balances[1]} != {len(user_ids) * (balance - amount)}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Para hareketleri eşzamanlılık stres testi")
+    parser.add_argument("--users", type=int, default=200, help="Kullanıcı sayısı")
+    parser.add_argument("--threads", type=int, default=32, help="Paralel çağrı sayısı")
+    parser.add_argument("--max-uses", type=int, default=50, help="Promo kodun kullanım hakkı")
+    parser.add_argument("--taps", type=int, default=2, help="Kullanıcı başına aynı anda gelen istek")
+    args = parser.parse_args()
+
+    use_threaded_pool(args.threads)
+    run_id = uuid.uuid4().hex[:8].upper()
+    promo_code = f"{STRESS_PROMO_PREFIX}{run_id}"
+    promo_users = [STRESS_USER_BASE - i for i in range(1, args.users + 1)]
+    withdraw_users = [STRESS_USER_BASE - args.users - i for i in range(1, args.users + 1)]
+    all_users = promo_users + withdraw_users
+
+    failures = []
+    try:
+        cleanup(all_users, promo_code)
+        seed_users(promo_users, 0)
+        failures += stress_promo(promo_users, promo_code, args.max_uses, 0.5, args.taps, args.threads)
+        failures += stress_withdrawals(withdraw_users, Config.WITHDRAW_OPTIONS[0], args.taps, args.threads)
+    finally:
+        cleanup(all_users, promo_code)
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ Fazla kullanım ve çift harcama yok")
+
+
+if __name__ == "__main__":
+    main()
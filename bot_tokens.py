@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Callback Token Modülü - Oyun durumunu imzalı ve şifreli olarak callback_data içinde taşır
+Sunucu bellekte oyun durumu tutmaz; herhangi bir işçi tıklamayı doğrulayıp işleyebilir.
+
+Token: "<sürüm rakamı><base64url(gövde)>"
+Gövde: oyun (1) | nonce (4) | başlangıç zamanı (4) | açık kısım | şifreli kısım | HMAC (8)
+Açık kısım butona özgü (seçim, açılan kartlar), şifreli kısım oyunun sonucudur
+(elmanın yeri, kart dizilimi) - Kullanıcı callback_data'yı okusa da sonucu göremez.
+HMAC kullanıcı ID'sini de kapsar: Token başka kullanıcıda geçersizdir.
+Bu modül bot_main'i import etmez.
+"""
+
+import base64
+import hashlib
+import hmac
+import secrets
+import struct
+import time
+from typing import Tuple
+
+TOKEN_VERSION = 1  # Tek rakam - Metrik etiketi rakam içeren parçada kesilir
+
+# Oyun kimlikleri
+GAME_APPLE = 1
+GAME_SCRATCH = 2
+
+MAC_SIZE = 8
+HEADER = struct.Struct(">BII")  # oyun, nonce, başlangıç zamanı
+
+class TokenError(Exception):
+    """Token bozuk, imzası geçersiz veya süresi dolmuş"""
+
+class CallbackCodec:
+    """HMAC-SHA256 ile imzalama + nonce'a bağlı anahtar akışıyla şifreleme"""
+
+    def __init__(self, secret: str):
+        root = hashlib.sha256(secret.encode()).digest()
+        self.mac_key = hmac.new(root, b"callback-mac", hashlib.sha256).digest()
+        self.enc_key = hmac.new(root, b"callback-enc", hashlib.sha256).digest()
+
+    def _keystream(self, header: bytes, user_id: int, size: int) -> bytes:
+        # Şifreli kısım bir oyun boyunca sabit - Aynı akışın tekrar kullanılması bilgi sızdırmaz
+        if size > 32:
+            raise ValueError("Şifreli kısım en fazla 32 bayt olabilir")
+        return hmac.new(self.enc_key, header + struct.pack(">q", user_id), hashlib.sha256).digest()[:size]
+
+    def _mac(self, body: bytes, user_id: int) -> bytes:
+        message = bytes([TOKEN_VERSION]) + body + struct.pack(">q", user_id)
+        return hmac.new(self.mac_key, message, hashlib.sha256).digest()[:MAC_SIZE]
+
+    def encode(self, game: int, user_id: int, nonce: int, started_at: int,
+               public: bytes, secret: bytes) -> str:
+        header = HEADER.pack(game, nonce, started_at)
+        stream = self._keystream(header, user_id, len(secret))
+        body = header + public + bytes(a ^ b for a, b in zip(secret, stream))
+        token = base64.urlsafe_b64encode(body + self._mac(body, user_id)).rstrip(b"=")
+        return f"{TOKEN_VERSION}{token.decode()}"
+
+    def decode(self, token: str, game: int, user_id: int, public_size: int,
+               max_age: float) -> Tuple[int, int, bytes, bytes]:
+        """Returns: (nonce, başlangıç zamanı, açık kısım, şifreli kısmın çözülmüşü)"""
+        if not token or token[0] != str(TOKEN_VERSION):
+            raise TokenError("Desteklenmeyen token sürümü")
+        try:
+            raw = base64.urlsafe_b64decode(token[1:] + "=" * (-len(token[1:]) % 4))
+        except (ValueError, TypeError):
+            raise TokenError("Token çözülemedi")
+        if len(raw) < HEADER.size + public_size + MAC_SIZE:
+            raise TokenError("Token çok kısa")
+
+        body, mac = raw[:-MAC_SIZE], raw[-MAC_SIZE:]
+        if not hmac.compare_digest(mac, self._mac(body, user_id)):
+            raise TokenError("İmza geçersiz")
+
+        token_game, nonce, started_at = HEADER.unpack_from(body)
+        if token_game != game:
+            raise TokenError("Token başka bir oyuna ait")
+        if time.time() - started_at > max_age:
+            raise TokenError("Token süresi doldu")
+
+        header = body[:HEADER.size]
+        public = body[HEADER.size:HEADER.size + public_size]
+        encrypted = body[HEADER.size + public_size:]
+        stream = self._keystream(header, user_id, len(encrypted))
+        return nonce, started_at, public, bytes(a ^ b for a, b in zip(encrypted, stream))
+
+def new_nonce() -> int:
+    return secrets.randbits(32)
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit of Work Modülü - Güncelleme başına tek bağlantı, tek commit
+Handler'ın ilk SQL'inde havuzdan bağlantı alınır; Database metotlarının commit'leri
+ertelenir, handler bitince tek commit yapılır ve bağlantı havuza döner.
+
+Commit edilmemiş yazma await'i geçmez: Bot API çağrısı ve pause() öncesi flush_unit()
+bekleyen yazma varsa commit eder. psycopg2 senkron olduğu için başka bir güncellemenin
+tuttuğu satır kilidini bekleyen sorgu event loop'u kilitlerdi; kilitler ağ beklemesine
+taşınmaz. Sadece okuma yapıldıysa bağlantı await boyunca tutulur (satır kilidi yoktur),
+böylece güncelleme başına tek transaction kalır. Handler içinde başka bir await varsa
+önce flush_unit() çağrılmalı.
+
+Metot adımları: Bekleyen yazma varken her metodun ilk SQL'i savepoint önekiyle gider
+(aynı round trip, önceki adımın savepoint'i bırakılır - tek seviye). Metodun rollback'i
+sadece kendi SQL'ini geri alır; rollback çağırmadan hata veren metot (ör. try'sız okuma)
+sonraki adımda veya flush'ta savepoint'e döndürülür, önceki yazmalar korunur.
+Job'lar ve arka plan görevleri birim dışında çalışır.
+
+Commit başarısız olursa hata flush_unit()'ten yükselir: Bot API çağrısı yapılmaz, kullanıcıya
+geri alınan yazma için "başarılı" cevabı gitmez. Bellek içi önbellekler on_commit ile gerçek
+commit'ten sonra güncellenir; on_abort geri alınan birimde çalışır (önbellek geçersizleştirme).
+Bu modül bot_main'i import etmez.
+"""
+
+import contextvars
+import functools
+import logging
+from typing import Callable, List, Optional
+
+import psycopg2.extensions
+
+SAVEPOINT = "unit_step"
+SAVEPOINT_PREFIX = f"SAVEPOINT {SAVEPOINT}; "
+RESAVEPOINT_PREFIX = f"RELEASE SAVEPOINT {SAVEPOINT}; SAVEPOINT {SAVEPOINT}; "
+
+def strip_savepoint_prefix(query: str) -> str:
+    """SQL profili için - Metot SQL'ine eklenen savepoint önekini at"""
+    for prefix in (RESAVEPOINT_PREFIX, SAVEPOINT_PREFIX):
+        if query.startswith(prefix):
+            return query[len(prefix):]
+    return query
+
+def in_error(conn) -> bool:
+    return conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_INERROR
+
+class UnitCommitError(Exception):
+    """Birimin yazmaları kalıcı olmadı - Hatalı transaction commit edilemedi"""
+
+class UnitCursor:
+    """Metot cursor'ı - Adımın ilk SQL'i gerekiyorsa savepoint önekiyle çalışır"""
+
+    def __init__(self, step: "UnitConnection", cursor):
+        self._step = step
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, query, vars=None):
+        prefix = self._step.savepoint_prefix()
+        if not prefix:
+            return self._cursor.execute(query, vars)
+        try:
+            if isinstance(query, bytes):
+                return self._cursor.execute(prefix.encode() + query, vars)
+            return self._cursor.execute(prefix + query, vars)
+        except Exception:
+            self._step.prefix_failed()
+            raise
+
+    def executemany(self, query, vars_list):
+        # Önek her parametre setinde tekrar çalışırdı - Savepoint ayrı alınır
+        prefix = self._step.savepoint_prefix()
+        if prefix:
+            try:
+                self._cursor.execute(prefix)
+            except Exception:
+                self._step.prefix_failed()
+                raise
+        return self._cursor.executemany(query, vars_list)
+
+class UnitConnection:
+    """Bir Database metoduna verilen vekil (adım) - commit ertelenir, rollback savepoint'e döner"""
+
+    def __init__(self, unit: "UnitOfWork", conn):
+        self._unit = unit
+        self._conn = conn
+        self._marked = False  # Bu adımın geri döneceği savepoint alındı
+        self._had_savepoint = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return UnitCursor(self, self._conn.cursor(*args, **kwargs))
+
+    def savepoint_prefix(self) -> str:
+        """Bekleyen yazma varken adımın ilk SQL'i - Geri dönülecek noktayı işaretle"""
+        unit = self._unit
+        if not unit.dirty or self._marked:
+            return ""
+        self._marked = True
+        self._had_savepoint = unit.savepoint
+        unit.savepoint = True
+        return RESAVEPOINT_PREFIX if self._had_savepoint else SAVEPOINT_PREFIX
+
+    def prefix_failed(self):
+        """SQL sunucuya gitmeden hata verdi (ör. parametre hatası) - Savepoint alınmadı"""
+        if not in_error(self._conn):
+            self._marked = False
+            self._unit.savepoint = self._had_savepoint
+
+    def commit(self):
+        self._unit.dirty = True
+        # Metot commit'ten sonra SQL çalıştırıp geri alırsa commit ettiği kısım korunur
+        self._marked = False
+
+    def rollback(self):
+        unit = self._unit
+        if self._marked:
+            cursor = self._conn.cursor()
+            try:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {SAVEPOINT}")
+            finally:
+                cursor.close()
+        elif not unit.dirty:
+            # Bekleyen yazma yok - Tüm transaction geri alınabilir
+            self._conn.rollback()
+            unit.savepoint = False
+        # İşaretten sonra SQL çalışmadı - Geri alınacak bir şey yok
+
+class UnitOfWork:
+    """Tek güncellemenin bağlantısı - İlk kullanımda alınır, flush'ta havuza döner"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.conn = None
+        self.dirty = False   # Commit bekleyen yazma var
+        self.savepoint = False  # Transaction'da unit_step savepoint'i var
+        self.closed = False  # Handler bitti - Sonradan gelen sorgular havuzu doğrudan kullanır
+        self.on_commit: List[Callable[[], None]] = []  # Commit sonrası bellek güncellemeleri
+        self.on_abort: List[Callable[[], None]] = []  # Geri alınınca önbellek geçersizleştirme
+
+    def connection(self) -> UnitConnection:
+        if self.conn is None:
+            self.conn = self.pool.getconn()
+        else:
+            self.recover()
+        return UnitConnection(self, self.conn)
+
+    def recover(self):
+        """Önceki adım rollback çağırmadan hata verdi - Bekleyen yazmaları koruyarak temizle"""
+        if not in_error(self.conn):
+            return
+        if self.savepoint:
+            cursor = self.conn.cursor()
+            try:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {SAVEPOINT}")
+            finally:
+                cursor.close()
+            logging.warning("Unit of work adımı hata verdi - Adım geri alındı, önceki yazmalar korundu")
+        elif not self.dirty:
+            self.conn.rollback()
+        # Savepoint'siz bekleyen yazma - Transaction hatalı kalır, flush UnitCommitError verir
+
+    def flush(self):
+        """
+        Bekleyen yazmaları commit et, bağlantıyı havuza ver - Sonraki sorgu yenisini alır
+        Commit başarısızsa yazmalar geri alınır ve hata yükselir
+        """
+        if self.conn is None:
+            return
+        conn = self.conn
+        dirty = self.dirty
+        on_commit, self.on_commit = self.on_commit, []
+        on_abort, self.on_abort = self.on_abort, []
+        try:
+            self.recover()
+            if in_error(conn):
+                # Geri alınmamış hata - Commit zaten rollback olurdu
+                conn.rollback()
+                if dirty:
+                    raise UnitCommitError("Hatalı transaction - Bekleyen yazmalar geri alındı")
+            elif dirty:
+                conn.commit()
+            else:
+                # Sadece okuma - Rollback WAL yazmaz
+                conn.rollback()
+        except Exception as e:
+            logging.error(f"Unit of work commit hatası: {e}")
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            for callback in on_abort:
+                callback()
+            raise
+        finally:
+            self.conn = None
+            self.dirty = False
+            self.savepoint = False
+            self.pool.putconn(conn)
+
+        for callback in on_commit:
+            callback()
+
+    def close(self):
+        self.closed = True
+        self.flush()
+
+# Aktif güncellemenin birimi - Job ve arka plan görevlerinde None
+current_unit: contextvars.ContextVar[Optional[UnitOfWork]] = contextvars.ContextVar(
+    "current_unit", default=None
+)
+
+def active_unit() -> Optional[UnitOfWork]:
+    unit = current_unit.get()
+    if unit is None or unit.closed:
+        return None
+    return unit
+
+def flush_unit():
+    """Await öncesi - Bekleyen yazma varsa commit et (sadece okuma yapıldıysa bağlantı tutulur)"""
+    unit = current_unit.get()
+    if unit is not None and unit.dirty:
+        unit.flush()
+
+def after_commit(callback: Callable[[], None]):
+    """Yazmaya bağlı bellek güncellemesi - Birim içinde gerçek commit'ten sonra, dışında hemen"""
+    unit = active_unit()
+    if unit is not None:
+        unit.on_commit.append(callback)
+    else:
+        callback()
+
+def on_abort(callback: Callable[[], None]):
+    """Birim geri alınırsa çalışır - Birim dışında commit zaten yapılmıştır"""
+    unit = active_unit()
+    if unit is not None:
+        unit.on_abort.append(callback)
+
+def with_unit(callback, pool):
+    """Handler callback'ini güncelleme başına birimle sar"""
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        unit = UnitOfWork(pool)
+        token = current_unit.set(unit)
+        try:
+            return await callback(update, context)
+        finally:
+            unit.close()
+            current_unit.reset(token)
+
+    return wrapper
+
+def bind_units(application, pool):
+    """Kayıtlı tüm handler'ları birimle sar (instrument_application'dan önce çağrılır)"""
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            handler.callback = with_unit(handler.callback, pool)